@@ -2,7 +2,7 @@
 
 from fastapi import APIRouter
 
-from . import auth, datasets, incidents, rules, health
+from . import auth, check_runs, datasets, incidents, rules, health
 
 
 api_router = APIRouter()
@@ -10,4 +10,5 @@ api_router.include_router(auth.router, prefix="/auth", tags=["auth"])
 api_router.include_router(datasets.router, prefix="/datasets", tags=["datasets"])
 api_router.include_router(rules.router, prefix="/rules", tags=["rules"])
 api_router.include_router(incidents.router, prefix="/incidents", tags=["incidents"])
+api_router.include_router(check_runs.router, prefix="/check-runs", tags=["check-runs"])
 api_router.include_router(health.router, tags=["health"])
\ No newline at end of file
@@ -13,7 +13,7 @@ from app.core.security import (
     get_user_by_email,
     verify_password,
 )
-from app.db.session import get_session
+from app.db.session import get_db
 from app.schemas import Token
 
 
@@ -26,7 +26,7 @@ router = APIRouter()
 
 
 @router.post("/login", response_model=Token)
-def login(data: LoginRequest, session: Session = Depends(get_session)) -> Token:
+def login(data: LoginRequest, session: Session = Depends(get_db)) -> Token:
     """Authenticate a user and issue JWT tokens."""
 
     user = get_user_by_email(data.email, session)
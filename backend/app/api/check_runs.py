@@ -0,0 +1,34 @@
+"""Check run history endpoints."""
+
+from datetime import datetime
+from typing import Optional
+
+from fastapi import APIRouter, Depends, Query
+from fastapi.responses import StreamingResponse
+
+from app.core.security import get_current_active_user
+from app.db.models import CheckRun
+from app.services.export import MEDIA_TYPES, ExportFormat, stream_export
+
+
+router = APIRouter()
+
+
+@router.get("/export", dependencies=[Depends(get_current_active_user)])
+def export_check_runs(
+    dataset_id: Optional[int] = Query(None, description="Filter by dataset ID"),
+    since: Optional[datetime] = Query(None, description="Only runs at or after this time"),
+    until: Optional[datetime] = Query(None, description="Only runs before this time"),
+    fmt: ExportFormat = Query(ExportFormat.ndjson, alias="format", description="ndjson or csv"),
+) -> StreamingResponse:
+    """Stream the check run history, oldest first, as NDJSON or CSV."""
+
+    statement = CheckRun.__table__.select()
+    if dataset_id is not None:
+        statement = statement.where(CheckRun.dataset_id == dataset_id)
+    if since is not None:
+        statement = statement.where(CheckRun.run_at >= since)
+    if until is not None:
+        statement = statement.where(CheckRun.run_at < until)
+    statement = statement.order_by(CheckRun.run_at, CheckRun.id)
+    return StreamingResponse(stream_export(statement, fmt), media_type=MEDIA_TYPES[fmt])
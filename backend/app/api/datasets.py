@@ -4,9 +4,9 @@ from fastapi import APIRouter, Depends, HTTPException, status
 from sqlmodel import Session, select
 
 from app.core.rbac import require_role
-from app.core.security import get_current_active_user
-from app.db.models import Dataset, User
-from app.db.session import get_session
+from app.core.security import Principal, get_current_active_user
+from app.db.models import Dataset
+from app.db.session import ReadSession, get_db, get_read_session
 from app.schemas import DatasetCreate, DatasetRead
 
 
@@ -14,7 +14,7 @@ router = APIRouter()
 
 
 @router.get("/", response_model=list[DatasetRead])
-def list_datasets(session: Session = Depends(get_session)) -> list[DatasetRead]:
+async def list_datasets(session: ReadSession = Depends(get_read_session)) -> list[DatasetRead]:
     """Return all datasets accessible to the current user.
 
     For now, returns all datasets without scoping by tenant. Multi-tenancy could
@@ -22,15 +22,15 @@ def list_datasets(session: Session = Depends(get_session)) -> list[DatasetRead]:
     """
 
     statement = select(Dataset)
-    datasets = session.exec(statement).all()
+    datasets = (await session.exec(statement)).all()
     return datasets
 
 
 @router.post("/", response_model=DatasetRead, dependencies=[Depends(require_role("Owner", "Maintainer"))])
 def create_dataset(
     dataset_in: DatasetCreate,
-    session: Session = Depends(get_session),
-    current_user: User = Depends(get_current_active_user),
+    session: Session = Depends(get_db),
+    current_user: Principal = Depends(get_current_active_user),
 ) -> DatasetRead:
     """Create a new dataset. Only Owners and Maintainers can create datasets."""
 
@@ -40,6 +40,8 @@ def create_dataset(
     dataset = Dataset(
         name=dataset_in.name,
         description=dataset_in.description,
+        append_only=dataset_in.append_only,
+        check_interval_seconds=dataset_in.check_interval_seconds,
         owner_id=current_user.id,
     )
     session.add(dataset)
@@ -49,10 +51,10 @@ def create_dataset(
 
 
 @router.get("/{dataset_id}", response_model=DatasetRead)
-def get_dataset(dataset_id: int, session: Session = Depends(get_session)) -> DatasetRead:
+async def get_dataset(dataset_id: int, session: ReadSession = Depends(get_read_session)) -> DatasetRead:
     """Retrieve a dataset by its ID."""
 
-    dataset = session.get(Dataset, dataset_id)
+    dataset = await session.get(Dataset, dataset_id)
     if not dataset:
         raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="Dataset not found")
     return dataset
\ No newline at end of file
@@ -1,49 +1,100 @@
 """Incident management endpoints."""
 
-from typing import List, Optional
+from datetime import datetime
+from typing import Any, List, Optional
 
-from fastapi import APIRouter, Depends, HTTPException, Query, status
+from fastapi import APIRouter, Depends, HTTPException, Query, Response, status
+from fastapi.responses import StreamingResponse
 from sqlmodel import Session, select
 
+from app.core.pagination import NEXT_CURSOR_HEADER, next_cursor, paginate
 from app.core.rate_limit import enforce_rate_limit
 from app.core.rbac import require_role
-from app.core.security import get_current_active_user
-from app.db.models import Acknowledgement, Incident, Rule, User
-from app.db.session import get_session
+from app.core.security import Principal, get_current_active_user
+from app.db.models import Acknowledgement, Incident, Rule
+from app.db.session import ReadSession, get_db, get_read_session
 from app.schemas import AcknowledgementCreate, IncidentRead
+from app.services.export import MEDIA_TYPES, ExportFormat, stream_export
 
 
 router = APIRouter()
 
 
+def _filter_incidents(
+    statement: Any,
+    dataset_id: Optional[int],
+    rule_id: Optional[int],
+    acknowledged: Optional[bool],
+    resolved: Optional[bool],
+) -> Any:
+    if dataset_id is not None:
+        statement = statement.where(Incident.dataset_id == dataset_id)
+    if rule_id is not None:
+        statement = statement.where(Incident.rule_id == rule_id)
+    if acknowledged is not None:
+        statement = statement.where(Incident.acknowledged == acknowledged)
+    if resolved is not None:
+        statement = statement.where(Incident.resolved == resolved)
+    return statement
+
+
 @router.get("/", response_model=List[IncidentRead])
-def list_incidents(
+async def list_incidents(
     dataset_id: Optional[int] = Query(None, description="Filter by dataset ID"),
     rule_id: Optional[int] = Query(None, description="Filter by rule ID"),
     acknowledged: Optional[bool] = Query(None, description="Filter by acknowledgement status"),
+    resolved: Optional[bool] = Query(None, description="Filter by resolution status"),
     limit: int = Query(50, ge=1, le=100),
-    offset: int = Query(0, ge=0),
-    session: Session = Depends(get_session),
+    cursor: Optional[str] = Query(None, description="Cursor of the page to return, from X-Next-Cursor"),
+    offset: int = Query(0, ge=0, deprecated=True, description="Rows to skip; use cursor instead"),
+    *,
+    response: Response,
+    session: ReadSession = Depends(get_read_session),
 ) -> List[IncidentRead]:
-    """Return a list of incidents with optional filtering and pagination."""
+    """Return a page of incidents, newest first, with optional filtering.
 
-    statement = select(Incident)
-    if dataset_id is not None:
-        statement = statement.where(Incident.dataset_id == dataset_id)
-    if rule_id is not None:
-        statement = statement.where(Incident.rule_id == rule_id)
-    if acknowledged is not None:
-        statement = statement.where(Incident.acknowledged == acknowledged)
-    statement = statement.offset(offset).limit(limit)
-    incidents = session.exec(statement).all()
+    The cursor of the next page is returned in the `X-Next-Cursor` header,
+    which is absent on the last page. `offset` is still accepted for clients
+    written before cursors, with the same newest-first order, but it cannot
+    be combined with `cursor` and deep offsets scan every skipped row.
+    """
+
+    if offset and cursor is not None:
+        raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail="Use either cursor or offset, not both")
+    statement = _filter_incidents(select(Incident), dataset_id, rule_id, acknowledged, resolved)
+    statement = paginate(statement, Incident, cursor, limit).offset(offset)
+    incidents, next_page = next_cursor((await session.exec(statement)).all(), limit)
+    if next_page is not None:
+        response.headers[NEXT_CURSOR_HEADER] = next_page
     return incidents
 
 
+@router.get("/export", dependencies=[Depends(get_current_active_user)])
+def export_incidents(
+    dataset_id: Optional[int] = Query(None, description="Filter by dataset ID"),
+    rule_id: Optional[int] = Query(None, description="Filter by rule ID"),
+    acknowledged: Optional[bool] = Query(None, description="Filter by acknowledgement status"),
+    resolved: Optional[bool] = Query(None, description="Filter by resolution status"),
+    since: Optional[datetime] = Query(None, description="Only incidents created at or after this time"),
+    until: Optional[datetime] = Query(None, description="Only incidents created before this time"),
+    fmt: ExportFormat = Query(ExportFormat.ndjson, alias="format", description="ndjson or csv"),
+) -> StreamingResponse:
+    """Stream every matching incident, oldest first, as NDJSON or CSV."""
+
+    statement = _filter_incidents(Incident.__table__.select(), dataset_id, rule_id, acknowledged, resolved)
+    if since is not None:
+        statement = statement.where(Incident.created_at >= since)
+    if until is not None:
+        statement = statement.where(Incident.created_at < until)
+    statement = statement.order_by(Incident.created_at, Incident.id)
+    return StreamingResponse(stream_export(statement, fmt), media_type=MEDIA_TYPES[fmt])
+
+
 @router.get("/{incident_id}", response_model=IncidentRead)
-def get_incident(incident_id: int, session: Session = Depends(get_session)) -> IncidentRead:
+async def get_incident(incident_id: int, session: ReadSession = Depends(get_read_session)) -> IncidentRead:
     """Retrieve a single incident by its ID."""
 
-    incident = session.get(Incident, incident_id)
+    incident = await session.get(Incident, incident_id)
     if not incident:
         raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="Incident not found")
     return incident
@@ -57,8 +108,8 @@ def get_incident(incident_id: int, session: Session = Depends(get_session)) -> I
 def acknowledge_incident(
     incident_id: int,
     ack: AcknowledgementCreate,
-    session: Session = Depends(get_session),
-    current_user: User = Depends(get_current_active_user),
+    session: Session = Depends(get_db),
+    current_user: Principal = Depends(get_current_active_user),
 ) -> IncidentRead:
     """Mark an incident as acknowledged with an optional comment."""
 
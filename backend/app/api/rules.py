@@ -1,31 +1,48 @@
 """Rule management endpoints."""
 
+from datetime import datetime, timedelta, timezone
+from enum import Enum
 from typing import List, Optional
 
 from fastapi import APIRouter, Depends, HTTPException, Query, status
 from sqlmodel import Session, select
 
 from app.core.rbac import require_role
-from app.core.security import get_current_active_user
-from app.db.models import Dataset, Rule, User
-from app.db.session import get_session
-from app.schemas import RuleCreate, RuleRead
+from app.core.security import Principal, get_current_active_user
+from app.db.models import Dataset, Rule
+from app.db.session import ReadSession, get_db, get_read_session
+from app.schemas import MetricBucketRead, MetricSeriesRead, RuleCreate, RuleRead
+from app.services.metric_series import query_series
+from app.services.rule_types import RuleValidationError, compile_rule
 
 
 router = APIRouter()
 
 
+class SeriesResolution(str, Enum):
+    raw = "raw"
+    hour = "hour"
+    day = "day"
+
+
+def _naive_utc(value: Optional[datetime]) -> Optional[datetime]:
+    # Metric timestamps are stored as naive UTC
+    if value is None or value.tzinfo is None:
+        return value
+    return value.astimezone(timezone.utc).replace(tzinfo=None)
+
+
 @router.get("/", response_model=List[RuleRead])
-def list_rules(
+async def list_rules(
     dataset_id: Optional[int] = Query(None, description="Filter by dataset ID"),
-    session: Session = Depends(get_session),
+    session: ReadSession = Depends(get_read_session),
 ) -> List[RuleRead]:
     """Return all rules, optionally filtering by dataset."""
 
     statement = select(Rule)
     if dataset_id is not None:
         statement = statement.where(Rule.dataset_id == dataset_id)
-    rules = session.exec(statement).all()
+    rules = (await session.exec(statement)).all()
     return rules
 
 
@@ -36,8 +53,8 @@ def list_rules(
 )
 def create_rule(
     rule_in: RuleCreate,
-    session: Session = Depends(get_session),
-    current_user: User = Depends(get_current_active_user),
+    session: Session = Depends(get_db),
+    current_user: Principal = Depends(get_current_active_user),
 ) -> RuleRead:
     """Create a new quality rule for a dataset."""
 
@@ -55,6 +72,10 @@ def create_rule(
         severity=rule_in.severity,
         enabled=rule_in.enabled,
     )
+    try:
+        compile_rule(rule)
+    except RuleValidationError as exc:
+        raise HTTPException(status_code=status.HTTP_422_UNPROCESSABLE_ENTITY, detail=str(exc))
     session.add(rule)
     session.commit()
     session.refresh(rule)
@@ -62,20 +83,53 @@ def create_rule(
 
 
 @router.get("/{rule_id}", response_model=RuleRead)
-def get_rule(rule_id: int, session: Session = Depends(get_session)) -> RuleRead:
+async def get_rule(rule_id: int, session: ReadSession = Depends(get_read_session)) -> RuleRead:
     """Return a single rule by its ID."""
 
-    rule = session.get(Rule, rule_id)
+    rule = await session.get(Rule, rule_id)
     if not rule:
         raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="Rule not found")
     return rule
 
 
+@router.get("/{rule_id}/series", response_model=MetricSeriesRead)
+async def get_rule_series(
+    rule_id: int,
+    since: Optional[datetime] = Query(None, description="Start of the range, defaults to 7 days before until"),
+    until: Optional[datetime] = Query(None, description="End of the range (exclusive), defaults to now"),
+    resolution: Optional[SeriesResolution] = Query(
+        None, description="raw, hour or day; picked from the length of the range if omitted"
+    ),
+    session: ReadSession = Depends(get_read_session),
+) -> MetricSeriesRead:
+    """Return the metric history of a rule, aggregated to a resolution suited to the range."""
+
+    if not await session.get(Rule, rule_id):
+        raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="Rule not found")
+    until = _naive_utc(until) or datetime.utcnow()
+    since = _naive_utc(since) or until - timedelta(days=7)
+    if since >= until:
+        raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail="since must be before until")
+    picked, buckets = await query_series(session, rule_id, since, until, resolution.value if resolution else None)
+    points = [
+        MetricBucketRead(
+            ts=bucket.start,
+            count=bucket.count,
+            min=bucket.min,
+            max=bucket.max,
+            mean=bucket.mean,
+            failed_count=bucket.failed_count,
+        )
+        for bucket in buckets
+    ]
+    return MetricSeriesRead(rule_id=rule_id, resolution=picked, points=points)
+
+
 @router.patch("/{rule_id}", response_model=RuleRead, dependencies=[Depends(require_role("Owner", "Maintainer"))])
 def update_rule(
     rule_id: int,
     rule_in: RuleCreate,
-    session: Session = Depends(get_session),
+    session: Session = Depends(get_db),
 ) -> RuleRead:
     """Update an existing rule. All fields are replaced."""
 
@@ -87,6 +141,10 @@ def update_rule(
     rule.threshold = rule_in.threshold
     rule.severity = rule_in.severity
     rule.enabled = rule_in.enabled
+    try:
+        compile_rule(rule)
+    except RuleValidationError as exc:
+        raise HTTPException(status_code=status.HTTP_422_UNPROCESSABLE_ENTITY, detail=str(exc))
     session.add(rule)
     session.commit()
     session.refresh(rule)
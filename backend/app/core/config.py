@@ -11,6 +11,8 @@ environment keys and type conversion out of the box.
 """
 
 from functools import lru_cache
+from typing import Optional
+
 from pydantic_settings import BaseSettings, SettingsConfigDict
 
 
@@ -20,23 +22,95 @@ class Settings(BaseSettings):
     Attributes:
         secret_key: Secret used to sign JWTs and other sensitive tokens.
         database_url: SQLAlchemy connection string for the PostgreSQL database.
-        prometheus_port: Port on which the Prometheus metrics endpoint is served.
+        prometheus_port: Port on which the quality job serves its Prometheus
+            metrics in continuous mode; 0 disables the endpoint.
+        metrics_pushgateway_url: Pushgateway receiving the metrics of one-off
+            (`--once`) quality job runs; nothing is pushed if unset.
         jwt_algorithm: Signing algorithm for JWT tokens.
         access_token_expire_minutes: Expiry in minutes for access tokens.
         refresh_token_expire_minutes: Expiry in minutes for refresh tokens.
         mock_mode: If true, enables mock implementations for Kafka and rate
             limiting; used for demos.
         frontend_url: URL where the frontend is hosted; used for CORS settings.
+        auth_cache_ttl_seconds: Seconds a verified access token is served from
+            the principal cache without a database lookup; 0 disables it.
+        auth_cache_max_entries: Tokens kept in the principal cache per process.
+        rate_limit_backend: Where rate limit buckets live: "memory" (per
+            process) or "sqlite" (shared by the processes of one host).
+        rate_limit_sqlite_path: Database file of the "sqlite" backend;
+            defaults to a file in the system temp directory.
+        rate_limit_max_keys: Buckets kept by the "memory" backend before the
+            least recently used ones are evicted.
+        db_pool_size: Connections kept open in the database pool.
+        db_max_overflow: Extra connections opened beyond the pool under load.
+        db_pool_pre_ping: Test pooled connections before use so dropped ones
+            are replaced transparently.
+        db_pool_recycle: Seconds after which pooled connections are replaced.
+        db_async_enabled: Serve read-only endpoints from an async engine; the
+            driver is derived from `database_url` (asyncpg or aiosqlite).
+        check_memory_limit_mb: Memory budget for evaluating one dataset. Files
+            larger than a quarter of it are evaluated in streaming chunks.
+        check_chunk_rows: Upper bound on the rows parsed per streaming chunk.
+        check_rule_workers: Threads evaluating the rule groups of one dataset
+            in parallel; multiplies with the job's `--workers` processes.
+        check_spill_dir: Directory for temporary spill files used by streaming
+            uniqueness checks; defaults to the system temp directory.
+        dataset_cache_enabled: Cache parsed datasets as memory-mapped columns.
+        dataset_cache_dir: Directory of the parsed dataset cache; defaults to
+            a folder in the system temp directory.
+        result_batch_size: Result rows (incidents, check runs, schema
+            versions) buffered before they are bulk inserted.
+        freshness_tail_bytes: Bytes read from the end of a file by the first
+            attempt of the monotonic freshness fast path.
+        retention_check_run_days: Days check runs are kept; 0 keeps them
+            forever. The same applies to the other retention periods.
+        retention_incident_days: Days acknowledged or resolved incidents are
+            kept after they were last seen; open incidents are always kept.
+        retention_schema_version_days: Days superseded schema versions are
+            kept; the latest version of each dataset is always kept.
+        retention_metric_point_days: Days raw metric points are kept once
+            they are rolled up.
+        retention_metric_rollup_hour_days: Days hourly metric rollups are
+            kept; daily rollups are kept forever.
+        retention_archive_dir: Directory receiving gzipped NDJSON copies of
+            rows before retention removes them; nothing is archived if unset.
+        retention_batch_rows: Rows deleted per transaction by the retention job.
     """
 
     secret_key: str
     database_url: str
     prometheus_port: int = 8001
+    metrics_pushgateway_url: Optional[str] = None
     jwt_algorithm: str = "HS256"
     access_token_expire_minutes: int = 60
     refresh_token_expire_minutes: int = 60 * 24 * 7  # 1 week
     mock_mode: bool = False
     frontend_url: str = "http://localhost:5173"
+    auth_cache_ttl_seconds: int = 60
+    auth_cache_max_entries: int = 10_000
+    rate_limit_backend: str = "memory"
+    rate_limit_sqlite_path: Optional[str] = None
+    rate_limit_max_keys: int = 100_000
+    db_pool_size: int = 10
+    db_max_overflow: int = 20
+    db_pool_pre_ping: bool = True
+    db_pool_recycle: int = 1800
+    db_async_enabled: bool = False
+    check_memory_limit_mb: int = 1024
+    check_chunk_rows: int = 100_000
+    check_rule_workers: int = 1
+    check_spill_dir: Optional[str] = None
+    dataset_cache_enabled: bool = True
+    dataset_cache_dir: Optional[str] = None
+    freshness_tail_bytes: int = 64 * 1024
+    result_batch_size: int = 1000
+    retention_check_run_days: int = 30
+    retention_incident_days: int = 180
+    retention_schema_version_days: int = 365
+    retention_metric_point_days: int = 30
+    retention_metric_rollup_hour_days: int = 365
+    retention_archive_dir: Optional[str] = None
+    retention_batch_rows: int = 5000
 
     model_config = SettingsConfigDict(
         env_prefix="",
@@ -0,0 +1,60 @@
+"""Keyset (cursor) pagination helpers.
+
+Listings are ordered newest first by `(created_at, id)`. The position after
+the last row of a page is returned to the client as an opaque cursor; the
+next page starts strictly after it, so each page costs one index range scan
+of `limit` rows no matter how deep it is, and rows inserted meanwhile do not
+shift pages.
+"""
+
+import base64
+import binascii
+import json
+from datetime import datetime
+from typing import Any, List, Optional, Tuple
+
+from fastapi import HTTPException, status
+from sqlalchemy import tuple_
+
+# Response header carrying the cursor of the next page, absent on the last page
+NEXT_CURSOR_HEADER = "X-Next-Cursor"
+
+
+def encode_cursor(created_at: datetime, row_id: int) -> str:
+    """Return an opaque cursor pointing just after a row."""
+
+    payload = json.dumps([created_at.isoformat(), row_id]).encode()
+    return base64.urlsafe_b64encode(payload).decode().rstrip("=")
+
+
+def decode_cursor(cursor: str) -> Tuple[datetime, int]:
+    """Decode a cursor from `encode_cursor`; raises a 400 error when it is malformed."""
+
+    try:
+        payload = base64.urlsafe_b64decode(cursor + "=" * (-len(cursor) % 4))
+        created_at, row_id = json.loads(payload)
+        return datetime.fromisoformat(created_at), int(row_id)
+    except (binascii.Error, ValueError, TypeError) as exc:
+        raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail="Invalid cursor") from exc
+
+
+def paginate(statement: Any, model: Any, cursor: Optional[str], limit: int) -> Any:
+    """Order `statement` newest first and restrict it to the page after `cursor`.
+
+    One extra row is selected so `next_cursor` can tell whether a further
+    page exists.
+    """
+
+    if cursor is not None:
+        created_at, row_id = decode_cursor(cursor)
+        statement = statement.where(tuple_(model.created_at, model.id) < tuple_(created_at, row_id))
+    return statement.order_by(model.created_at.desc(), model.id.desc()).limit(limit + 1)
+
+
+def next_cursor(rows: List[Any], limit: int) -> Tuple[List[Any], Optional[str]]:
+    """Trim the extra row selected by `paginate` and return the next page's cursor."""
+
+    if len(rows) <= limit:
+        return rows, None
+    rows = rows[:limit]
+    return rows, encode_cursor(rows[-1].created_at, rows[-1].id)
@@ -1,20 +1,36 @@
-"""Simple in-memory rate limiting utilities.
-
-This module implements a rudimentary token bucket rate limiter. It is used to
-protect write-heavy routes such as acknowledgements from abuse. In a real
-deployment you would use Redis or another external store to coordinate state
-between processes.
+"""Token bucket rate limiting.
+
+This module protects write-heavy routes such as acknowledgements from abuse
+with a per-user token bucket. Two backends implement `RateLimiterBackend`,
+selected by `Settings.rate_limit_backend`:
+
+* `RateLimiter` keeps buckets in process memory, spread over lock-sharded
+  LRU maps so concurrent requests rarely contend and the number of tracked
+  keys stays bounded. Each uvicorn worker process enforces its own limit.
+* `SQLiteRateLimiter` keeps buckets in a SQLite file shared by every worker
+  process on the host, so the limit holds for the whole deployment rather
+  than once per worker. Each decision is one short write transaction.
+
+Buckets are refilled on the monotonic clock, so wall-clock adjustments can
+neither refill nor drain them. A bucket idle long enough to refill
+completely is identical to a new one, so idle buckets are evicted without
+changing any decision.
 """
 
+import sqlite3
+import tempfile
 import threading
 import time
+from collections import OrderedDict
 from dataclasses import dataclass, field
-from typing import Dict
+from pathlib import Path
+from typing import List, Optional, Protocol
 
 from fastapi import Depends, HTTPException, status
+from starlette.concurrency import run_in_threadpool
 
-from app.core.security import get_current_active_user
-from app.db.models import User
+from app.core.config import settings
+from app.core.security import Principal, get_current_active_user
 
 
 @dataclass
@@ -22,12 +38,13 @@ class TokenBucket:
     capacity: int
     refill_rate: float  # tokens per second
     tokens: float = field(default=0.0)
-    last_checked: float = field(default_factory=time.time)
+    last_checked: float = field(default_factory=time.monotonic)
 
-    def consume(self, amount: int = 1) -> bool:
-        now = time.time()
+    def consume(self, amount: int = 1, now: Optional[float] = None) -> bool:
+        if now is None:
+            now = time.monotonic()
         # Refill based on time elapsed
-        elapsed = now - self.last_checked
+        elapsed = max(now - self.last_checked, 0.0)
         self.tokens = min(self.capacity, self.tokens + elapsed * self.refill_rate)
         self.last_checked = now
         if self.tokens >= amount:
@@ -36,34 +53,156 @@ class TokenBucket:
         return False
 
 
+class RateLimiterBackend(Protocol):
+    """Decides whether a key may spend `amount` tokens now."""
+
+    def allow(self, key: str, amount: int = 1) -> bool:
+        ...
+
+
+class _Shard:
+    def __init__(self) -> None:
+        self.buckets: "OrderedDict[str, TokenBucket]" = OrderedDict()
+        self.lock = threading.Lock()
+
+
 class RateLimiter:
-    """Thread-safe in-memory token bucket rate limiter."""
+    """Thread-safe in-memory token bucket rate limiter.
 
-    def __init__(self, capacity: int = 5, refill_rate: float = 1.0) -> None:
+    Keys are hashed onto `shards` independently locked LRU maps holding at
+    most `max_keys` buckets in total; the least recently used bucket of a
+    full shard is evicted.
+    """
+
+    def __init__(self, capacity: int = 5, refill_rate: float = 1.0, max_keys: int = 100_000, shards: int = 16) -> None:
         self.capacity = capacity
         self.refill_rate = refill_rate
-        self.buckets: Dict[str, TokenBucket] = {}
-        self.lock = threading.Lock()
+        self.shard_keys = max(max_keys // shards, 1)
+        self.shards: List[_Shard] = [_Shard() for _ in range(shards)]
+        # Seconds after which an untouched bucket is full again
+        self.idle_seconds = capacity / refill_rate if refill_rate > 0 else float("inf")
 
     def allow(self, key: str, amount: int = 1) -> bool:
-        with self.lock:
-            bucket = self.buckets.get(key)
+        shard = self.shards[hash(key) % len(self.shards)]
+        now = time.monotonic()
+        with shard.lock:
+            bucket = shard.buckets.get(key)
             if bucket is None:
                 bucket = TokenBucket(capacity=self.capacity, refill_rate=self.refill_rate, tokens=self.capacity)
-                self.buckets[key] = bucket
-            return bucket.consume(amount)
-
-
-# Create a singleton rate limiter; settings could be configured via env
-rate_limiter = RateLimiter(capacity=10, refill_rate=0.2)  # 10 tokens max, 0.2 tokens per second (~3/min)
-
+                shard.buckets[key] = bucket
+                self._evict(shard, now)
+            else:
+                shard.buckets.move_to_end(key)
+            return bucket.consume(amount, now)
+
+    def _evict(self, shard: _Shard, now: float) -> None:
+        buckets = shard.buckets
+        # Drop idle buckets from the cold end, then the LRU ones while over budget
+        while buckets:
+            oldest = next(iter(buckets.values()))
+            if len(buckets) <= self.shard_keys and now - oldest.last_checked < self.idle_seconds:
+                break
+            buckets.popitem(last=False)
+
+    def __len__(self) -> int:
+        return sum(len(shard.buckets) for shard in self.shards)
+
+
+class SQLiteRateLimiter:
+    """Token buckets in a SQLite file shared by the processes of one host.
+
+    Every decision reads and updates its bucket in a `BEGIN IMMEDIATE`
+    transaction, which serialises concurrent writers across processes. The
+    monotonic clock is system-wide, so processes agree on elapsed time.
+    Buckets idle for longer than a full refill are purged every
+    `purge_every` decisions.
+    """
+
+    def __init__(self, path: str, capacity: int = 5, refill_rate: float = 1.0, purge_every: int = 1000) -> None:
+        self.path = path
+        self.capacity = capacity
+        self.refill_rate = refill_rate
+        self.purge_every = purge_every
+        self.idle_seconds = capacity / refill_rate if refill_rate > 0 else float("inf")
+        self.local = threading.local()
+        self.calls = 0
+        connection = self._connect()
+        try:
+            connection.execute("PRAGMA journal_mode=WAL")
+            connection.execute(
+                "CREATE TABLE IF NOT EXISTS rate_limit_bucket "
+                "(key TEXT PRIMARY KEY, tokens REAL NOT NULL, last_checked REAL NOT NULL)"
+            )
+        finally:
+            connection.close()
+
+    def _connect(self) -> sqlite3.Connection:
+        # Transactions are managed explicitly
+        connection = sqlite3.connect(self.path, timeout=5.0, isolation_level=None)
+        connection.execute("PRAGMA synchronous=NORMAL")
+        return connection
+
+    @property
+    def connection(self) -> sqlite3.Connection:
+        # sqlite3 connections must stay on the thread that opened them
+        connection = getattr(self.local, "connection", None)
+        if connection is None:
+            connection = self.local.connection = self._connect()
+        return connection
 
-async def enforce_rate_limit(current_user: User = Depends(get_current_active_user)) -> None:
+    def allow(self, key: str, amount: int = 1) -> bool:
+        connection = self.connection
+        connection.execute("BEGIN IMMEDIATE")
+        # Read the clock under the lock so no other writer has a later timestamp
+        now = time.monotonic()
+        try:
+            row = connection.execute(
+                "SELECT tokens, last_checked FROM rate_limit_bucket WHERE key = ?", (key,)
+            ).fetchone()
+            bucket = TokenBucket(self.capacity, self.refill_rate, tokens=self.capacity, last_checked=now)
+            if row is not None and row[1] <= now:
+                # A last_checked ahead of the clock predates a reboot; start over
+                bucket.tokens, bucket.last_checked = row
+            allowed = bucket.consume(amount, now)
+            connection.execute(
+                "INSERT OR REPLACE INTO rate_limit_bucket (key, tokens, last_checked) VALUES (?, ?, ?)",
+                (key, bucket.tokens, bucket.last_checked),
+            )
+            self.calls += 1
+            if self.calls % self.purge_every == 0:
+                connection.execute(
+                    "DELETE FROM rate_limit_bucket WHERE last_checked < ? OR last_checked > ?",
+                    (now - self.idle_seconds, now),
+                )
+            connection.execute("COMMIT")
+        except BaseException:
+            connection.execute("ROLLBACK")
+            raise
+        return allowed
+
+
+def create_rate_limiter(capacity: int, refill_rate: float) -> RateLimiterBackend:
+    """Build the backend selected by `Settings.rate_limit_backend`."""
+
+    if settings.rate_limit_backend == "sqlite":
+        path = settings.rate_limit_sqlite_path or str(Path(tempfile.gettempdir()) / "iqp-rate-limit.sqlite3")
+        return SQLiteRateLimiter(path, capacity=capacity, refill_rate=refill_rate)
+    if settings.rate_limit_backend != "memory":
+        raise ValueError(f"Unknown rate limit backend {settings.rate_limit_backend!r}")
+    return RateLimiter(capacity=capacity, refill_rate=refill_rate, max_keys=settings.rate_limit_max_keys)
+
+
+# Create a singleton rate limiter; 10 tokens max, 0.2 tokens per second (~3/min)
+rate_limiter = create_rate_limiter(capacity=10, refill_rate=0.2)
+
+
+async def enforce_rate_limit(current_user: Principal = Depends(get_current_active_user)) -> None:
     """FastAPI dependency to enforce a per-user rate limit."""
 
     key = f"{current_user.id}"
-    if not rate_limiter.allow(key):
+    # The SQLite backend may wait for a write lock held by another process
+    if not await run_in_threadpool(rate_limiter.allow, key):
         raise HTTPException(
             status_code=status.HTTP_429_TOO_MANY_REQUESTS,
             detail="Too many requests. Please wait a moment and try again.",
-        )
\ No newline at end of file
+        )
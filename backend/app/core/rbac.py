@@ -9,11 +9,10 @@ from typing import Callable, List
 
 from fastapi import Depends, HTTPException, status
 
-from app.core.security import get_current_active_user
-from app.db.models import User
+from app.core.security import Principal, get_current_active_user
 
 
-def require_role(*allowed_roles: str) -> Callable[[User], User]:
+def require_role(*allowed_roles: str) -> Callable[[Principal], Principal]:
     """Create a dependency that validates the current user's role.
 
     Usage:
@@ -25,7 +24,7 @@ def require_role(*allowed_roles: str) -> Callable[[User], User]:
     ```
     """
 
-    async def dependency(current_user: User = Depends(get_current_active_user)) -> User:
+    async def dependency(current_user: Principal = Depends(get_current_active_user)) -> Principal:
         if current_user.role not in allowed_roles:
             raise HTTPException(
                 status_code=status.HTTP_403_FORBIDDEN,
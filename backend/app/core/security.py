@@ -3,20 +3,34 @@
 This module centralises password hashing and JWT generation/validation. It
 provides dependencies to retrieve the currently authenticated user and to
 enforce role-based access control in FastAPI routes.
+
+Authenticated requests resolve to a `Principal` (id, email and role) rather
+than a `User` row. Verified tokens are kept in a bounded `PrincipalCache` for
+`Settings.auth_cache_ttl_seconds`, so repeated requests with the same token
+skip both the signature check and the user lookup. Committing any change to a
+user, or deleting them, evicts their tokens in this process, and a committed
+bulk UPDATE or DELETE of users empties the cache; other processes pick the
+change up when their entries expire.
 """
 
+import threading
+import time
+from collections import OrderedDict
+from dataclasses import dataclass
 from datetime import datetime, timedelta
-from typing import Optional
+from typing import Any, Callable, Dict, Optional, Set, Tuple
 
 from fastapi import Depends, HTTPException, status
 from fastapi.security import OAuth2PasswordBearer
 from jose import JWTError, jwt
 from passlib.context import CryptContext
+from sqlalchemy import event
 from sqlmodel import Session, select
+from starlette.concurrency import run_in_threadpool
 
 from app.core.config import settings
 from app.db.models import User
-from app.db.session import get_session
+from app.db.session import engine
 
 
 # Password hashing context
@@ -74,11 +88,122 @@ def get_user(session: Session, user_id: int) -> Optional[User]:
     return session.get(User, user_id)
 
 
-async def get_current_user(
-    token: str = Depends(oauth2_scheme), session: Session = Depends(get_session)
-) -> User:
-    """Decode the JWT and return the associated user."""
+@dataclass(frozen=True)
+class Principal:
+    """Identity and role of an authenticated user, safe to share between requests."""
+
+    id: int
+    email: str
+    role: str
+
 
+class PrincipalCache:
+    """Thread-safe LRU cache of verified tokens, each valid until the earlier of its TTL and expiry."""
+
+    def __init__(self, max_entries: int, ttl_seconds: float, clock: Callable[[], float] = time.time) -> None:
+        self.max_entries = max_entries
+        self.ttl_seconds = ttl_seconds
+        self.clock = clock
+        self.entries: "OrderedDict[str, Tuple[Principal, float]]" = OrderedDict()
+        self.tokens_by_user: Dict[int, Set[str]] = {}
+        self.lock = threading.Lock()
+
+    def get(self, token: str) -> Optional[Principal]:
+        with self.lock:
+            entry = self.entries.get(token)
+            if entry is None:
+                return None
+            principal, valid_until = entry
+            if self.clock() >= valid_until:
+                self._remove(token)
+                return None
+            self.entries.move_to_end(token)
+            return principal
+
+    def put(self, token: str, principal: Principal, expires_at: float) -> None:
+        if self.ttl_seconds <= 0:
+            return
+        with self.lock:
+            self._remove(token)
+            self.entries[token] = (principal, min(self.clock() + self.ttl_seconds, expires_at))
+            self.tokens_by_user.setdefault(principal.id, set()).add(token)
+            while len(self.entries) > self.max_entries:
+                self._remove(next(iter(self.entries)))
+
+    def invalidate_user(self, user_id: int) -> None:
+        """Forget every cached token of a user."""
+
+        with self.lock:
+            for token in list(self.tokens_by_user.get(user_id, ())):
+                self._remove(token)
+
+    def clear(self) -> None:
+        with self.lock:
+            self.entries.clear()
+            self.tokens_by_user.clear()
+
+    def _remove(self, token: str) -> None:
+        entry = self.entries.pop(token, None)
+        if entry is None:
+            return
+        user_id = entry[0].id
+        tokens = self.tokens_by_user[user_id]
+        tokens.discard(token)
+        if not tokens:
+            del self.tokens_by_user[user_id]
+
+
+principal_cache = PrincipalCache(settings.auth_cache_max_entries, settings.auth_cache_ttl_seconds)
+
+
+@event.listens_for(Session, "after_flush")
+def _collect_changed_users(session: Any, flush_context: Any) -> None:
+    # Changes only take effect once committed, so evict after the commit
+    changed = session.info.setdefault("principal_changes", set())
+    for user in session.dirty:
+        if isinstance(user, User) and session.is_modified(user, include_collections=False):
+            changed.add(user.id)
+    changed.update(user.id for user in session.deleted if isinstance(user, User))
+
+
+@event.listens_for(Session, "do_orm_execute")
+def _collect_bulk_user_changes(orm_execute_state: Any) -> None:
+    # Bulk statements bypass the flush, and the rows they touch are unknown here
+    if orm_execute_state.is_update or orm_execute_state.is_delete:
+        if any(mapper.class_ is User for mapper in orm_execute_state.all_mappers):
+            orm_execute_state.session.info["principal_changes_all"] = True
+
+
+@event.listens_for(Session, "after_commit")
+def _evict_changed_users(session: Any) -> None:
+    if session.info.pop("principal_changes_all", False):
+        principal_cache.clear()
+    for user_id in session.info.pop("principal_changes", ()):
+        principal_cache.invalidate_user(user_id)
+
+
+@event.listens_for(Session, "after_rollback")
+def _forget_changed_users(session: Any) -> None:
+    session.info.pop("principal_changes", None)
+    session.info.pop("principal_changes_all", None)
+
+
+def _load_principal(user_id: int) -> Optional[Principal]:
+    with Session(engine) as session:
+        user = get_user(session, user_id)
+        return None if user is None else Principal(id=user.id, email=user.email, role=user.role)
+
+
+async def get_current_user(token: str = Depends(oauth2_scheme)) -> Principal:
+    """Decode the JWT and return the associated principal.
+
+    Tokens seen recently are answered from `principal_cache` without
+    verifying the signature again or touching the database.
+    """
+
+    principal = principal_cache.get(token)
+    if principal is not None:
+        return principal
     credentials_exception = HTTPException(
         status_code=status.HTTP_401_UNAUTHORIZED,
         detail="Could not validate credentials",
@@ -86,20 +211,20 @@ async def get_current_user(
     )
     try:
         payload = jwt.decode(token, settings.secret_key, algorithms=[settings.jwt_algorithm])
-        user_id: str = payload.get("sub")
-        if user_id is None:
-            raise credentials_exception
-    except JWTError:
+        user_id = int(payload["sub"])
+        expires_at = float(payload["exp"])
+    except (JWTError, KeyError, TypeError, ValueError):
         raise credentials_exception
-    user = get_user(session, int(user_id))
-    if user is None:
+    principal = await run_in_threadpool(_load_principal, user_id)
+    if principal is None:
         raise credentials_exception
-    return user
+    principal_cache.put(token, principal, expires_at)
+    return principal
 
 
 async def get_current_active_user(
-    current_user: User = Depends(get_current_user),
-) -> User:
+    current_user: Principal = Depends(get_current_user),
+) -> Principal:
     """Ensure the user is active. Placeholder for future flags."""
 
     # In a full implementation you might check `is_active` or `is_disabled` flags
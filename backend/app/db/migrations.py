@@ -0,0 +1,170 @@
+"""Schema upgrades for databases created by earlier versions of the models.
+
+`init_db` creates missing tables with `create_all`, which neither adds
+columns to existing tables nor creates indexes on them. Every change to an
+existing table is therefore also listed in `MIGRATIONS` as a step that
+inspects the live schema and only issues its DDL when the change is missing.
+Steps are idempotent and run in order by `upgrade` after `create_all`, so a
+fresh database, which already has everything, is left untouched.
+
+`init_db` runs the upgrade on start-up; to run it on its own, for example
+before rolling out a new version:
+
+```bash
+python -m app.db.migrations
+```
+"""
+
+from dataclasses import dataclass
+from datetime import datetime
+from typing import Callable, List, Optional, Set, Type
+
+from sqlalchemy import Index, inspect, text
+from sqlalchemy.engine import Connection, Engine
+from sqlmodel import SQLModel
+
+from app.core.logging import get_logger
+from app.db.models import OPEN_INCIDENT, CheckRun, Dataset, Incident
+
+
+logger = get_logger(__name__)
+
+
+@dataclass
+class Migration:
+    """A named, idempotent schema change; `apply` returns whether it changed anything."""
+
+    name: str
+    apply: Callable[[Connection], bool]
+
+
+def _columns(connection: Connection, table: str) -> Set[str]:
+    return {column["name"] for column in inspect(connection).get_columns(table)}
+
+
+def add_column(connection: Connection, model: Type[SQLModel], name: str, default: Optional[str] = None) -> bool:
+    """Add the model's column `name` to its table unless it exists.
+
+    `default` is a SQL literal that fills the existing rows and makes the
+    column NOT NULL; without it the column is added nullable.
+    """
+
+    table = model.__table__
+    if name in _columns(connection, table.name):
+        return False
+    preparer = connection.dialect.identifier_preparer
+    column_type = table.c[name].type.compile(dialect=connection.dialect)
+    ddl = f"ALTER TABLE {preparer.format_table(table)} ADD COLUMN {preparer.quote(name)} {column_type}"
+    if default is not None:
+        ddl += f" DEFAULT {default} NOT NULL"
+    connection.execute(text(ddl))
+    return True
+
+
+def model_index(model: Type[SQLModel], name: str) -> Index:
+    """Return the index `name` declared on a model's table."""
+
+    return next(index for index in model.__table__.indexes if index.name == name)
+
+
+def _has_index(connection: Connection, index: Index) -> bool:
+    return index.name in {existing["name"] for existing in inspect(connection).get_indexes(index.table.name)}
+
+
+def create_index(connection: Connection, index: Index) -> bool:
+    """Create a model index unless an index of that name exists on its table."""
+
+    if _has_index(connection, index):
+        return False
+    index.create(connection)
+    return True
+
+
+def _fill_incident_last_seen(connection: Connection) -> bool:
+    # Added nullable: the existing rows are filled from created_at, and every
+    # incident written since sets it.
+    if not add_column(connection, Incident, "last_seen_at"):
+        return False
+    connection.execute(text("UPDATE incident SET last_seen_at = created_at"))
+    return True
+
+
+def _create_open_incident_index(connection: Connection) -> bool:
+    # Before coalescing, a rule could have several open incidents, which the
+    # unique index rejects. They are merged into the newest one, which takes
+    # the total occurrence count; the older ones are resolved.
+    index = model_index(Incident, "ix_incident_open_rule")
+    if _has_index(connection, index):
+        return False
+    newest = f"SELECT MAX(id) FROM incident WHERE {OPEN_INCIDENT} GROUP BY dataset_id, rule_id"
+    connection.execute(
+        text(
+            "UPDATE incident SET occurrence_count = ("
+            "SELECT SUM(occurrence_count) FROM incident AS open_incident"
+            " WHERE open_incident.dataset_id = incident.dataset_id AND open_incident.rule_id = incident.rule_id"
+            f" AND {OPEN_INCIDENT}) WHERE id IN ({newest} HAVING COUNT(*) > 1)"
+        )
+    )
+    connection.execute(
+        text(
+            "UPDATE incident SET resolved = true, resolved_at = :now"
+            f" WHERE {OPEN_INCIDENT} AND id NOT IN ({newest})"
+        ),
+        {"now": datetime.utcnow()},
+    )
+    index.create(connection)
+    return True
+
+
+def _create_incident_keyset_indexes(connection: Connection) -> bool:
+    names = (
+        "ix_incident_created",
+        "ix_incident_dataset_created",
+        "ix_incident_rule_created",
+        "ix_incident_status_created",
+        "ix_incident_dataset_status_created",
+    )
+    return any([create_index(connection, model_index(Incident, name)) for name in names])
+
+
+def _create_checkrun_run_at_index(connection: Connection) -> bool:
+    return create_index(connection, model_index(CheckRun, "ix_checkrun_run_at"))
+
+
+MIGRATIONS: List[Migration] = [
+    Migration("dataset_append_only", lambda connection: add_column(connection, Dataset, "append_only", "false")),
+    Migration(
+        "dataset_check_interval_seconds", lambda connection: add_column(connection, Dataset, "check_interval_seconds")
+    ),
+    Migration("checkrun_fingerprint", lambda connection: add_column(connection, CheckRun, "fingerprint")),
+    Migration("checkrun_unchanged", lambda connection: add_column(connection, CheckRun, "unchanged", "false")),
+    Migration("incident_last_seen_at", _fill_incident_last_seen),
+    Migration(
+        "incident_occurrence_count", lambda connection: add_column(connection, Incident, "occurrence_count", "1")
+    ),
+    Migration("incident_resolved", lambda connection: add_column(connection, Incident, "resolved", "false")),
+    Migration("incident_resolved_at", lambda connection: add_column(connection, Incident, "resolved_at")),
+    Migration("incident_open_rule_index", _create_open_incident_index),
+    Migration("incident_keyset_indexes", _create_incident_keyset_indexes),
+    Migration("checkrun_run_at_index", _create_checkrun_run_at_index),
+]
+
+
+def upgrade(engine: Engine) -> List[str]:
+    """Apply the missing migrations, each in its own transaction, and return their names."""
+
+    applied: List[str] = []
+    for migration in MIGRATIONS:
+        with engine.begin() as connection:
+            if migration.apply(connection):
+                applied.append(migration.name)
+                logger.info("schema_migration_applied", migration=migration.name)
+    return applied
+
+
+if __name__ == "__main__":
+    from app.core.logging import configure_logging
+    from app.db.session import init_db
+
+    configure_logging()
+    init_db()
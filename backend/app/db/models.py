@@ -8,11 +8,15 @@ raised when rules are violated.
 For brevity, relationships are kept simple; foreign keys are defined but
 explicit relationship attributes are omitted unless used. SQLModel supports
 declarative relationships if needed.
+
+Changes to existing tables (new columns and indexes) must also be added to
+`migrations`, since `create_all` only creates missing tables.
 """
 
 from datetime import datetime
 from typing import Any, Dict, Optional
 
+from sqlalchemy import Index, text
 from sqlmodel import Field, SQLModel
 
 
@@ -34,6 +38,8 @@ class Dataset(SQLModel, table=True):
     name: str = Field(index=True, unique=True)
     description: Optional[str] = None
     owner_id: int = Field(foreign_key="user.id")
+    append_only: bool = Field(default=False)  # producers only append rows to the file
+    check_interval_seconds: Optional[int] = None  # None uses the job's --interval
     created_at: datetime = Field(default_factory=datetime.utcnow)
 
 
@@ -50,27 +56,95 @@ class Rule(SQLModel, table=True):
     created_at: datetime = Field(default_factory=datetime.utcnow)
 
 
+# Condition of an open incident; at most one per (dataset, rule) may be open
+OPEN_INCIDENT = "acknowledged = false AND resolved = false"
+
+
 class Incident(SQLModel, table=True):
-    """Represents a rule violation detected by a quality check."""
+    """Represents a rule violation detected by a quality check.
+
+    Repeated failures of a rule update its open incident (`last_seen_at`,
+    `occurrence_count` and the latest metric) instead of adding rows. A new
+    incident opens once the previous one is acknowledged or resolved, which
+    happens when the rule passes again.
+    """
+
+    __table_args__ = (
+        Index(
+            "ix_incident_open_rule",
+            "dataset_id",
+            "rule_id",
+            unique=True,
+            postgresql_where=text(OPEN_INCIDENT),
+            sqlite_where=text(OPEN_INCIDENT),
+        ),
+        # Keyset pagination orders by (created_at, id); one index per filter.
+        # A rule has few incidents (one open at a time), so rule filters
+        # combined with others are served well enough by the rule index.
+        Index("ix_incident_created", "created_at", "id"),
+        Index("ix_incident_dataset_created", "dataset_id", "created_at", "id"),
+        Index("ix_incident_rule_created", "rule_id", "created_at", "id"),
+        Index("ix_incident_status_created", "acknowledged", "resolved", "created_at", "id"),
+        Index("ix_incident_dataset_status_created", "dataset_id", "acknowledged", "resolved", "created_at", "id"),
+    )
 
     id: Optional[int] = Field(default=None, primary_key=True)
     dataset_id: int = Field(foreign_key="dataset.id")
     rule_id: int = Field(foreign_key="rule.id")
     created_at: datetime = Field(default_factory=datetime.utcnow)
+    last_seen_at: datetime = Field(default_factory=datetime.utcnow)
+    occurrence_count: int = Field(default=1)
     metric_value: float
     passed: bool = Field(default=False)
     severity: str
     description: str
     acknowledged: bool = Field(default=False)
+    resolved: bool = Field(default=False)
+    resolved_at: Optional[datetime] = None
 
 
 class CheckRun(SQLModel, table=True):
     """Capture metrics from a single run of quality checks for a dataset."""
 
+    # Retention removes runs by age
+    __table_args__ = (Index("ix_checkrun_run_at", "run_at"),)
+
     id: Optional[int] = Field(default=None, primary_key=True)
     dataset_id: int = Field(foreign_key="dataset.id")
     run_at: datetime = Field(default_factory=datetime.utcnow)
     metrics: Dict[str, Any] = Field(sa_column_kwargs={"type_": "JSON"})
+    fingerprint: Optional[str] = None  # dataset contents and enabled rule definitions
+    unchanged: bool = Field(default=False)  # metrics reused, only time-dependent rules re-run
+
+
+class MetricPoint(SQLModel, table=True):
+    """One rule metric observed by a check run, the raw level of the metric series."""
+
+    __table_args__ = (Index("ix_metricpoint_rule_ts", "rule_id", "ts"),)
+
+    id: Optional[int] = Field(default=None, primary_key=True)
+    dataset_id: int = Field(foreign_key="dataset.id")
+    rule_id: int = Field(foreign_key="rule.id")
+    ts: datetime = Field(default_factory=datetime.utcnow)
+    value: float
+    passed: bool
+
+
+class MetricRollup(SQLModel, table=True):
+    """Aggregate of a rule's metric points over one hour or day bucket."""
+
+    __table_args__ = (Index("ix_metricrollup_rule_bucket", "rule_id", "resolution", "bucket_start", unique=True),)
+
+    id: Optional[int] = Field(default=None, primary_key=True)
+    dataset_id: int = Field(foreign_key="dataset.id")
+    rule_id: int = Field(foreign_key="rule.id")
+    resolution: str  # hour, day
+    bucket_start: datetime
+    count: int
+    min: float
+    max: float
+    sum: float  # kept instead of the mean so buckets can be merged
+    failed_count: int
 
 
 class SchemaVersion(SQLModel, table=True):
@@ -83,6 +157,38 @@ class SchemaVersion(SQLModel, table=True):
     created_at: datetime = Field(default_factory=datetime.utcnow)
 
 
+class ColumnStatistics(SQLModel, table=True):
+    """Running aggregates of a dataset column, updated from appended rows only."""
+
+    id: Optional[int] = Field(default=None, primary_key=True)
+    dataset_id: int = Field(foreign_key="dataset.id", index=True)
+    column_name: str
+    row_count: int = Field(default=0)
+    null_count: int = Field(default=0)
+    mean: float = Field(default=0.0)  # of the numeric values
+    m2: float = Field(default=0.0)  # sum of squared deviations from the mean
+    min: Optional[float] = None
+    max: Optional[float] = None
+    outlier_count: int = Field(default=0)
+    max_ts: Optional[datetime] = None  # naive UTC
+    tracks_timestamp: bool = Field(default=False)
+    updated_at: datetime = Field(default_factory=datetime.utcnow)
+
+
+class DatasetCheckpoint(SQLModel, table=True):
+    """Position up to which an append-only dataset file has been read."""
+
+    id: Optional[int] = Field(default=None, primary_key=True)
+    dataset_id: int = Field(foreign_key="dataset.id", index=True, unique=True)
+    byte_offset: int = Field(default=0)
+    row_offset: int = Field(default=0)
+    file_size: int = Field(default=0)
+    file_mtime: float = Field(default=0.0)  # with file_size, tells whether the file changed since the last read
+    header_hash: str = Field(default="")
+    tail_hash: str = Field(default="")  # hash of the bytes just before byte_offset
+    updated_at: datetime = Field(default_factory=datetime.utcnow)
+
+
 class Acknowledgement(SQLModel, table=True):
     """Track when incidents are acknowledged by users."""
 
@@ -41,6 +41,7 @@ def seed_data(session: Session) -> None:
             name=dataset_name,
             description="Synthetic sample dataset for demos and tests",
             owner_id=owner.id,
+            append_only=True,
         )
         session.add(dataset)
         session.commit()
@@ -1,22 +1,77 @@
 """Database session and engine initialisation.
 
 This module encapsulates the SQLModel engine and session creation for use
-throughout the application. It exposes a dependency for FastAPI endpoints to
-obtain a session with proper lifecycle management.
+throughout the application. It exposes dependencies for FastAPI endpoints to
+obtain a session with proper lifecycle management, and a context manager for
+jobs and scripts.
+
+Pool sizing, pre-ping and recycling come from `Settings`. With
+`db_async_enabled` the read-heavy endpoints use an `AsyncSession` on an async
+engine (asyncpg or aiosqlite, both in requirements.txt), so a single worker
+can serve many concurrent reads without exhausting the threadpool. Otherwise
+they run the same queries on a sync session in the threadpool.
 """
 
 from contextlib import contextmanager
-from typing import Generator
+from typing import TYPE_CHECKING, Any, AsyncGenerator, Dict, Generator, Iterator, List, Optional, Protocol
 
+from sqlalchemy.engine import URL, make_url
 from sqlmodel import Session, SQLModel, create_engine
+from starlette.concurrency import run_in_threadpool
 
 from app.core.config import settings
+from app.db.migrations import upgrade
 
 
-# Create the SQLModel engine using the configured database URL. By default this
-# uses a synchronous engine, which is sufficient for the current scope. For
-# production workloads an asynchronous engine could be considered.
-engine = create_engine(settings.database_url, echo=False)
+_SYNC_DRIVERS = {"postgresql": "psycopg2", "sqlite": "pysqlite"}
+_ASYNC_DRIVERS = {"postgresql": "asyncpg", "sqlite": "aiosqlite"}
+
+
+def _database_url(drivers: Dict[str, str], async_driver: bool) -> URL:
+    """Return the configured URL, switching to a sync or async driver if needed."""
+
+    url = make_url(settings.database_url)
+    backend = url.get_backend_name()
+    is_async = url.get_driver_name() in _ASYNC_DRIVERS.values()
+    if backend in drivers and is_async != async_driver:
+        url = url.set(drivername=f"{backend}+{drivers[backend]}")
+    return url
+
+
+def _engine_options(url: URL) -> Dict[str, Any]:
+    options: Dict[str, Any] = {"echo": False, "pool_pre_ping": settings.db_pool_pre_ping}
+    if url.get_backend_name() != "sqlite":
+        # SQLite uses a single-connection or static pool that cannot be sized
+        options.update(
+            pool_size=settings.db_pool_size,
+            max_overflow=settings.db_max_overflow,
+            pool_recycle=settings.db_pool_recycle,
+        )
+    return options
+
+
+_sync_url = _database_url(_SYNC_DRIVERS, async_driver=False)
+engine = create_engine(_sync_url, **_engine_options(_sync_url))
+_async_engine: Optional["AsyncEngine"] = None
+
+if TYPE_CHECKING:
+    from sqlalchemy.ext.asyncio import AsyncEngine
+
+
+def get_async_engine() -> "AsyncEngine":
+    """Return the async engine, created on first use.
+
+    The asyncio extension (greenlet) and the async driver are only imported
+    here, so deployments without `db_async_enabled` do not need them.
+    """
+
+    from sqlalchemy.ext.asyncio import create_async_engine
+
+    global _async_engine
+    if _async_engine is None:
+        url = _database_url(_ASYNC_DRIVERS, async_driver=True)
+        _async_engine = create_async_engine(url, **_engine_options(url))
+    return _async_engine
 
 
 def init_db() -> None:
@@ -24,27 +79,29 @@ def init_db() -> None:
 
     This function should be called at application start-up. It will ensure
     that all SQLModel models registered with the metadata have their tables
-    created in the target database. In a production system you would use
-    alembic or another migration tool instead of auto-creating tables.
+    created in the target database, then applies the column and index
+    changes `create_all` does not make to existing tables (see
+    `migrations`). In a production system you would use alembic or another
+    migration tool instead of auto-creating tables.
     """
 
     SQLModel.metadata.create_all(engine)
+    upgrade(engine)
 
 
 @contextmanager
 def get_session() -> Generator[Session, None, None]:
     """Yield a new database session within a context manager.
 
-    This function is designed to be used as a dependency in FastAPI routes:
+    Intended for jobs and scripts:
 
     ```python
-    @app.get("/datasets")
-    def read_datasets(*, session: Session = Depends(get_session)):
+    with get_session() as session:
         ...
     ```
 
-    It will open a session at the beginning of the request and commit/close
-    it automatically when the request finishes.
+    The session is committed when the block succeeds, rolled back when it
+    raises and closed in both cases.
     """
 
     session = Session(engine)
@@ -55,4 +112,85 @@ def get_session() -> Generator[Session, None, None]:
         session.rollback()
         raise
     finally:
-        session.close()
\ No newline at end of file
+        session.close()
+
+
+def get_db() -> Generator[Session, None, None]:
+    """FastAPI dependency yielding a session that lives for one request.
+
+    ```python
+    @app.get("/datasets")
+    def read_datasets(*, session: Session = Depends(get_db)):
+        ...
+    ```
+
+    Endpoints commit explicitly; anything left uncommitted is rolled back
+    when the session is closed after the response.
+    """
+
+    with Session(engine) as session:
+        yield session
+
+
+class BufferedResult:
+    """Rows fetched in a worker thread, with the `Result` methods endpoints use."""
+
+    def __init__(self, rows: List[Any]) -> None:
+        self.rows = rows
+
+    def all(self) -> List[Any]:
+        return self.rows
+
+    def first(self) -> Any:
+        return self.rows[0] if self.rows else None
+
+    def __iter__(self) -> Iterator[Any]:
+        return iter(self.rows)
+
+
+class ThreadedSession:
+    """Awaitable read-only facade running a sync session in the threadpool.
+
+    Exposes the `exec`/`get` subset of `AsyncSession` used by read endpoints,
+    so they can be written once for both engines.
+    """
+
+    def __init__(self, session: Session) -> None:
+        self.session = session
+
+    async def exec(self, statement: Any) -> BufferedResult:
+        # Fetch the rows in the worker thread, like AsyncSession buffers them
+        return BufferedResult(await run_in_threadpool(lambda: self.session.exec(statement).all()))
+
+    async def get(self, model: Any, ident: Any) -> Any:
+        return await run_in_threadpool(self.session.get, model, ident)
+
+
+class ReadSession(Protocol):
+    """Session interface of read endpoints, met by `AsyncSession` and `ThreadedSession`."""
+
+    async def exec(self, statement: Any) -> Any:
+        ...
+
+    async def get(self, model: Any, ident: Any) -> Any:
+        ...
+
+
+async def get_read_session() -> AsyncGenerator[ReadSession, None]:
+    """FastAPI dependency for read-only endpoints, scoped to one request.
+
+    Yields an `AsyncSession` when `db_async_enabled` is set, otherwise a
+    `ThreadedSession` over a sync session.
+    """
+
+    if settings.db_async_enabled:
+        from sqlmodel.ext.asyncio.session import AsyncSession
+
+        async with AsyncSession(get_async_engine(), expire_on_commit=False) as session:
+            yield session
+    else:
+        session = Session(engine)
+        try:
+            yield ThreadedSession(session)
+        finally:
+            await run_in_threadpool(session.close)
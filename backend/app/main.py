@@ -2,19 +2,20 @@
 
 This module constructs the FastAPI app, configures global middleware for
 CORS, logging and metrics, mounts the API routers and the Prometheus metrics
-endpoint. The application is ready to be run with Uvicorn.
+endpoint. The application is ready to be run with Uvicorn; with several
+workers set `PROMETHEUS_MULTIPROC_DIR` so `/metrics` reports all of them.
 """
 
 from fastapi import FastAPI
 from fastapi.middleware.cors import CORSMiddleware
-from fastapi.middleware.base import BaseHTTPMiddleware
 from prometheus_client import make_asgi_app
 
 from app.api import api_router
 from app.core.config import settings
 from app.core.logging import configure_logging
+from app.core.pagination import NEXT_CURSOR_HEADER
 from app.db.session import init_db
-from app.telemetry.metrics import metrics_middleware
+from app.telemetry.metrics import MetricsMiddleware, metrics_registry
 
 
 def create_app() -> FastAPI:
@@ -34,13 +35,14 @@ def create_app() -> FastAPI:
         allow_credentials=True,
         allow_methods=["*"],
         allow_headers=["*"],
+        expose_headers=[NEXT_CURSOR_HEADER],
     )
     # Metrics middleware
-    app.add_middleware(BaseHTTPMiddleware, dispatch=metrics_middleware)
+    app.add_middleware(MetricsMiddleware)
     # Include routers
     app.include_router(api_router)
     # Mount Prometheus metrics as a separate ASGI app
-    metrics_app = make_asgi_app()
+    metrics_app = make_asgi_app(metrics_registry())
     app.mount("/metrics", metrics_app)
     return app
 
@@ -5,7 +5,7 @@ include additional validation and transformation logic where appropriate.
 """
 
 from datetime import datetime
-from typing import Any, Dict, Optional
+from typing import Any, Dict, List, Optional
 
 from pydantic import BaseModel, EmailStr, Field
 
@@ -43,6 +43,8 @@ class UserRead(UserBase):
 class DatasetBase(BaseModel):
     name: str
     description: Optional[str] = None
+    append_only: bool = False
+    check_interval_seconds: Optional[int] = Field(default=None, gt=0)
 
 
 class DatasetCreate(DatasetBase):
@@ -84,15 +86,34 @@ class IncidentRead(BaseModel):
     dataset_id: int
     rule_id: int
     created_at: datetime
+    last_seen_at: datetime
+    occurrence_count: int
     metric_value: float
     passed: bool
     severity: str
     description: str
     acknowledged: bool
+    resolved: bool
+    resolved_at: Optional[datetime] = None
 
     class Config:
         orm_mode = True
 
 
+class MetricBucketRead(BaseModel):
+    ts: datetime
+    count: int
+    min: float
+    max: float
+    mean: float
+    failed_count: int
+
+
+class MetricSeriesRead(BaseModel):
+    rule_id: int
+    resolution: str
+    points: List[MetricBucketRead]
+
+
 class AcknowledgementCreate(BaseModel):
     comment: Optional[str] = None
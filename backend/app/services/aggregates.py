@@ -0,0 +1,205 @@
+"""Shared column aggregates used to evaluate data quality rules.
+
+Rule evaluators declare the aggregates they need on an `AggregateRequest`;
+`compute_aggregates` then computes each requested aggregate once per column
+and returns a `FrameAggregates` that every evaluator derives its result from.
+`ColumnPartial` computes the same aggregates from chunks of rows and merges
+them, for datasets evaluated without loading them whole.
+"""
+
+import math
+from concurrent.futures import ThreadPoolExecutor
+from dataclasses import dataclass, field
+from typing import Any, Dict, Iterable, Set, Tuple
+
+import numpy as np
+import pandas as pd
+
+
+# Names of the per-column aggregates understood by `compute_aggregates`
+NULL_COUNT = "null_count"
+MEAN = "mean"
+OUTLIER_COUNT = "outlier_count"
+VALID_COUNT = "valid_count"
+MAX_TIMESTAMP = "max_ts"
+LAST_TIMESTAMP = "last_ts"
+
+
+@dataclass
+class AggregateRequest:
+    """Aggregates required to evaluate a set of rules against one dataset."""
+
+    column_aggregates: Dict[str, Set[str]] = field(default_factory=dict)
+    key_sets: Set[Tuple[str, ...]] = field(default_factory=set)
+
+    def require(self, column: str, *aggregates: str) -> None:
+        self.column_aggregates.setdefault(column, set()).update(aggregates)
+
+    def require_keys(self, keys: Iterable[str]) -> None:
+        self.key_sets.add(tuple(keys))
+
+
+@dataclass
+class FrameAggregates:
+    """Aggregates computed once over a DataFrame and shared between rules.
+
+    `columns` only contains entries for columns present in the frame, so a
+    rule can detect a missing column by its absence.
+    """
+
+    row_count: int
+    columns: Dict[str, Dict[str, Any]] = field(default_factory=dict)
+    duplicates: Dict[Tuple[str, ...], int] = field(default_factory=dict)
+
+
+def _column_aggregates(series: pd.Series, needed: Set[str]) -> Dict[str, Any]:
+    values: Dict[str, Any] = {}
+    if needed & {NULL_COUNT, MEAN, VALID_COUNT, OUTLIER_COUNT}:
+        null_mask = series.isna()
+        values[NULL_COUNT] = int(null_mask.sum())
+        valid = series[~null_mask]
+        values[VALID_COUNT] = len(valid)
+        if needed & {MEAN, OUTLIER_COUNT}:
+            mean = valid.mean()
+            values[MEAN] = mean
+        if OUTLIER_COUNT in needed and len(valid):
+            z_scores = np.abs((valid - mean) / valid.std(ddof=0))
+            values[OUTLIER_COUNT] = int((z_scores > 3).sum())
+    if MAX_TIMESTAMP in needed:
+        values[MAX_TIMESTAMP] = pd.to_datetime(series).max()
+    if LAST_TIMESTAMP in needed:
+        values[LAST_TIMESTAMP] = last_timestamp(series)
+    return values
+
+
+def compute_aggregates(df: pd.DataFrame, request: AggregateRequest, workers: int = 1) -> FrameAggregates:
+    """Compute every aggregate in `request` with a single pass per column.
+
+    With `workers > 1` the columns and key sets are computed concurrently on
+    a thread pool sharing `df`; the pandas/NumPy reductions release the GIL
+    for most of their work. The result does not depend on `workers`.
+    """
+
+    aggregates = FrameAggregates(row_count=len(df))
+    columns = [(c, needed) for c, needed in request.column_aggregates.items() if c in df.columns]
+    key_sets = [keys for keys in request.key_sets if all(k in df.columns for k in keys)]
+
+    def column_task(item: Tuple[str, Set[str]]) -> Dict[str, Any]:
+        return _column_aggregates(df[item[0]], item[1])
+
+    def key_task(keys: Tuple[str, ...]) -> int:
+        return int(df.duplicated(subset=list(keys)).sum())
+
+    if workers > 1 and len(columns) + len(key_sets) > 1:
+        with ThreadPoolExecutor(max_workers=workers) as executor:
+            # Submit every task before waiting so key sets overlap with columns
+            column_futures = [executor.submit(column_task, item) for item in columns]
+            key_futures = [executor.submit(key_task, keys) for keys in key_sets]
+            column_values = [future.result() for future in column_futures]
+            duplicates = [future.result() for future in key_futures]
+    else:
+        column_values = [column_task(item) for item in columns]
+        duplicates = [key_task(keys) for keys in key_sets]
+    for (column, _), values in zip(columns, column_values):
+        aggregates.columns[column] = values
+    for keys, count in zip(key_sets, duplicates):
+        aggregates.duplicates[keys] = count
+    return aggregates
+
+
+def last_timestamp(series: pd.Series) -> Any:
+    """Parse only the last valid value of a column, or NaT when there is none."""
+
+    index = series.last_valid_index()
+    if index is None:
+        return pd.NaT
+    return pd.to_datetime(series.loc[[index]]).iloc[0]
+
+
+@dataclass
+class ColumnPartial:
+    """Mergeable partial aggregates of one column.
+
+    Counts and the newest timestamp merge by addition and max, the last
+    timestamp is taken from the later partial; the mean and
+    sum of squared deviations (`m2`) merge with Chan's parallel algorithm.
+    Outliers need the final mean and standard deviation, so they are counted
+    in a second pass with `count_outliers`.
+    """
+
+    null_count: int = 0
+    valid_count: int = 0
+    numeric_count: int = 0
+    mean: float = 0.0
+    m2: float = 0.0
+    max_ts: Any = None
+    last_ts: Any = None
+    outlier_count: int = 0
+
+    def update(self, series: pd.Series, needed: Set[str]) -> None:
+        """Fold a chunk of column values into the partial aggregates."""
+
+        null_mask = series.isna()
+        valid = series[~null_mask]
+        chunk = ColumnPartial(null_count=int(null_mask.sum()), valid_count=len(valid))
+        if needed & {MEAN, OUTLIER_COUNT} and len(valid) and pd.api.types.is_numeric_dtype(valid):
+            values = valid.to_numpy(dtype=np.float64)
+            chunk.numeric_count = len(values)
+            chunk.mean = float(values.mean())
+            chunk.m2 = float(np.square(values - chunk.mean).sum())
+        if MAX_TIMESTAMP in needed:
+            chunk.max_ts = pd.to_datetime(series).max()
+        if LAST_TIMESTAMP in needed:
+            chunk.last_ts = last_timestamp(series)
+        self.merge(chunk)
+
+    def merge(self, other: "ColumnPartial") -> None:
+        """Merge another partial of the same column into this one."""
+
+        self.null_count += other.null_count
+        self.valid_count += other.valid_count
+        total = self.numeric_count + other.numeric_count
+        if other.numeric_count:
+            delta = other.mean - self.mean
+            self.mean += delta * other.numeric_count / total
+            self.m2 += other.m2 + delta * delta * self.numeric_count * other.numeric_count / total
+        self.numeric_count = total
+        if other.max_ts is not None and not pd.isna(other.max_ts):
+            if self.max_ts is None or other.max_ts > self.max_ts:
+                self.max_ts = other.max_ts
+        if other.last_ts is not None and not pd.isna(other.last_ts):
+            self.last_ts = other.last_ts
+        self.outlier_count += other.outlier_count
+
+    @property
+    def std(self) -> float:
+        return math.sqrt(self.m2 / self.numeric_count) if self.numeric_count else float("nan")
+
+    def count_outliers(self, series: pd.Series) -> None:
+        """Add the values of a chunk whose z-score against the final mean exceeds 3."""
+
+        valid = series.dropna()
+        if len(valid) and self.numeric_count:
+            z_scores = np.abs((valid.to_numpy(dtype=np.float64) - self.mean) / self.std)
+            self.outlier_count += int((z_scores > 3).sum())
+
+    def values(self, needed: Set[str]) -> Dict[str, Any]:
+        """Return the aggregates in the form stored on `FrameAggregates`."""
+
+        result: Dict[str, Any] = {
+            NULL_COUNT: self.null_count,
+            VALID_COUNT: self.valid_count,
+            MEAN: self.mean if self.numeric_count else float("nan"),
+            OUTLIER_COUNT: self.outlier_count,
+        }
+        if MAX_TIMESTAMP in needed:
+            result[MAX_TIMESTAMP] = self.max_ts if self.max_ts is not None else pd.NaT
+        if LAST_TIMESTAMP in needed:
+            result[LAST_TIMESTAMP] = self.last_ts if self.last_ts is not None else pd.NaT
+        return result
+
+
+def ratio(count: int, total: int) -> float:
+    """Return `count / total`, mirroring pandas' `.mean()` on an empty series."""
+
+    return count / total if total else float("nan")
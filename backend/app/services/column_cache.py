@@ -0,0 +1,198 @@
+"""Persistent columnar cache of parsed CSV datasets.
+
+Parsing CSV text, including dtype inference and timestamp parsing, dominates
+the cost of loading a dataset, while most files do not change between two
+runs. `ColumnCache` stores each parsed column as a `.npy` file keyed by the
+source file's path, size and modification time, so later loads memory-map
+just the columns they need instead of parsing again. Columns are cached
+individually: a load that needs columns not cached yet parses only those.
+
+Numeric, boolean and datetime columns are stored as-is. String columns are
+stored as fixed-width unicode arrays with a separate null mask, categorical
+columns as codes plus their categories. Columns of mixed Python objects are
+parsed on every load. When a `TypedSchema` is given, missing columns are
+parsed with its dtypes and cached separately from untyped parses. Parsed
+columns are converted to compact dtypes (`compact_series`) before they are
+stored, and loads return them in those dtypes.
+"""
+
+import hashlib
+import json
+import os
+import shutil
+import tempfile
+from pathlib import Path
+from typing import Any, Collection, Dict, List, Optional
+
+import numpy as np
+import pandas as pd
+
+from app.core.config import settings
+from app.core.logging import get_logger
+from app.services.typed_schema import TypedSchema, compact_series
+
+
+logger = get_logger(__name__)
+
+_HEADER = "header.json"
+
+
+def file_fingerprint(file_path: Path) -> str:
+    """Return a fingerprint of a file built from its path, size and mtime."""
+
+    stat = os.stat(file_path)
+    return hashlib.sha1(f"{Path(file_path).resolve()}:{stat.st_size}:{stat.st_mtime_ns}".encode()).hexdigest()
+
+
+def _encode_column(series: pd.Series) -> Optional[Dict[str, Any]]:
+    """Return the arrays and metadata needed to store a column, or None."""
+
+    dtype = series.dtype
+    if isinstance(dtype, pd.DatetimeTZDtype):
+        return {"kind": "datetime", "tz": str(dtype.tz), "values": series.dt.tz_convert(None).to_numpy()}
+    if pd.api.types.is_datetime64_dtype(dtype):
+        return {"kind": "datetime", "tz": None, "values": series.to_numpy()}
+    if isinstance(dtype, np.dtype) and dtype.kind in "biuf":
+        return {"kind": "numpy", "values": series.to_numpy()}
+    if isinstance(dtype, pd.CategoricalDtype):
+        categories = dtype.categories
+        if pd.api.types.infer_dtype(categories, skipna=True) not in {"string", "empty"}:
+            return None
+        return {"kind": "category", "values": series.cat.codes.to_numpy(), "categories": categories.to_numpy(dtype=str)}
+    if pd.api.types.infer_dtype(series, skipna=True) in {"string", "empty"}:
+        nulls = series.isna().to_numpy()
+        values = series.where(~nulls, "").to_numpy(dtype=str)
+        return {"kind": "string", "values": values, "nulls": nulls}
+    return None
+
+
+def _atomic_write(path: Path, write: Any) -> None:
+    fd, staging = tempfile.mkstemp(dir=path.parent, prefix=".staging-")
+    try:
+        with os.fdopen(fd, "wb") as f:
+            write(f)
+        os.replace(staging, path)
+    except BaseException:
+        os.unlink(staging)
+        raise
+
+
+class ColumnCache:
+    """On-disk cache of parsed datasets, one memory-mapped file per column."""
+
+    def __init__(self, root: Path) -> None:
+        self.root = root
+
+    def _entry_dir(self, file_path: Path) -> Path:
+        return self.root / hashlib.sha1(str(Path(file_path).resolve()).encode()).hexdigest()
+
+    def _column_stem(self, directory: Path, name: str) -> Path:
+        return directory / hashlib.sha1(name.encode()).hexdigest()
+
+    def _load_column(self, directory: Path, name: str) -> Optional[pd.Series]:
+        stem = self._column_stem(directory, name)
+        try:
+            # The metadata file is written last and marks the column complete
+            meta = json.loads(stem.with_suffix(".json").read_text())
+            values = np.load(stem.with_suffix(".npy"), mmap_mode="r")
+            if meta["kind"] == "string":
+                nulls = np.load(stem.with_suffix(".nulls.npy"), mmap_mode="r")
+            if meta["kind"] == "category":
+                categories = np.load(stem.with_suffix(".categories.npy"))
+        except (OSError, ValueError):
+            return None
+        if meta["kind"] == "datetime":
+            series = pd.Series(values, name=name, copy=False)
+            return series.dt.tz_localize(meta["tz"]) if meta["tz"] else series
+        if meta["kind"] == "string":
+            objects = values.astype(object)
+            objects[nulls] = np.nan
+            return pd.Series(objects, name=name, copy=False)
+        if meta["kind"] == "category":
+            return pd.Series(pd.Categorical.from_codes(values, categories.astype(object)), name=name)
+        return pd.Series(values, name=name, copy=False)
+
+    def _store_column(self, directory: Path, series: pd.Series) -> bool:
+        column = _encode_column(series)
+        if column is None:
+            return False
+        stem = self._column_stem(directory, str(series.name))
+        _atomic_write(stem.with_suffix(".npy"), lambda f: np.save(f, column["values"], allow_pickle=False))
+        if column["kind"] == "string":
+            _atomic_write(stem.with_suffix(".nulls.npy"), lambda f: np.save(f, column["nulls"], allow_pickle=False))
+        if column["kind"] == "category":
+            categories = column["categories"]
+            _atomic_write(stem.with_suffix(".categories.npy"), lambda f: np.save(f, categories, allow_pickle=False))
+        meta = json.dumps({"kind": column["kind"], "tz": column.get("tz")}).encode()
+        _atomic_write(stem.with_suffix(".json"), lambda f: f.write(meta))
+        return True
+
+    def _prepare(self, file_path: Path, fingerprint: str) -> Path:
+        """Create the directory for the current contents and drop stale entries."""
+
+        entry_dir = self._entry_dir(file_path)
+        directory = entry_dir / fingerprint
+        if not directory.exists():
+            directory.mkdir(parents=True, exist_ok=True)
+            for stale in entry_dir.iterdir():
+                if stale.name != fingerprint:
+                    shutil.rmtree(stale, ignore_errors=True)
+        return directory
+
+    def read_csv(
+        self, file_path: Path, columns: Optional[Collection[str]] = None, schema: Optional[TypedSchema] = None
+    ) -> pd.DataFrame:
+        """Load a CSV file through the cache.
+
+        Only `columns` (all columns when None) are loaded, in file order;
+        names not present in the file are ignored. Columns missing from the
+        cache are parsed with `usecols` and cached for the next load.
+        Raises `SchemaMismatch` when they do not fit `schema`.
+        """
+
+        fingerprint = file_fingerprint(file_path)
+        if schema is not None:
+            fingerprint = f"{fingerprint}-{schema.key}"
+        directory = self._entry_dir(file_path) / fingerprint
+        try:
+            header = json.loads((directory / _HEADER).read_text())
+        except (OSError, ValueError):
+            header = {"columns": list(pd.read_csv(file_path, nrows=0).columns), "rows": None}
+        selected = set(header["columns"] if columns is None else columns)
+        wanted = [c for c in header["columns"] if c in selected]
+        loaded: Dict[str, pd.Series] = {}
+        missing: List[str] = []
+        for name in wanted:
+            series = self._load_column(directory, name)
+            if series is None:
+                missing.append(name)
+            else:
+                loaded[name] = series
+        if missing or header["rows"] is None:
+            usecols = missing or header["columns"][:1]
+            parsed = (schema.read_csv if schema else pd.read_csv)(file_path, usecols=usecols)
+            header["rows"] = len(parsed)
+            for name in missing:
+                loaded[name] = compact_series(parsed[name])
+            try:
+                if fingerprint.startswith(file_fingerprint(file_path)):
+                    directory = self._prepare(file_path, fingerprint)
+                    for name in missing:
+                        self._store_column(directory, loaded[name])
+                    encoded = json.dumps(header).encode()
+                    _atomic_write(directory / _HEADER, lambda f: f.write(encoded))
+            except OSError as exc:
+                logger.warning("dataset_cache_write_failed", path=str(file_path), error=str(exc))
+        frame = pd.DataFrame({name: loaded[name] for name in wanted}, copy=False)
+        if not wanted:
+            frame.index = pd.RangeIndex(header["rows"])
+        return frame
+
+
+def default_cache() -> Optional[ColumnCache]:
+    """Return the cache configured in `Settings`, or None when disabled."""
+
+    if not settings.dataset_cache_enabled:
+        return None
+    root = settings.dataset_cache_dir or os.path.join(tempfile.gettempdir(), "idqp-dataset-cache")
+    return ColumnCache(Path(root))
@@ -0,0 +1,50 @@
+"""Fast path for freshness checks on monotonic timestamp columns.
+
+Freshness is the most frequently scheduled rule and only needs the newest
+timestamp of a column. When every rule of a plan is a freshness rule on a
+column declared `monotonic`, the newest timestamp is the last valid value in
+the file, so `tail_aggregates` parses only the end of the file. The window
+starts at `Settings.freshness_tail_bytes` and doubles until every column has a
+valid value or the whole file was read.
+
+Append-only datasets with non-monotonic freshness rules use the running
+maximum kept in `ColumnStatistics` instead (see `incremental_stats`); all
+other datasets fall back to parsing the column.
+"""
+
+from pathlib import Path
+
+import pandas as pd
+
+from app.core.config import settings
+from app.services.aggregates import LAST_TIMESTAMP, FrameAggregates, compute_aggregates
+from app.services.rule_engine import RulePlan
+from app.services.tail_reader import read_tail
+
+
+def supports_tail(plan: RulePlan) -> bool:
+    """Return whether every rule in `plan` only needs the last timestamp of columns."""
+
+    request = plan.aggregates
+    return (
+        bool(plan.evaluators)
+        and plan.shares_aggregates
+        and not request.key_sets
+        and all(needed == {LAST_TIMESTAMP} for needed in request.column_aggregates.values())
+    )
+
+
+def tail_aggregates(file_path: Path, plan: RulePlan) -> FrameAggregates:
+    """Compute the last timestamps of a plan's columns from the end of the file.
+
+    `row_count` of the result is the number of rows read, not of the file.
+    """
+
+    wanted = set(plan.aggregates.column_aggregates)
+    tail_bytes = settings.freshness_tail_bytes
+    while True:
+        frame, whole_file = read_tail(file_path, tail_bytes, usecols=lambda name: name in wanted)
+        aggregates = compute_aggregates(frame, plan.aggregates)
+        if whole_file or not any(pd.isna(values[LAST_TIMESTAMP]) for values in aggregates.columns.values()):
+            return aggregates
+        tail_bytes *= 2
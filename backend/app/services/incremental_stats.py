@@ -0,0 +1,144 @@
+"""Incremental column statistics for append-only datasets.
+
+Datasets flagged `append_only` only ever grow at the end of the file, so the
+sufficient statistics needed by most rules (row and null counts, mean, sum
+of squared deviations, min/max and the newest timestamp) can be kept in
+`ColumnStatistics` rows and updated from the newly appended rows alone. The
+mean and squared deviations are merged with Chan's algorithm (see
+`ColumnPartial`), which stays accurate for large-magnitude columns.
+`state_aggregates` turns the rows back into the `FrameAggregates` rule
+evaluators derive from.
+
+The outlier count is approximate. Each appended value is scored once, against
+the running mean and standard deviation of all rows up to and including its
+batch, and is never scored again as later rows move them. The full-file rule
+scores every value against the statistics of the whole column, so the two
+agree exactly only when the state was built in a single run.
+"""
+
+from datetime import datetime
+from typing import Dict, Iterable
+
+import numpy as np
+import pandas as pd
+from sqlmodel import Session, select
+
+from app.db.models import ColumnStatistics, Dataset
+from app.services.aggregates import (
+    LAST_TIMESTAMP,
+    MAX_TIMESTAMP,
+    MEAN,
+    NULL_COUNT,
+    OUTLIER_COUNT,
+    VALID_COUNT,
+    AggregateRequest,
+    ColumnPartial,
+    FrameAggregates,
+)
+from app.services.rule_engine import RulePlan
+
+
+def supports_plan(plan: RulePlan) -> bool:
+    """Return whether every rule in `plan` can be answered from column statistics."""
+
+    return plan.shares_aggregates and not plan.aggregates.key_sets
+
+
+def load_column_states(
+    session: Session, dataset: Dataset, request: AggregateRequest, columns: Iterable[str]
+) -> Dict[str, ColumnStatistics]:
+    """Return the statistics rows for requested columns present in the dataset.
+
+    Missing rows are created empty. A column that now needs timestamps but was
+    not tracking them is reset so it is rebuilt from the start of the file.
+    """
+
+    present = set(columns)
+    existing = {
+        state.column_name: state
+        for state in session.exec(select(ColumnStatistics).where(ColumnStatistics.dataset_id == dataset.id))
+    }
+    states: Dict[str, ColumnStatistics] = {}
+    for column, needed in request.column_aggregates.items():
+        if column not in present:
+            continue
+        state = existing.get(column)
+        if state is None:
+            state = ColumnStatistics(dataset_id=dataset.id, column_name=column)
+        if needed & {MAX_TIMESTAMP, LAST_TIMESTAMP} and not state.tracks_timestamp:
+            reset_column_state(state)
+            state.tracks_timestamp = True
+        states[column] = state
+    return states
+
+
+def reset_column_state(state: ColumnStatistics) -> None:
+    """Clear the running aggregates so they are rebuilt from the first row."""
+
+    state.row_count = 0
+    state.null_count = 0
+    state.mean = 0.0
+    state.m2 = 0.0
+    state.min = None
+    state.max = None
+    state.outlier_count = 0
+    state.max_ts = None
+
+
+def _partial(state: ColumnStatistics) -> ColumnPartial:
+    valid = state.row_count - state.null_count
+    # Only numeric columns have a min, so it tells whether the mean is tracked
+    numeric = valid if state.min is not None else 0
+    return ColumnPartial(
+        null_count=state.null_count, valid_count=valid, numeric_count=numeric, mean=state.mean, m2=state.m2
+    )
+
+
+def update_column_state(state: ColumnStatistics, series: pd.Series) -> None:
+    """Fold newly appended values of a column into its running aggregates."""
+
+    if series.empty:
+        return
+    valid = series.dropna()
+    partial = _partial(state)
+    numeric_before = partial.numeric_count
+    partial.update(series, {MEAN})
+    state.row_count += len(series)
+    state.null_count = partial.null_count
+    if partial.numeric_count > numeric_before:
+        values = valid.to_numpy(dtype=np.float64)
+        state.mean, state.m2 = partial.mean, partial.m2
+        state.min = float(values.min()) if state.min is None else min(state.min, float(values.min()))
+        state.max = float(values.max()) if state.max is None else max(state.max, float(values.max()))
+        # Score the new values against the statistics including their own batch
+        partial.count_outliers(valid)
+        state.outlier_count += partial.outlier_count
+    if state.tracks_timestamp and len(valid):
+        newest = pd.to_datetime(valid, utc=True).max()
+        if not pd.isna(newest):
+            newest = newest.tz_convert(None).to_pydatetime()
+            state.max_ts = newest if state.max_ts is None else max(state.max_ts, newest)
+    state.updated_at = datetime.utcnow()
+
+
+def state_aggregates(states: Dict[str, ColumnStatistics], row_count: int) -> FrameAggregates:
+    """Build `FrameAggregates` for rule evaluators from column statistics."""
+
+    aggregates = FrameAggregates(row_count=row_count)
+    for column, state in states.items():
+        valid = state.row_count - state.null_count
+        values = {
+            NULL_COUNT: state.null_count,
+            VALID_COUNT: valid,
+            MEAN: state.mean if valid and state.min is not None else float("nan"),
+            OUTLIER_COUNT: state.outlier_count,
+        }
+        if state.max_ts is not None:
+            values[MAX_TIMESTAMP] = pd.Timestamp(state.max_ts, tz="UTC")
+        elif state.tracks_timestamp:
+            values[MAX_TIMESTAMP] = pd.NaT
+        if state.tracks_timestamp:
+            # For a monotonic column the newest timestamp is also the last one
+            values[LAST_TIMESTAMP] = values[MAX_TIMESTAMP]
+        aggregates.columns[column] = values
+    return aggregates
@@ -0,0 +1,232 @@
+"""Rule metric time series with hourly and daily rollups.
+
+Every check run records the metric of each evaluated rule as a `MetricPoint`
+`(rule_id, ts, value, passed)`, indexed by rule and time, so trends do not
+have to parse the JSON metrics of every `CheckRun`. `rollup` folds points
+into hourly `MetricRollup` buckets and hourly buckets into daily ones,
+keeping count, min, max, sum and the number of failures so buckets can be
+merged further.
+
+`query_series` picks a resolution from the length of the requested range so
+the number of buckets returned stays bounded. It reads the rollups and
+aggregates the newest, possibly incomplete, bucket and anything after it
+from raw points. Dashboards therefore read a bounded number of rows however
+long the history is, and still see the latest runs before the rollup job has
+caught up.
+"""
+
+import math
+from dataclasses import dataclass
+from datetime import datetime, timedelta
+from typing import Any, Dict, Iterable, Iterator, List, Optional, Tuple
+
+from sqlalchemy import delete, func, insert
+from sqlmodel import Session, select
+
+from app.db.models import MetricPoint, MetricRollup
+from app.db.session import ReadSession
+
+
+RAW = "raw"
+HOUR = "hour"
+DAY = "day"
+BUCKET_SIZES = {HOUR: timedelta(hours=1), DAY: timedelta(days=1)}
+
+# Ranges up to this long are returned point by point
+RAW_MAX_RANGE = timedelta(days=1)
+# Finest bucket count `query_series` aims for when picking a resolution
+MAX_BUCKETS = 1000
+
+ROLLUP_BATCH_ROWS = 5000
+
+
+def bucket_start(ts: datetime, resolution: str) -> datetime:
+    """Return the start of the hour or day bucket containing `ts`."""
+
+    ts = ts.replace(minute=0, second=0, microsecond=0)
+    return ts.replace(hour=0) if resolution == DAY else ts
+
+
+def pick_resolution(since: datetime, until: datetime) -> str:
+    """Return the finest resolution that keeps a range within `MAX_BUCKETS`."""
+
+    span = until - since
+    if span <= RAW_MAX_RANGE:
+        return RAW
+    if span / BUCKET_SIZES[HOUR] <= MAX_BUCKETS:
+        return HOUR
+    return DAY
+
+
+@dataclass
+class Bucket:
+    """Mergeable aggregate of the metric values falling into one bucket."""
+
+    start: datetime
+    count: int = 0
+    min: float = math.inf
+    max: float = -math.inf
+    sum: float = 0.0
+    failed_count: int = 0
+
+    def add(self, value: float, passed: bool) -> None:
+        self.count += 1
+        self.min = min(self.min, value)
+        self.max = max(self.max, value)
+        self.sum += value
+        self.failed_count += not passed
+
+    def merge(self, count: int, low: float, high: float, total: float, failed_count: int) -> None:
+        self.count += count
+        self.min = min(self.min, low)
+        self.max = max(self.max, high)
+        self.sum += total
+        self.failed_count += failed_count
+
+    @property
+    def mean(self) -> float:
+        return self.sum / self.count
+
+
+def metric_points(dataset_id: int, run_at: datetime, results: Iterable[Tuple[int, float, bool]]) -> List[MetricPoint]:
+    """Build the points of one check run from `(rule_id, value, passed)` results.
+
+    Metrics that could not be computed (NaN) are not part of the series.
+    """
+
+    return [
+        MetricPoint(dataset_id=dataset_id, rule_id=rule_id, ts=run_at, value=value, passed=passed)
+        for rule_id, value, passed in results
+        if not math.isnan(value)
+    ]
+
+
+def compacted_until(session: Session) -> Optional[datetime]:
+    """Return the time before which raw points are rolled up for good, None if none are.
+
+    `rollup` never reads points older than this again, so retention may drop them.
+    """
+
+    return _rollup_from(session, HOUR)
+
+
+def _rollup_from(session: Session, resolution: str) -> Optional[datetime]:
+    """Return where to resume rolling up, or None to start from the beginning.
+
+    The newest bucket may be incomplete and the one before it may miss points
+    committed late by a long run, so both are recomputed.
+    """
+
+    latest = session.exec(
+        select(func.max(MetricRollup.bucket_start)).where(MetricRollup.resolution == resolution)
+    ).first()
+    return None if latest is None else latest - BUCKET_SIZES[resolution]
+
+
+def _source_rows(session: Session, resolution: str, since: Optional[datetime]) -> Iterator[Tuple[Any, ...]]:
+    """Yield `(dataset_id, rule_id, ts, count, min, max, sum, failed_count)` rows to roll up."""
+
+    if resolution == HOUR:
+        points = select(
+            MetricPoint.dataset_id, MetricPoint.rule_id, MetricPoint.ts, MetricPoint.value, MetricPoint.passed
+        )
+        if since is not None:
+            points = points.where(MetricPoint.ts >= since)
+        for dataset_id, rule_id, ts, value, passed in session.execute(
+            points.execution_options(yield_per=ROLLUP_BATCH_ROWS)
+        ):
+            yield dataset_id, rule_id, ts, 1, value, value, value, int(not passed)
+        return
+    hours = select(
+        MetricRollup.dataset_id,
+        MetricRollup.rule_id,
+        MetricRollup.bucket_start,
+        MetricRollup.count,
+        MetricRollup.min,
+        MetricRollup.max,
+        MetricRollup.sum,
+        MetricRollup.failed_count,
+    ).where(MetricRollup.resolution == HOUR)
+    if since is not None:
+        hours = hours.where(MetricRollup.bucket_start >= since)
+    yield from session.execute(hours.execution_options(yield_per=ROLLUP_BATCH_ROWS))
+
+
+def rollup(session: Session, resolution: str) -> int:
+    """Recompute the buckets of `resolution` that may have changed since the last rollup.
+
+    Hourly buckets are built from raw points and daily buckets from hourly
+    ones, so roll up hours first. Returns the number of buckets written; the
+    caller commits.
+    """
+
+    since = _rollup_from(session, resolution)
+    buckets: Dict[Tuple[int, int, datetime], Bucket] = {}
+    for dataset_id, rule_id, ts, count, low, high, total, failed_count in _source_rows(session, resolution, since):
+        start = bucket_start(ts, resolution)
+        key = (dataset_id, rule_id, start)
+        bucket = buckets.get(key)
+        if bucket is None:
+            bucket = buckets[key] = Bucket(start)
+        bucket.merge(count, low, high, total, failed_count)
+    stale = delete(MetricRollup).where(MetricRollup.resolution == resolution)
+    if since is not None:
+        stale = stale.where(MetricRollup.bucket_start >= since)
+    session.execute(stale)
+    rows = [
+        dict(
+            dataset_id=dataset_id,
+            rule_id=rule_id,
+            resolution=resolution,
+            bucket_start=bucket.start,
+            count=bucket.count,
+            min=bucket.min,
+            max=bucket.max,
+            sum=bucket.sum,
+            failed_count=bucket.failed_count,
+        )
+        for (dataset_id, rule_id, _), bucket in buckets.items()
+    ]
+    if rows:
+        session.execute(insert(MetricRollup), rows)
+    return len(rows)
+
+
+async def query_series(
+    session: ReadSession, rule_id: int, since: datetime, until: datetime, resolution: Optional[str] = None
+) -> Tuple[str, List[Bucket]]:
+    """Return the metric series of a rule over `[since, until)` as `(resolution, buckets)`.
+
+    Raw points are returned as one-point buckets. With no `resolution` one is
+    picked from the length of the range.
+    """
+
+    resolution = resolution or pick_resolution(since, until)
+    points = select(MetricPoint.ts, MetricPoint.value, MetricPoint.passed).where(
+        MetricPoint.rule_id == rule_id, MetricPoint.ts < until
+    )
+    if resolution == RAW:
+        rows = (await session.exec(points.where(MetricPoint.ts >= since).order_by(MetricPoint.ts))).all()
+        return resolution, [Bucket(ts, 1, value, value, value, int(not passed)) for ts, value, passed in rows]
+
+    start = bucket_start(since, resolution)
+    in_rule = (MetricRollup.rule_id == rule_id, MetricRollup.resolution == resolution)
+    # The rule's newest rollup may predate points written since; rebuild it from raw points.
+    # Older buckets are final, and their raw points may have been removed by retention.
+    latest = (await session.exec(select(func.max(MetricRollup.bucket_start)).where(*in_rule))).first()
+    raw_from = start if latest is None else max(latest, start)
+    statement = (
+        select(MetricRollup)
+        .where(*in_rule, MetricRollup.bucket_start >= start, MetricRollup.bucket_start < min(raw_from, until))
+        .order_by(MetricRollup.bucket_start)
+    )
+    final = (await session.exec(statement)).all()
+    buckets = [Bucket(r.bucket_start, r.count, r.min, r.max, r.sum, r.failed_count) for r in final]
+    pending: Dict[datetime, Bucket] = {}
+    for ts, value, passed in (await session.exec(points.where(MetricPoint.ts >= raw_from))).all():
+        key = bucket_start(ts, resolution)
+        bucket = pending.get(key)
+        if bucket is None:
+            bucket = pending[key] = Bucket(key)
+        bucket.add(value, passed)
+    return resolution, buckets + sorted(pending.values(), key=lambda b: b.start)
@@ -3,18 +3,71 @@
 This service coordinates loading datasets, evaluating rules via the
 `rule_engine` and persisting the results to the database. It also updates
 Prometheus metrics counters for observability.
+
+Append-only datasets whose rules can all be answered from running column
+statistics are checked incrementally: only rows appended since the previous
+run are read, starting from the byte offset checkpointed in
+`DatasetCheckpoint`, and folded into the persisted `ColumnStatistics`. Other
+datasets too large for the memory budget in `Settings` are streamed in chunks.
+Plans made only of freshness rules on monotonic columns read just the tail
+of the file (see `freshness`). In-memory loads parse columns with the dtypes
+registered in `SchemaVersion` (see `typed_schema`).
+
+Each `CheckRun` stores a fingerprint of the dataset file and the enabled
+rules; when it matches the previous run only time-dependent rules are
+evaluated again and the other metrics are reused.
+
+The cost of each dataset (time per stage and per rule, rows scanned, bytes
+read and peak memory) is collected in a `DatasetRunStats`, published as
+Prometheus metrics and logged as `dataset_run_stats`.
+
+Incidents, check runs, metric points (see `metric_series`) and schema
+versions are written in bulk through a `ResultWriter`; a writer shared by
+several services batches across datasets. A failing rule updates its open
+incident rather than adding a new one, and a passing rule resolves it.
 """
 
+import hashlib
 import json
+import os
+import time
+from datetime import datetime
 from pathlib import Path
-from typing import Dict, List
+from typing import Any, Collection, Dict, List, Optional
 
 import pandas as pd
-from sqlmodel import Session, select
+from sqlmodel import Session, SQLModel, select
+
+from app.core.config import settings
+from app.core.logging import get_logger
+from app.db.models import CheckRun, Dataset, DatasetCheckpoint, Incident, Rule
+from app.services.column_cache import default_cache, file_fingerprint
+from app.services.freshness import supports_tail, tail_aggregates
+from app.services.incremental_stats import (
+    load_column_states,
+    reset_column_state,
+    state_aggregates,
+    supports_plan,
+    update_column_state,
+)
+from app.services.metric_series import metric_points
+from app.services.result_writer import ResultWriter
+from app.services.rule_engine import RulePlan, derive_results, execute_plan, plan_rules, split_evenly
+from app.services.rule_types import RuleResult
+from app.services.streaming import should_stream, stream_aggregates
+from app.services.tail_reader import FINGERPRINT_BYTES, read_appended
+from app.services.typed_schema import (
+    SchemaMismatch,
+    TypedSchema,
+    is_source_schema,
+    latest_schema_version,
+    next_schema_version,
+)
+from app.telemetry.metrics import record_incident
+from app.telemetry.run_stats import DatasetRunStats
 
-from app.db.models import CheckRun, Dataset, Incident, Rule
-from app.services.rule_engine import evaluate_rule
-from app.telemetry.metrics import record_check, record_incident
+
+logger = get_logger(__name__)
 
 
 class QualityService:
@@ -22,34 +75,254 @@ class QualityService:
 
     data_dir: Path = Path(__file__).resolve().parents[3] / "data" / "samples"
 
-    def __init__(self, session: Session) -> None:
+    def __init__(self, session: Session, results: Optional[ResultWriter] = None) -> None:
         self.session = session
+        # A shared writer batches results across datasets and is flushed by its owner
+        self.owns_results = results is None
+        self.results = results or ResultWriter(session)
+        self.stats = DatasetRunStats("")
+        self.checkpoint: Optional[DatasetCheckpoint] = None
+
+    def dataset_path(self, dataset: Dataset) -> Path:
+        """Return the path of the CSV file backing a dataset."""
 
-    def load_dataset(self, dataset: Dataset) -> pd.DataFrame:
+        file_path = self.data_dir / f"{dataset.name}.csv"
+        if not file_path.exists():
+            raise FileNotFoundError(f"Dataset file {file_path} not found")
+        return file_path
+
+    def get_checkpoint(self, dataset: Dataset) -> DatasetCheckpoint:
+        """Return the append-mode read checkpoint of a dataset, creating it if needed."""
+
+        if self.checkpoint is not None and self.checkpoint.dataset_id == dataset.id:
+            return self.checkpoint
+        checkpoint = self.session.exec(
+            select(DatasetCheckpoint).where(DatasetCheckpoint.dataset_id == dataset.id)
+        ).first()
+        if checkpoint is None:
+            checkpoint = DatasetCheckpoint(dataset_id=dataset.id)
+        self.save_with_results(checkpoint)
+        self.checkpoint = checkpoint
+        return checkpoint
+
+    def save_with_results(self, row: SQLModel) -> None:
+        """Store a checkpoint or column state in the transaction that writes the results.
+
+        With a shared writer the row is detached from this session, whose
+        caller commits it independently, and merged by the writer at flush.
+        """
+
+        if self.owns_results:
+            self.session.add(row)
+            return
+        if row in self.session:
+            self.session.expunge(row)
+        self.results.merge(row)
+
+    def load_dataset(
+        self, dataset: Dataset, append: bool = False, columns: Optional[Collection[str]] = None
+    ) -> pd.DataFrame:
         """Load a dataset into a pandas DataFrame.
 
         The current implementation expects a CSV file under `data/samples`
         whose name matches the dataset's name. A real system would support
-        reading from Delta or other storage.
+        reading from Delta or other storage. Parsed files are kept in the
+        columnar cache, so unchanged files are memory-mapped instead of parsed.
+        When `columns` is given only those columns are read; names missing
+        from the file are ignored so rules can still report them as missing.
+        Columns are parsed with the dtypes of the latest registered schema
+        version; when there is none or the file no longer matches it, dtypes
+        are inferred from the whole file and registered as a new version.
+
+        In append mode only the rows written since the previous append-mode
+        read are parsed, indexed by their row position in the file. The read
+        position is stored in the dataset's `DatasetCheckpoint`, which is
+        committed together with the check results. A truncated or rewritten
+        file is read in full again, with the index starting at 0.
         """
 
-        file_path = self.data_dir / f"{dataset.name}.csv"
-        if not file_path.exists():
-            raise FileNotFoundError(f"Dataset file {file_path} not found")
-        return pd.read_csv(file_path)
+        file_path = self.dataset_path(dataset)
+        wanted = None if columns is None else set(columns)
+        with self.stats.stage("schema"):
+            schema = self.typed_schema(dataset, file_path)
+        if schema is not None:
+            try:
+                with self.stats.stage("load"):
+                    return self._read(dataset, file_path, wanted, append, schema)
+            except SchemaMismatch as exc:
+                logger.warning("schema_drift_detected", dataset=dataset.name, error=str(exc))
+        # No usable schema: infer dtypes once from every column and register them.
+        # The cache would hand back compact dtypes, so the file is parsed directly.
+        if append:
+            self.get_checkpoint(dataset).byte_offset = 0
+        with self.stats.stage("load"):
+            frame = self._read(dataset, file_path, None, append, None, cached=False)
+        with self.stats.stage("schema"):
+            schema = TypedSchema.infer(frame)
+            self.results.add(next_schema_version(self.session, dataset, schema))
+            frame = schema.apply(frame)
+        return frame if wanted is None else frame[[c for c in frame.columns if c in wanted]]
+
+    def typed_schema(self, dataset: Dataset, file_path: Path) -> Optional[TypedSchema]:
+        """Return the dataset's latest source-dtype schema if it still matches the file header."""
+
+        schema_version = latest_schema_version(self.session, dataset)
+        if schema_version is None or not is_source_schema(schema_version.schema):
+            return None
+        header = list(pd.read_csv(file_path, nrows=0).columns)
+        if list(schema_version.schema) != header:
+            logger.warning("schema_drift_detected", dataset=dataset.name, error="header changed")
+            return None
+        return TypedSchema({column: str(dtype) for column, dtype in schema_version.schema.items()})
+
+    def _read(
+        self,
+        dataset: Dataset,
+        file_path: Path,
+        wanted: Optional[Collection[str]],
+        append: bool,
+        schema: Optional[TypedSchema],
+        cached: bool = True,
+    ) -> pd.DataFrame:
+        usecols = None if wanted is None else (lambda name: name in wanted)
+        reader = schema.read_csv if schema is not None else pd.read_csv
+        if not append:
+            cache = default_cache() if cached else None
+            if cache is not None:
+                return cache.read_csv(file_path, wanted, schema)
+            return reader(file_path, usecols=usecols)
+        return read_appended(file_path, self.get_checkpoint(dataset), reader, usecols=usecols)
+
+    def evaluate_incrementally(self, dataset: Dataset, plan: RulePlan) -> List[RuleResult]:
+        """Evaluate a plan from running column statistics and appended rows only."""
+
+        header = pd.read_csv(self.dataset_path(dataset), nrows=0).columns
+        states = load_column_states(self.session, dataset, plan.aggregates, header)
+        for state in states.values():
+            self.save_with_results(state)
+        checkpoint = self.get_checkpoint(dataset)
+        if any(state.row_count != checkpoint.row_offset for state in states.values()):
+            # A column started being tracked; rebuild every state from row 0
+            checkpoint.byte_offset = 0
+        # An empty projection would parse no rows, so fall back to all columns
+        new_rows = self.load_dataset(dataset, append=True, columns=list(states) or None)
+        self.stats.rows_scanned += len(new_rows)
+        for column, state in states.items():
+            if new_rows.index.start == 0:
+                reset_column_state(state)
+            update_column_state(state, new_rows[column])
+        return derive_results(plan, state_aggregates(states, checkpoint.row_offset))
+
+    def run_fingerprint(self, dataset: Dataset, rules: List[Rule]) -> str:
+        """Fingerprint the dataset file and the definitions of its enabled rules.
+
+        The file part combines its size and mtime with a hash of its first and
+        last blocks, which catches rewrites that preserve the mtime.
+        """
 
-    def run_checks_for_dataset(self, dataset: Dataset) -> None:
-        """Run all enabled rules for a given dataset and persist results."""
+        file_path = self.dataset_path(dataset)
+        digest = hashlib.sha1(file_fingerprint(file_path).encode())
+        with open(file_path, "rb") as f:
+            digest.update(f.read(FINGERPRINT_BYTES))
+            f.seek(max(os.path.getsize(file_path) - FINGERPRINT_BYTES, 0))
+            digest.update(f.read(FINGERPRINT_BYTES))
+        for rule in sorted(rules, key=lambda r: r.id or 0):
+            definition = [rule.id, rule.rule_type, rule.params, rule.threshold, rule.severity]
+            digest.update(json.dumps(definition, sort_keys=True, default=str).encode())
+        return digest.hexdigest()
 
-        df = self.load_dataset(dataset)
+    def evaluate_plan(
+        self, dataset: Dataset, plan: RulePlan, timings: Optional[List[float]] = None
+    ) -> List[RuleResult]:
+        """Evaluate a plan with the cheapest strategy that supports it.
+
+        When `timings` is given it receives the seconds spent on each rule.
+        Strategies that read and aggregate in a single pass cannot tell the
+        rules apart, so the whole pass is split evenly between them.
+        """
+
+        stats = self.stats
+        started = time.perf_counter()
+        if supports_tail(plan):
+            stats.strategy = "tail"
+            with stats.stage("scan"):
+                aggregates = tail_aggregates(self.dataset_path(dataset), plan)
+            stats.rows_scanned += aggregates.row_count
+        elif dataset.append_only and supports_plan(plan):
+            stats.strategy = "incremental"
+            with stats.stage("scan"):
+                results = self.evaluate_incrementally(dataset, plan)
+            if timings is not None:
+                timings[:] = split_evenly(time.perf_counter() - started, plan)
+            return results
+        elif plan.shares_aggregates and should_stream(self.dataset_path(dataset)):
+            stats.strategy = "stream"
+            with stats.stage("scan"):
+                aggregates = stream_aggregates(self.dataset_path(dataset), plan.aggregates)
+            stats.rows_scanned += aggregates.row_count
+        else:
+            stats.strategy = "full"
+            frame = self.load_dataset(dataset, columns=plan.required_columns)
+            stats.rows_scanned += len(frame)
+            with stats.stage("evaluate"):
+                return execute_plan(frame, plan, settings.check_rule_workers, timings)
+        with stats.stage("evaluate"):
+            results = derive_results(plan, aggregates)
+        if timings is not None:
+            timings[:] = split_evenly(time.perf_counter() - started, plan)
+        return results
+
+    def run_checks_for_dataset(self, dataset: Dataset) -> Dict[str, Any]:
+        """Run all enabled rules for a given dataset, persist results and return the run's cost.
+
+        When neither the file nor the enabled rules changed since the last
+        `CheckRun`, its metrics are reused and only time-dependent rules
+        (freshness) are evaluated again; incidents of the reused results were
+        already raised by that run. The returned dict is the summary of the
+        dataset's `DatasetRunStats`.
+        """
+
+        self.stats = stats = DatasetRunStats(dataset.name)
+        self.checkpoint = None
+        stats.start()
         statement = select(Rule).where(Rule.dataset_id == dataset.id, Rule.enabled == True)
         rules: List[Rule] = list(self.session.exec(statement))
+        plan = plan_rules(rules)
+        with stats.stage("fingerprint"):
+            fingerprint = self.run_fingerprint(dataset, rules)
+        previous = self.session.exec(
+            select(CheckRun).where(CheckRun.dataset_id == dataset.id).order_by(CheckRun.run_at.desc())
+        ).first()
+        unchanged = previous is not None and previous.fingerprint == fingerprint
         metrics: Dict[str, float] = {}
-        for rule in rules:
-            metric_value, passed, description = evaluate_rule(df, rule)
+        run_at = datetime.utcnow()
+        if unchanged:
+            metrics.update(previous.metrics)
+            rules = [rule for rule, evaluator in zip(rules, plan.evaluators) if evaluator.time_dependent]
+            plan = plan_rules(rules)
+        timings: List[float] = []
+        results = self.evaluate_plan(dataset, plan, timings) if plan.evaluators else []
+        stats.record_rules(rules, timings)
+        with stats.stage("persist"):
+            self.persist_results(dataset, rules, results, metrics, run_at, fingerprint, unchanged)
+        summary = stats.finish()
+        logger.info("dataset_run_stats", **summary)
+        return summary
+
+    def persist_results(
+        self,
+        dataset: Dataset,
+        rules: List[Rule],
+        results: List[RuleResult],
+        metrics: Dict[str, float],
+        run_at: datetime,
+        fingerprint: str,
+        unchanged: bool,
+    ) -> None:
+        """Write the incidents, metric points and `CheckRun` of one dataset run."""
+
+        for rule, (metric_value, passed, description) in zip(rules, results):
             metrics[f"{rule.id}:{rule.rule_type}"] = metric_value
-            # Record Prometheus metrics
-            record_check(dataset.name, rule.rule_type, 0.0)  # duration is trivial here
             if not passed:
                 record_incident(dataset.name, rule.rule_type, rule.severity)
                 incident = Incident(
@@ -60,8 +333,17 @@ class QualityService:
                     severity=rule.severity,
                     description=description,
                 )
-                self.session.add(incident)
+                self.results.add(incident)
+            else:
+                self.results.recover(dataset.id, rule.id)
+        # Reused metrics are already in the series; only evaluated rules add points
+        observed = [(rule.id, value, passed) for rule, (value, passed, _) in zip(rules, results)]
+        for point in metric_points(dataset.id, run_at, observed):
+            self.results.add(point)
         # Persist CheckRun
-        check_run = CheckRun(dataset_id=dataset.id, metrics=metrics)
-        self.session.add(check_run)
-        self.session.commit()
\ No newline at end of file
+        check_run = CheckRun(
+            dataset_id=dataset.id, run_at=run_at, metrics=metrics, fingerprint=fingerprint, unchanged=unchanged
+        )
+        self.results.add(check_run)
+        if self.owns_results:
+            self.results.flush()
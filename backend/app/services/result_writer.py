@@ -0,0 +1,203 @@
+"""Batched persistence of check results.
+
+Adding every `Incident`, `CheckRun` and `SchemaVersion` to the session one by
+one makes the write phase dominate runs with many failing rules. The
+`ResultWriter` buffers these rows and writes each batch with one bulk
+`INSERT` per table (an executemany) in a single transaction, flushing
+whenever `batch_size` rows are pending and when the caller calls `flush`.
+Rows written this way do not get their primary keys populated.
+
+Incidents are coalesced per (dataset, rule): a failure is upserted into the
+open incident of its rule with `INSERT ... ON CONFLICT DO UPDATE` against the
+partial unique index on open incidents, bumping `occurrence_count` and
+`last_seen_at`. Recoveries resolve the open incident. Dialects without that
+upsert fall back to a lookup followed by an update or insert.
+
+State that must only advance when the results are stored, such as read
+checkpoints and running column statistics, is queued with `merge` and merged
+into the writer's session in the same transaction. A writer shared by several
+datasets groups each dataset's rows with `dataset()`: a full batch is only
+flushed between datasets, and the rows of a dataset whose check raises are
+dropped instead of being written with the next batch.
+"""
+
+from collections import defaultdict
+from contextlib import contextmanager
+from datetime import datetime
+from typing import Dict, Iterator, List, Optional, Set, Tuple, Type
+
+from sqlalchemy import insert, text, update
+from sqlalchemy.dialects import postgresql, sqlite
+from sqlmodel import Session, SQLModel, select
+
+from app.core.config import settings
+from app.db.models import OPEN_INCIDENT, Incident
+
+
+IncidentKey = Tuple[int, int]
+
+_UPSERT_DIALECTS = {"postgresql": postgresql.insert, "sqlite": sqlite.insert}
+
+
+class ResultWriter:
+    """Buffer result rows and insert them in bulk, one transaction per batch."""
+
+    def __init__(self, session: Session, batch_size: Optional[int] = None) -> None:
+        self.session = session
+        self.batch_size = batch_size or settings.result_batch_size
+        self.pending: Dict[Type[SQLModel], List[dict]] = defaultdict(list)
+        self.incidents: Dict[IncidentKey, dict] = {}
+        self.recovered: Set[IncidentKey] = set()
+        self.merged: List[SQLModel] = []
+        self.pending_count = 0
+        self.written = 0
+        self.flushes = 0
+        self.open_datasets = 0
+
+    def add(self, row: SQLModel) -> None:
+        """Queue a row for insertion, flushing once a batch is full.
+
+        Incidents are merged with a pending failure of the same rule.
+        """
+
+        values = row.dict(exclude={"id"})
+        if isinstance(row, Incident):
+            key = (row.dataset_id, row.rule_id)
+            if key in self.recovered:
+                # Resolve the earlier incident before opening a new one
+                self.flush()
+            previous = self.incidents.get(key)
+            if previous is not None:
+                values["created_at"] = previous["created_at"]
+                values["occurrence_count"] += previous["occurrence_count"]
+            else:
+                self.pending_count += 1
+            self.incidents[key] = values
+        else:
+            self.pending[type(row)].append(values)
+            self.pending_count += 1
+        self._flush_if_full()
+
+    def merge(self, row: SQLModel) -> None:
+        """Queue an object loaded or created elsewhere to be merged into the session at flush.
+
+        Its attributes are read at flush time, so later changes to it are stored too.
+        """
+
+        self.merged.append(row)
+        self.pending_count += 1
+        self._flush_if_full()
+
+    @contextmanager
+    def dataset(self) -> Iterator[None]:
+        """Group the rows queued by one dataset's check.
+
+        A full batch is flushed once the block ends rather than in the middle
+        of it. When the block raises, the rows it queued are dropped.
+        """
+
+        flushes = self.flushes
+        lengths = {model: len(rows) for model, rows in self.pending.items()}
+        incidents, recovered = dict(self.incidents), set(self.recovered)
+        merged, pending_count = len(self.merged), self.pending_count
+        self.open_datasets += 1
+        try:
+            yield
+        except BaseException:
+            if self.flushes != flushes:
+                # Everything still pending was queued by this dataset
+                lengths, incidents, recovered, merged, pending_count = {}, {}, set(), 0, 0
+            for model, rows in self.pending.items():
+                del rows[lengths.get(model, 0):]
+            self.incidents, self.recovered = incidents, recovered
+            del self.merged[merged:]
+            self.pending_count = pending_count
+            raise
+        finally:
+            self.open_datasets -= 1
+        self._flush_if_full()
+
+    def _flush_if_full(self) -> None:
+        if self.pending_count >= self.batch_size and not self.open_datasets:
+            self.flush()
+
+    def recover(self, dataset_id: int, rule_id: int) -> None:
+        """Queue resolving the open incident of a rule that passed again."""
+
+        key = (dataset_id, rule_id)
+        if key in self.incidents:
+            # Let the pending failure reach its incident first
+            self.flush()
+        if key not in self.recovered:
+            self.recovered.add(key)
+            self.pending_count += 1
+
+    def _resolve_recovered(self) -> None:
+        now = datetime.utcnow()
+        by_dataset: Dict[int, List[int]] = defaultdict(list)
+        for dataset_id, rule_id in self.recovered:
+            by_dataset[dataset_id].append(rule_id)
+        for dataset_id, rule_ids in by_dataset.items():
+            self.session.execute(
+                update(Incident)
+                .where(Incident.dataset_id == dataset_id, Incident.rule_id.in_(rule_ids), text(OPEN_INCIDENT))
+                .values(resolved=True, resolved_at=now)
+            )
+
+    def _upsert_incidents(self) -> None:
+        rows = list(self.incidents.values())
+        make_insert = _UPSERT_DIALECTS.get(self.session.get_bind().dialect.name)
+        if make_insert is None:
+            for values in rows:
+                self._upsert_incident_slow(values)
+            return
+        statement = make_insert(Incident)
+        statement = statement.on_conflict_do_update(
+            index_elements=[Incident.dataset_id, Incident.rule_id],
+            index_where=text(OPEN_INCIDENT),
+            set_={
+                "last_seen_at": statement.excluded.last_seen_at,
+                "occurrence_count": Incident.occurrence_count + statement.excluded.occurrence_count,
+                "metric_value": statement.excluded.metric_value,
+                "severity": statement.excluded.severity,
+                "description": statement.excluded.description,
+            },
+        )
+        self.session.execute(statement, rows)
+
+    def _upsert_incident_slow(self, values: dict) -> None:
+        incident = self.session.exec(
+            select(Incident).where(
+                Incident.dataset_id == values["dataset_id"], Incident.rule_id == values["rule_id"], text(OPEN_INCIDENT)
+            )
+        ).first()
+        if incident is None:
+            self.session.execute(insert(Incident), [values])
+            return
+        incident.last_seen_at = values["last_seen_at"]
+        incident.occurrence_count += values["occurrence_count"]
+        incident.metric_value = values["metric_value"]
+        incident.severity = values["severity"]
+        incident.description = values["description"]
+        self.session.add(incident)
+
+    def flush(self) -> None:
+        """Write every pending row and commit the batch together with the session."""
+
+        for row in self.merged:
+            self.session.merge(row)
+        if self.recovered:
+            self._resolve_recovered()
+        if self.incidents:
+            self._upsert_incidents()
+        for model, rows in self.pending.items():
+            if rows:
+                self.session.execute(insert(model), rows)
+        self.session.commit()
+        self.written += self.pending_count
+        self.flushes += 1
+        self.pending.clear()
+        self.incidents.clear()
+        self.recovered.clear()
+        self.merged.clear()
+        self.pending_count = 0
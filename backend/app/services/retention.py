@@ -0,0 +1,236 @@
+"""Retention of check history.
+
+Each `RetentionPolicy` says how long rows of one table are kept, measured on
+one of its timestamp columns, and which expired rows must stay anyway (open
+incidents, the latest schema of a dataset, metric points not rolled up yet).
+`apply_policy` removes the rest. When `Settings.retention_archive_dir` is set,
+removed rows are first appended to a gzipped NDJSON file per table and run.
+
+On PostgreSQL, a table that is range-partitioned on its timestamp column
+(see docs/RUNBOOK.md) loses whole expired partitions with a `DROP TABLE`,
+and partitions for the current and next month are created ahead of time.
+Rows that remain in partly expired partitions, and tables on other backends
+such as SQLite, are deleted in batches of `Settings.retention_batch_rows`
+with one transaction each, so writers are never blocked for long.
+"""
+
+import gzip
+import re
+from dataclasses import dataclass, field
+from datetime import datetime, timedelta
+from pathlib import Path
+from typing import Any, Callable, List, Optional, Tuple, Type
+
+from sqlalchemy import delete, func, or_, select, text
+from sqlmodel import Session, SQLModel
+
+from app.core.config import settings
+from app.core.logging import get_logger
+from app.db.models import Acknowledgement, CheckRun, Incident, MetricPoint, MetricRollup, SchemaVersion
+from app.services.export import EXPORT_BATCH_ROWS, write_ndjson
+from app.services.metric_series import HOUR, compacted_until
+
+
+logger = get_logger(__name__)
+
+_PARTITION_UPPER_BOUND = re.compile(r"TO \('([^']+)'\)")
+
+
+@dataclass
+class RetentionPolicy:
+    """How long the rows of one table are kept."""
+
+    model: Type[SQLModel]
+    time_column: str
+    days: int  # 0 keeps rows forever
+    # Extra condition an expired row must meet, given the cutoff
+    where: Optional[Callable[[datetime], Any]] = None
+    # Keep the newest row (highest id) of each group of this column
+    keep_latest_per: Optional[str] = None
+    # Lowers the cutoff to what may be dropped now; None means nothing may
+    limit_cutoff: Optional[Callable[[Session], Optional[datetime]]] = None
+    # Rows referencing this table by the given column, removed with it
+    dependents: List[Tuple[Type[SQLModel], str]] = field(default_factory=list)
+
+    @property
+    def table(self) -> Any:
+        return self.model.__table__
+
+    @property
+    def droppable_partitions(self) -> bool:
+        """Whether expired partitions may be dropped without looking at their rows."""
+
+        return self.where is None and self.keep_latest_per is None
+
+
+def default_policies() -> List[RetentionPolicy]:
+    """Return the policies configured in `Settings`."""
+
+    return [
+        RetentionPolicy(CheckRun, "run_at", settings.retention_check_run_days),
+        RetentionPolicy(
+            Incident,
+            "created_at",
+            settings.retention_incident_days,
+            # created_at <= last_seen_at, so the created_at index narrows the scan
+            where=lambda cutoff: (Incident.last_seen_at < cutoff) & or_(Incident.acknowledged, Incident.resolved),
+            dependents=[(Acknowledgement, "incident_id")],
+        ),
+        RetentionPolicy(
+            SchemaVersion, "created_at", settings.retention_schema_version_days, keep_latest_per="dataset_id"
+        ),
+        RetentionPolicy(MetricPoint, "ts", settings.retention_metric_point_days, limit_cutoff=compacted_until),
+        RetentionPolicy(
+            MetricRollup,
+            "bucket_start",
+            settings.retention_metric_rollup_hour_days,
+            where=lambda cutoff: MetricRollup.resolution == HOUR,
+        ),
+    ]
+
+
+class Archive:
+    """Gzipped NDJSON files receiving rows before they are removed, one per table."""
+
+    def __init__(self, directory: Path, started_at: datetime) -> None:
+        self.directory = directory
+        self.stamp = started_at.strftime("%Y%m%dT%H%M%S")
+
+    def write(self, table_name: str, columns: List[str], rows: List[Any]) -> None:
+        path = self.directory / table_name / f"{table_name}-{self.stamp}.ndjson.gz"
+        path.parent.mkdir(parents=True, exist_ok=True)
+        # Appending adds a gzip member; readers decompress the members in sequence
+        with gzip.open(path, "at", encoding="utf-8") as out:
+            write_ndjson(out, columns, rows)
+
+
+def default_archive(started_at: datetime) -> Optional[Archive]:
+    """Return the configured archive, or None when rows are not archived."""
+
+    if not settings.retention_archive_dir:
+        return None
+    return Archive(Path(settings.retention_archive_dir), started_at)
+
+
+def _partitions(session: Session, table_name: str) -> List[Tuple[str, Optional[datetime]]]:
+    """Return the partitions of a PostgreSQL table with their exclusive upper bound."""
+
+    rows = session.execute(
+        text(
+            "SELECT child.relname, pg_get_expr(child.relpartbound, child.oid) FROM pg_inherits "
+            "JOIN pg_class parent ON parent.oid = pg_inherits.inhparent "
+            "JOIN pg_class child ON child.oid = pg_inherits.inhrelid "
+            "WHERE parent.relname = :table"
+        ),
+        {"table": table_name},
+    ).all()
+    partitions = []
+    for name, bound in rows:
+        match = _PARTITION_UPPER_BOUND.search(bound or "")
+        # DEFAULT and MAXVALUE partitions have no usable upper bound
+        upper = datetime.fromisoformat(match.group(1)) if match else None
+        partitions.append((name, upper))
+    return partitions
+
+
+def _month_start(ts: datetime, months: int = 0) -> datetime:
+    month = ts.month - 1 + months
+    return datetime(ts.year + month // 12, month % 12 + 1, 1)
+
+
+def ensure_partitions(session: Session, table_name: str, now: datetime) -> None:
+    """Create the monthly partitions of the current and next month if missing."""
+
+    for months in (0, 1):
+        start, end = _month_start(now, months), _month_start(now, months + 1)
+        session.execute(
+            text(
+                f'CREATE TABLE IF NOT EXISTS "{table_name}_p{start:%Y%m}" PARTITION OF "{table_name}" '
+                f"FOR VALUES FROM ('{start.isoformat()}') TO ('{end.isoformat()}')"
+            )
+        )
+    session.commit()
+
+
+def drop_partitions(session: Session, table_name: str, cutoff: datetime, archive: Optional[Archive]) -> int:
+    """Drop the partitions whose rows all predate `cutoff`; returns the rows removed."""
+
+    removed = 0
+    for name, upper in _partitions(session, table_name):
+        if upper is None or upper > cutoff:
+            continue
+        rows = 0
+        result = session.execute(text(f'SELECT * FROM "{name}"').execution_options(yield_per=EXPORT_BATCH_ROWS))
+        columns = list(result.keys())
+        for batch in result.partitions():
+            if archive is not None:
+                archive.write(table_name, columns, batch)
+            rows += len(batch)
+        session.execute(text(f'ALTER TABLE "{table_name}" DETACH PARTITION "{name}"'))
+        session.execute(text(f'DROP TABLE "{name}"'))
+        session.commit()
+        logger.info("retention_partition_dropped", table=table_name, partition=name, rows=rows)
+        removed += rows
+    return removed
+
+
+def delete_expired(
+    session: Session, policy: RetentionPolicy, cutoff: datetime, archive: Optional[Archive], batch_rows: int
+) -> int:
+    """Delete expired rows in batches, one transaction per batch; returns the rows removed."""
+
+    table = policy.table
+    filters = [table.c[policy.time_column] < cutoff]
+    if policy.where is not None:
+        filters.append(policy.where(cutoff))
+    if policy.keep_latest_per is not None:
+        newer = table.alias()
+        group = policy.keep_latest_per
+        filters.append(
+            table.c.id < select(func.max(newer.c.id)).where(newer.c[group] == table.c[group]).scalar_subquery()
+        )
+    removed = 0
+    while True:
+        result = session.execute(select(table).where(*filters).limit(batch_rows))
+        columns = list(result.keys())
+        rows = result.all()
+        if not rows:
+            return removed
+        ids = [row.id for row in rows]
+        for dependent, column in policy.dependents:
+            dependent_table = dependent.__table__
+            if archive is not None:
+                dependent_rows = session.execute(select(dependent_table).where(dependent_table.c[column].in_(ids)))
+                archive.write(dependent_table.name, list(dependent_rows.keys()), dependent_rows.all())
+            session.execute(delete(dependent_table).where(dependent_table.c[column].in_(ids)))
+        if archive is not None:
+            archive.write(table.name, columns, rows)
+        session.execute(delete(table).where(table.c.id.in_(ids)))
+        session.commit()
+        removed += len(rows)
+
+
+def apply_policy(
+    session: Session,
+    policy: RetentionPolicy,
+    now: datetime,
+    archive: Optional[Archive] = None,
+    batch_rows: Optional[int] = None,
+) -> int:
+    """Remove the rows of a table that expired under `policy`; returns the rows removed."""
+
+    if policy.days <= 0:
+        return 0
+    cutoff = now - timedelta(days=policy.days)
+    if policy.limit_cutoff is not None:
+        limit = policy.limit_cutoff(session)
+        if limit is None:
+            return 0
+        cutoff = min(cutoff, limit)
+    removed = 0
+    if session.get_bind().dialect.name == "postgresql" and _partitions(session, policy.table.name):
+        ensure_partitions(session, policy.table.name, now)
+        if policy.droppable_partitions:
+            removed += drop_partitions(session, policy.table.name, cutoff, archive)
+    removed += delete_expired(session, policy, cutoff, archive, batch_rows or settings.retention_batch_rows)
+    return removed
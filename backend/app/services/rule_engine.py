@@ -5,80 +5,123 @@ determine whether a rule passes or fails. The implementation here uses
 pandas to operate on small datasets loaded into memory. In a production
 system, the `spark_checks.py` job would replace these functions with
 distributed Spark operations against Delta tables.
+
+Rules are compiled into evaluators by the registry in `rule_types` and run
+through a simple planner: `plan_rules` works out which per-column aggregates
+a set of rules needs, `compute_aggregates` computes each of them once over the
+DataFrame and every rule's result is then derived from the shared aggregates.
+Evaluating many rules on the same column therefore scans that column only
+once. Those per-column groups are independent and can be computed on a
+thread pool (`workers`, see `Settings.check_rule_workers`).
 """
 
-from datetime import datetime, timezone
-from typing import Any, Dict, Tuple
+import time
+from concurrent.futures import ThreadPoolExecutor
+from dataclasses import dataclass, field
+from typing import List, Optional, Set, Tuple
 
-import numpy as np
 import pandas as pd
 
 from app.db.models import Rule
+from app.services.aggregates import AggregateRequest, FrameAggregates, compute_aggregates
+from app.services.rule_types import RuleResult, RuleType, compile_rule_or_invalid
+
+
+@dataclass
+class RulePlan:
+    """Compiled evaluators for a set of rules and the aggregates they share."""
+
+    evaluators: List[RuleType]
+    aggregates: AggregateRequest = field(default_factory=AggregateRequest)
+
+    @property
+    def shares_aggregates(self) -> bool:
+        """Whether every rule can be derived from aggregates alone, without the frame."""
+
+        return all(evaluator.shares_aggregates for evaluator in self.evaluators)
+
+    @property
+    def required_columns(self) -> Set[str]:
+        """Dataset columns read by any rule in the plan."""
+
+        return {column for evaluator in self.evaluators for column in evaluator.required_columns}
+
+
+def plan_rules(rules: List[Rule]) -> RulePlan:
+    """Compile `rules` and collect the aggregates they need, deduplicated per column."""
+
+    plan = RulePlan(evaluators=[compile_rule_or_invalid(rule) for rule in rules])
+    for evaluator in plan.evaluators:
+        if evaluator.shares_aggregates:
+            evaluator.require(plan.aggregates)
+    return plan
+
+
+def derive_results(plan: RulePlan, aggregates: FrameAggregates) -> List[RuleResult]:
+    """Derive every rule result of an aggregate-only plan."""
+
+    return [evaluator.derive(aggregates) for evaluator in plan.evaluators]
+
+
+def _timed_evaluate(evaluator: RuleType, df: pd.DataFrame) -> Tuple[RuleResult, float]:
+    started = time.perf_counter()
+    result = evaluator.evaluate(df)
+    return result, time.perf_counter() - started
+
+
+def split_evenly(seconds: float, plan: RulePlan) -> List[float]:
+    """Attribute time spent on a plan's shared aggregates equally to the rules sharing them."""
+
+    sharing = sum(evaluator.shares_aggregates for evaluator in plan.evaluators)
+    share = seconds / sharing if sharing else 0.0
+    return [share if evaluator.shares_aggregates else 0.0 for evaluator in plan.evaluators]
+
+
+def execute_plan(
+    df: pd.DataFrame, plan: RulePlan, workers: int = 1, timings: Optional[List[float]] = None
+) -> List[RuleResult]:
+    """Evaluate a plan against a DataFrame, in the order of its evaluators.
+
+    With `workers > 1` the per-column aggregate groups, and evaluators that
+    need the whole frame, run on a thread pool sharing `df` without copies.
+    Results are in evaluator order regardless of `workers`. When `timings`
+    is given it receives the seconds spent per evaluator, with the shared
+    aggregate pass split evenly between the rules using it.
+    """
+
+    started = time.perf_counter()
+    aggregates = compute_aggregates(df, plan.aggregates, workers)
+    shared_seconds = time.perf_counter() - started
+    standalone = [evaluator for evaluator in plan.evaluators if not evaluator.shares_aggregates]
+    if workers > 1 and len(standalone) > 1:
+        with ThreadPoolExecutor(max_workers=workers) as executor:
+            evaluated = dict(zip(map(id, standalone), executor.map(lambda e: _timed_evaluate(e, df), standalone)))
+    else:
+        evaluated = {id(evaluator): _timed_evaluate(evaluator, df) for evaluator in standalone}
+    if timings is not None:
+        timings[:] = split_evenly(shared_seconds, plan)
+        for index, evaluator in enumerate(plan.evaluators):
+            if not evaluator.shares_aggregates:
+                timings[index] = evaluated[id(evaluator)][1]
+    return [
+        evaluator.derive(aggregates) if evaluator.shares_aggregates else evaluated[id(evaluator)][0]
+        for evaluator in plan.evaluators
+    ]
+
+
+def evaluate_rules(df: pd.DataFrame, rules: List[Rule], workers: int = 1) -> List[RuleResult]:
+    """Evaluate several rules against a DataFrame sharing one aggregate pass.
+
+    Results are returned in the same order as `rules`.
+    """
+
+    return execute_plan(df, plan_rules(rules), workers)
 
 
-def evaluate_rule(df: pd.DataFrame, rule: Rule) -> Tuple[float, bool, str]:
+def evaluate_rule(df: pd.DataFrame, rule: Rule) -> RuleResult:
     """Evaluate a data quality rule against a DataFrame.
 
     Returns a tuple of `(metric_value, passed, description)`.
     """
 
-    rule_type = rule.rule_type.lower()
-    params: Dict[str, Any] = rule.params or {}
-
-    if rule_type == "completeness":
-        column = params.get("column")
-        if column not in df.columns:
-            return 1.0, False, f"Column '{column}' missing"
-        null_ratio = df[column].isna().mean()
-        passed = null_ratio <= rule.threshold
-        return null_ratio, passed, f"Null ratio for {column}: {null_ratio:.3f}"
-
-    if rule_type == "freshness":
-        column = params.get("timestamp_column")
-        if column not in df.columns:
-            return float("inf"), False, f"Timestamp column '{column}' missing"
-        # Assume column is datetime-like
-        max_ts = pd.to_datetime(df[column]).max()
-        now = datetime.now(timezone.utc)
-        age_minutes = (now - max_ts).total_seconds() / 60.0
-        passed = age_minutes <= rule.threshold
-        return age_minutes, passed, f"Max age {age_minutes:.1f} minutes"
-
-    if rule_type == "uniqueness":
-        keys = params.get("primary_key")
-        if isinstance(keys, str):
-            keys = [keys]
-        if not keys or any(k not in df.columns for k in keys):
-            return 1.0, False, "Primary key column(s) missing"
-        duplicates = df.duplicated(subset=keys).mean()
-        passed = duplicates <= rule.threshold
-        return duplicates, passed, f"Duplicate ratio for {keys}: {duplicates:.3f}"
-
-    if rule_type == "schema_drift":
-        # Schema drift detection is handled in the job via schema_registry
-        return 0.0, True, "Schema drift check not implemented in rule engine"
-
-    if rule_type == "distribution_drift":
-        # Simplistic distribution drift: compare mean to reference mean
-        column = params.get("column")
-        reference_mean = params.get("reference_mean")
-        if column not in df.columns or reference_mean is None:
-            return 0.0, True, "Distribution drift check incomplete"
-        mean = df[column].mean()
-        drift = abs(mean - reference_mean)
-        passed = drift <= rule.threshold
-        return drift, passed, f"Mean drift for {column}: {drift:.3f}"
-
-    if rule_type == "outlier_rate":
-        column = params.get("column")
-        if column not in df.columns:
-            return 1.0, False, f"Column '{column}' missing"
-        vals = df[column].dropna()
-        if vals.empty:
-            return 0.0, True, "No data to compute outliers"
-        z_scores = np.abs((vals - vals.mean()) / vals.std(ddof=0))
-        outlier_rate = (z_scores > 3).mean()
-        passed = outlier_rate <= rule.threshold
-        return outlier_rate, passed, f"Outlier rate for {column}: {outlier_rate:.3f}"
-
-    return 0.0, True, f"Unknown rule type '{rule_type}'"
\ No newline at end of file
+    return evaluate_rules(df, [rule])[0]
@@ -0,0 +1,314 @@
+"""Registry of rule types and their compiled evaluators.
+
+Each rule type is a `RuleType` subclass registered under its name with
+`register_rule_type`. Instantiating the class validates the rule's params and
+compiles them into an evaluator that can be reused across runs; `compile_rule`
+caches evaluators by rule id and rule definition so the per-run hot path
+never re-parses params. New rule types only need a new subclass here.
+
+The rules API rejects invalid params, but rules stored before validation
+existed may still lack some. Those evaluate to their type's `incomplete`
+result, which is what the engine returned for them before rule types were
+compiled, so existing rules do not start failing.
+"""
+
+import json
+import threading
+from datetime import datetime, timezone
+from typing import Any, Callable, ClassVar, Dict, Hashable, List, Tuple, Type
+
+import pandas as pd
+
+from app.db.models import Rule
+from app.services.aggregates import (
+    LAST_TIMESTAMP,
+    MAX_TIMESTAMP,
+    MEAN,
+    NULL_COUNT,
+    OUTLIER_COUNT,
+    VALID_COUNT,
+    AggregateRequest,
+    FrameAggregates,
+    compute_aggregates,
+    ratio,
+)
+
+
+RuleResult = Tuple[float, bool, str]
+
+
+class RuleValidationError(ValueError):
+    """Raised when a rule's type or params cannot be compiled."""
+
+
+class RuleType:
+    """Base class for compiled rule evaluators.
+
+    Subclasses validate and store their params in `compile`. Evaluators that
+    can be answered from shared aggregates declare them in `require` and
+    compute their result in `derive`; others set `shares_aggregates = False`
+    and override `evaluate`. Rules whose result changes with the wall clock
+    even when the data does not set `time_dependent = True`.
+    """
+
+    name: ClassVar[str] = ""
+    shares_aggregates: ClassVar[bool] = True
+    time_dependent: ClassVar[bool] = False
+
+    def __init__(self, rule: Rule) -> None:
+        self.rule_id = rule.id
+        self.threshold = float(rule.threshold)
+        self.compile(rule.params or {})
+
+    def compile(self, params: Dict[str, Any]) -> None:
+        """Validate `params` and store whatever the evaluator needs."""
+
+    @classmethod
+    def incomplete(cls, error: RuleValidationError) -> RuleResult:
+        """Result of a stored rule of this type whose params do not compile."""
+
+        return 1.0, False, f"Invalid rule parameters: {error}"
+
+    @property
+    def required_columns(self) -> List[str]:
+        """Columns of the dataset this evaluator reads."""
+
+        return []
+
+    def require(self, request: AggregateRequest) -> None:
+        """Declare the aggregates `derive` needs."""
+
+    def derive(self, aggregates: FrameAggregates) -> RuleResult:
+        """Compute the rule result from shared aggregates."""
+
+        raise NotImplementedError
+
+    def evaluate(self, frame: pd.DataFrame) -> RuleResult:
+        """Evaluate the rule against a DataFrame on its own."""
+
+        request = AggregateRequest()
+        self.require(request)
+        return self.derive(compute_aggregates(frame, request))
+
+
+RULE_TYPES: Dict[str, Type[RuleType]] = {}
+
+
+def register_rule_type(name: str) -> Callable[[Type[RuleType]], Type[RuleType]]:
+    """Class decorator registering a `RuleType` under `name`."""
+
+    def decorator(cls: Type[RuleType]) -> Type[RuleType]:
+        cls.name = name
+        RULE_TYPES[name] = cls
+        return cls
+
+    return decorator
+
+
+def _column_param(params: Dict[str, Any], key: str, rule_type: str) -> str:
+    column = params.get(key)
+    if not isinstance(column, str) or not column:
+        raise RuleValidationError(f"{rule_type} rules require a '{key}' parameter")
+    return column
+
+
+@register_rule_type("completeness")
+class CompletenessRule(RuleType):
+    def compile(self, params: Dict[str, Any]) -> None:
+        self.column = _column_param(params, "column", self.name)
+
+    @property
+    def required_columns(self) -> List[str]:
+        return [self.column]
+
+    def require(self, request: AggregateRequest) -> None:
+        request.require(self.column, NULL_COUNT)
+
+    def derive(self, aggregates: FrameAggregates) -> RuleResult:
+        if self.column not in aggregates.columns:
+            return 1.0, False, f"Column '{self.column}' missing"
+        null_ratio = ratio(aggregates.columns[self.column][NULL_COUNT], aggregates.row_count)
+        passed = null_ratio <= self.threshold
+        return null_ratio, passed, f"Null ratio for {self.column}: {null_ratio:.3f}"
+
+
+@register_rule_type("freshness")
+class FreshnessRule(RuleType):
+    """Age of the newest timestamp in a column.
+
+    With `monotonic: true` the column is declared to never decrease in file
+    order, so only its last valid value is parsed instead of the whole column
+    and the dataset file can be checked by reading its tail.
+    """
+
+    time_dependent = True
+
+    def compile(self, params: Dict[str, Any]) -> None:
+        self.column = _column_param(params, "timestamp_column", self.name)
+        monotonic = params.get("monotonic", False)
+        if not isinstance(monotonic, bool):
+            raise RuleValidationError("freshness rules require 'monotonic' to be a boolean")
+        self.aggregate = LAST_TIMESTAMP if monotonic else MAX_TIMESTAMP
+
+    @classmethod
+    def incomplete(cls, error: RuleValidationError) -> RuleResult:
+        return float("inf"), False, f"Invalid rule parameters: {error}"
+
+    @property
+    def required_columns(self) -> List[str]:
+        return [self.column]
+
+    def require(self, request: AggregateRequest) -> None:
+        request.require(self.column, self.aggregate)
+
+    def derive(self, aggregates: FrameAggregates) -> RuleResult:
+        if self.column not in aggregates.columns:
+            return float("inf"), False, f"Timestamp column '{self.column}' missing"
+        max_ts = aggregates.columns[self.column][self.aggregate]
+        now = datetime.now(timezone.utc)
+        age_minutes = (now - max_ts).total_seconds() / 60.0
+        passed = age_minutes <= self.threshold
+        return age_minutes, passed, f"Max age {age_minutes:.1f} minutes"
+
+
+@register_rule_type("uniqueness")
+class UniquenessRule(RuleType):
+    def compile(self, params: Dict[str, Any]) -> None:
+        keys = params.get("primary_key")
+        if isinstance(keys, str):
+            keys = [keys]
+        if not keys or not all(isinstance(k, str) and k for k in keys):
+            raise RuleValidationError("uniqueness rules require a 'primary_key' parameter")
+        self.keys = list(keys)
+
+    @property
+    def required_columns(self) -> List[str]:
+        return list(self.keys)
+
+    def require(self, request: AggregateRequest) -> None:
+        request.require_keys(self.keys)
+
+    def derive(self, aggregates: FrameAggregates) -> RuleResult:
+        duplicate_count = aggregates.duplicates.get(tuple(self.keys))
+        if duplicate_count is None:
+            return 1.0, False, "Primary key column(s) missing"
+        duplicates = ratio(duplicate_count, aggregates.row_count)
+        passed = duplicates <= self.threshold
+        return duplicates, passed, f"Duplicate ratio for {self.keys}: {duplicates:.3f}"
+
+
+@register_rule_type("schema_drift")
+class SchemaDriftRule(RuleType):
+    def derive(self, aggregates: FrameAggregates) -> RuleResult:
+        # Schema drift detection is handled in the job via schema_registry
+        return 0.0, True, "Schema drift check not implemented in rule engine"
+
+
+@register_rule_type("distribution_drift")
+class DistributionDriftRule(RuleType):
+    """Simplistic distribution drift: compare the mean to a reference mean."""
+
+    def compile(self, params: Dict[str, Any]) -> None:
+        self.column = _column_param(params, "column", self.name)
+        reference_mean = params.get("reference_mean")
+        if isinstance(reference_mean, bool) or not isinstance(reference_mean, (int, float)):
+            raise RuleValidationError("distribution_drift rules require a numeric 'reference_mean' parameter")
+        self.reference_mean = float(reference_mean)
+
+    @classmethod
+    def incomplete(cls, error: RuleValidationError) -> RuleResult:
+        # Without a column or reference mean there is nothing to compare
+        return 0.0, True, "Distribution drift check incomplete"
+
+    @property
+    def required_columns(self) -> List[str]:
+        return [self.column]
+
+    def require(self, request: AggregateRequest) -> None:
+        request.require(self.column, MEAN)
+
+    def derive(self, aggregates: FrameAggregates) -> RuleResult:
+        if self.column not in aggregates.columns:
+            return 0.0, True, "Distribution drift check incomplete"
+        drift = abs(aggregates.columns[self.column][MEAN] - self.reference_mean)
+        passed = drift <= self.threshold
+        return drift, passed, f"Mean drift for {self.column}: {drift:.3f}"
+
+
+@register_rule_type("outlier_rate")
+class OutlierRateRule(RuleType):
+    def compile(self, params: Dict[str, Any]) -> None:
+        self.column = _column_param(params, "column", self.name)
+
+    @property
+    def required_columns(self) -> List[str]:
+        return [self.column]
+
+    def require(self, request: AggregateRequest) -> None:
+        request.require(self.column, VALID_COUNT, OUTLIER_COUNT)
+
+    def derive(self, aggregates: FrameAggregates) -> RuleResult:
+        if self.column not in aggregates.columns:
+            return 1.0, False, f"Column '{self.column}' missing"
+        stats = aggregates.columns[self.column]
+        if not stats[VALID_COUNT]:
+            return 0.0, True, "No data to compute outliers"
+        outlier_rate = stats[OUTLIER_COUNT] / stats[VALID_COUNT]
+        passed = outlier_rate <= self.threshold
+        return outlier_rate, passed, f"Outlier rate for {self.column}: {outlier_rate:.3f}"
+
+
+class InvalidRule(RuleType):
+    """Evaluator returned for rules that failed to compile."""
+
+    def __init__(self, rule: Rule, result: RuleResult) -> None:
+        self.rule_id = rule.id
+        self.result = result
+
+    def derive(self, aggregates: FrameAggregates) -> RuleResult:
+        return self.result
+
+
+_compiled: Dict[int, Tuple[Hashable, RuleType]] = {}
+_compiled_lock = threading.Lock()
+
+
+def _rule_state(rule: Rule) -> Hashable:
+    params = json.dumps(rule.params or {}, sort_keys=True, default=str)
+    return rule.rule_type, params, rule.threshold
+
+
+def compile_rule(rule: Rule) -> RuleType:
+    """Return the compiled evaluator for `rule`.
+
+    Evaluators of persisted rules are cached until the rule's definition
+    changes. Raises `RuleValidationError` for unknown rule types or invalid
+    params.
+    """
+
+    cls = RULE_TYPES.get(rule.rule_type.lower())
+    if cls is None:
+        raise RuleValidationError(f"Unknown rule type '{rule.rule_type.lower()}'")
+    if rule.id is None:
+        return cls(rule)
+    state = _rule_state(rule)
+    with _compiled_lock:
+        cached = _compiled.get(rule.id)
+    if cached is not None and cached[0] == state:
+        return cached[1]
+    evaluator = cls(rule)
+    with _compiled_lock:
+        _compiled[rule.id] = (state, evaluator)
+    return evaluator
+
+
+def compile_rule_or_invalid(rule: Rule) -> RuleType:
+    """Compile `rule`, turning validation errors into an `InvalidRule` with the type's `incomplete` result."""
+
+    try:
+        return compile_rule(rule)
+    except RuleValidationError as exc:
+        rule_type = rule.rule_type.lower()
+        if rule_type not in RULE_TYPES:
+            return InvalidRule(rule, (0.0, True, f"Unknown rule type '{rule_type}'"))
+        return InvalidRule(rule, RULE_TYPES[rule_type].incomplete(exc))
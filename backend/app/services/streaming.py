@@ -0,0 +1,134 @@
+"""Bounded-memory evaluation of datasets larger than RAM.
+
+`stream_aggregates` reads a CSV file in chunks sized to fit the configured
+memory budget and folds each chunk into `ColumnPartial` aggregates, so peak
+memory depends on the chunk size rather than the file size. Columns with
+outlier rules are read a second time once the final mean and standard
+deviation are known. Uniqueness is exact: key values are hash-partitioned
+into spill files on disk and duplicates are counted one partition at a time.
+
+Each chunk infers dtypes on its own, so the same key could be parsed as an
+int in one chunk and as text or a float in another. Key columns are
+therefore read as their raw text (`dtype=str`), which is the same in every
+chunk. A key column that also has aggregates needs inferred values, so its
+keys are then read in a separate pass.
+"""
+
+import math
+import os
+import tempfile
+from pathlib import Path
+from typing import Dict, Iterator, List, Optional, Sequence, Set, Tuple
+
+import pandas as pd
+
+from app.core.config import settings
+from app.services.aggregates import OUTLIER_COUNT, AggregateRequest, ColumnPartial, FrameAggregates
+
+
+# Rough ratio between the in-memory size of a chunk and the working memory
+# needed to evaluate it (masks, float copies, parser buffers)
+WORKING_SET_FACTOR = 4
+_SAMPLE_ROWS = 1000
+
+
+def memory_budget_bytes() -> int:
+    return settings.check_memory_limit_mb * 1024 * 1024
+
+
+def should_stream(file_path: Path) -> bool:
+    """Return whether a file is too large to be evaluated in memory."""
+
+    return os.path.getsize(file_path) * WORKING_SET_FACTOR > memory_budget_bytes()
+
+
+def chunk_rows_for(file_path: Path, usecols: Optional[Sequence[str]] = None) -> int:
+    """Pick a chunk size from the memory footprint of a sample of rows."""
+
+    sample = pd.read_csv(file_path, nrows=_SAMPLE_ROWS, usecols=usecols)
+    if sample.empty:
+        return settings.check_chunk_rows
+    row_bytes = max(int(sample.memory_usage(deep=True).sum()) // len(sample), 1)
+    fitting = memory_budget_bytes() // (row_bytes * WORKING_SET_FACTOR)
+    return int(max(_SAMPLE_ROWS, min(settings.check_chunk_rows, fitting)))
+
+
+class KeySpill:
+    """Exact duplicate counting over key columns using on-disk hash partitions."""
+
+    def __init__(self, keys: Tuple[str, ...], partitions: int, directory: Path) -> None:
+        self.keys = list(keys)
+        directory.mkdir()
+        self.paths = [directory / f"{i}.csv" for i in range(partitions)]
+        self.files = [open(path, "w", encoding="utf-8", newline="") for path in self.paths]
+
+    def add(self, chunk: pd.DataFrame) -> None:
+        """Spill the keys of a chunk whose key columns were read with `dtype=str`."""
+
+        # Missing values are spilled as empty fields; a present value is never empty
+        keys = chunk[self.keys].astype(object).where(chunk[self.keys].notna(), "")
+        buckets = pd.util.hash_pandas_object(keys, index=False).to_numpy() % len(self.files)
+        for bucket in set(buckets.tolist()):
+            keys[buckets == bucket].to_csv(self.files[bucket], header=False, index=False)
+
+    def duplicate_count(self) -> int:
+        duplicates = 0
+        for f, path in zip(self.files, self.paths):
+            f.close()
+            if path.stat().st_size:
+                partition = pd.read_csv(path, header=None, dtype=str, keep_default_na=False, skip_blank_lines=False)
+                duplicates += int(partition.duplicated().sum())
+            path.unlink()
+        return duplicates
+
+
+def _chunks(
+    file_path: Path, usecols: List[str], chunk_rows: int, text_columns: Optional[Set[str]] = None
+) -> Iterator[pd.DataFrame]:
+    if not usecols:
+        # Only the row count is needed; parse a single column
+        usecols = list(pd.read_csv(file_path, nrows=0).columns[:1])
+    dtype = {column: str for column in text_columns or ()}
+    yield from pd.read_csv(file_path, usecols=usecols, chunksize=chunk_rows, dtype=dtype or None)
+
+
+def stream_aggregates(file_path: Path, request: AggregateRequest) -> FrameAggregates:
+    """Compute the aggregates in `request` without loading the whole file."""
+
+    header = set(pd.read_csv(file_path, nrows=0).columns)
+    columns = {c: needed for c, needed in request.column_aggregates.items() if c in header}
+    key_sets = [keys for keys in request.key_sets if all(k in header for k in keys)]
+    key_columns = {k for keys in key_sets for k in keys}
+    # Keys are spilled from the main pass unless a key column also needs inferred values
+    keys_in_main_pass = key_columns.isdisjoint(columns)
+    usecols = sorted(set(columns) | (key_columns if keys_in_main_pass else set()))
+    chunk_rows = chunk_rows_for(file_path, usecols or None)
+    partitions = max(1, math.ceil(os.path.getsize(file_path) * WORKING_SET_FACTOR / memory_budget_bytes()))
+
+    partials: Dict[str, ColumnPartial] = {column: ColumnPartial() for column in columns}
+    row_count = 0
+    with tempfile.TemporaryDirectory(dir=settings.check_spill_dir) as spill_dir:
+        spills = [KeySpill(keys, partitions, Path(spill_dir) / str(i)) for i, keys in enumerate(key_sets)]
+        for chunk in _chunks(file_path, usecols, chunk_rows, key_columns if keys_in_main_pass else None):
+            row_count += len(chunk)
+            for column, needed in columns.items():
+                partials[column].update(chunk[column], needed)
+            if keys_in_main_pass:
+                for spill in spills:
+                    spill.add(chunk)
+        if not keys_in_main_pass:
+            for chunk in _chunks(file_path, sorted(key_columns), chunk_rows, key_columns):
+                for spill in spills:
+                    spill.add(chunk)
+        duplicates = {tuple(spill.keys): spill.duplicate_count() for spill in spills}
+
+    outlier_columns = [c for c, needed in columns.items() if OUTLIER_COUNT in needed]
+    if outlier_columns:
+        for chunk in _chunks(file_path, outlier_columns, chunk_rows):
+            for column in outlier_columns:
+                partials[column].count_outliers(chunk[column])
+
+    aggregates = FrameAggregates(row_count=row_count, duplicates=duplicates)
+    for column, partial in partials.items():
+        aggregates.columns[column] = partial.values(columns[column])
+    return aggregates
@@ -0,0 +1,165 @@
+"""Checkpointed reading of rows appended to a CSV file.
+
+`read_appended` seeks straight to the byte offset recorded in a
+`DatasetCheckpoint` and parses only the tail written since. The checkpoint
+also stores a hash of the header line and of the bytes just before the
+offset; if the file shrank or either hash no longer matches, the file was
+truncated or rewritten and is read again from the start. Only complete lines
+are consumed, so a row a producer is still writing is picked up next time.
+Quoted fields containing newlines are not supported in this mode.
+
+A last line without a trailing newline is ambiguous: it may be a row still
+being written or the final row of a file saved without one. `read_appended`
+only takes it as a row once two reads in a row found the file with the same
+size and mtime, i.e. the writer has not touched it for a whole check
+interval; until then the checkpoint stays before it. A later append then
+starts with the missing newline, which parses as a blank line and is skipped.
+
+`read_tail` parses only the last rows of a file without any checkpoint, for
+checks that only look at the newest rows. Having no earlier read to compare
+with, it always skips an unterminated last line.
+"""
+
+import hashlib
+import io
+import os
+from datetime import datetime
+from pathlib import Path
+from typing import Any, BinaryIO, Callable, Optional, Tuple
+
+import pandas as pd
+
+from app.db.models import DatasetCheckpoint
+
+
+# Number of bytes before the checkpoint offset hashed to detect rewrites
+FINGERPRINT_BYTES = 4096
+_SCAN_BYTES = 64 * 1024
+
+
+class _BoundedReader(io.RawIOBase):
+    """Read-only view of a binary file that stops at a fixed byte offset."""
+
+    def __init__(self, raw: BinaryIO, end: int) -> None:
+        self.raw = raw
+        self.remaining = max(end - raw.tell(), 0)
+
+    def readable(self) -> bool:
+        return True
+
+    def readinto(self, buffer: bytearray) -> int:
+        if not self.remaining:
+            return 0
+        data = self.raw.read(min(len(buffer), self.remaining))
+        buffer[: len(data)] = data
+        self.remaining -= len(data)
+        return len(data)
+
+
+def _digest(data: bytes) -> str:
+    return hashlib.sha1(data).hexdigest()
+
+
+def _last_line_end(f: BinaryIO, start: int, size: int) -> int:
+    """Return the offset just past the last newline in `[start, size)`, or `start`."""
+
+    position = size
+    while position > start:
+        window_start = max(start, position - _SCAN_BYTES)
+        f.seek(window_start)
+        index = f.read(position - window_start).rfind(b"\n")
+        if index >= 0:
+            return window_start + index + 1
+        position = window_start
+    return start
+
+
+def _fingerprint(f: BinaryIO, offset: int) -> str:
+    window_start = max(0, offset - FINGERPRINT_BYTES)
+    f.seek(window_start)
+    return _digest(f.read(offset - window_start))
+
+
+def _matches_checkpoint(f: BinaryIO, header: bytes, size: int, checkpoint: DatasetCheckpoint) -> bool:
+    if not checkpoint.byte_offset or size < checkpoint.byte_offset:
+        return False
+    if _digest(header) != checkpoint.header_hash:
+        return False
+    return _fingerprint(f, checkpoint.byte_offset) == checkpoint.tail_hash
+
+
+def read_appended(
+    file_path: Path,
+    checkpoint: DatasetCheckpoint,
+    reader: Callable[..., pd.DataFrame] = pd.read_csv,
+    **read_csv_kwargs: Any,
+) -> pd.DataFrame:
+    """Return rows appended since `checkpoint` and advance it past them.
+
+    The returned frame is indexed by row position in the file. When the file
+    is read from the start the index begins at 0. `reader` parses the bytes
+    and defaults to `pd.read_csv`; if it raises, the checkpoint is unchanged.
+    """
+
+    stat = os.stat(file_path)
+    size = stat.st_size
+    with open(file_path, "rb") as f:
+        header = f.readline()
+        header_end = f.tell()
+        matched = _matches_checkpoint(f, header, size, checkpoint)
+        if matched:
+            start, start_row = checkpoint.byte_offset, checkpoint.row_offset
+        else:
+            start, start_row = header_end, 0
+        end = _last_line_end(f, start, size)
+        if matched and size == checkpoint.file_size and stat.st_mtime == checkpoint.file_mtime:
+            # Unchanged since the previous read: the bytes after the last newline are the final row
+            end = size
+        frame: Optional[pd.DataFrame] = None
+        if end > start:
+            if start_row:
+                # Tail chunks carry no header line of their own
+                names = list(pd.read_csv(io.BytesIO(header), nrows=0).columns)
+                f.seek(start)
+                body = io.BufferedReader(_BoundedReader(f, end))
+                frame = reader(body, header=None, names=names, **read_csv_kwargs)
+            else:
+                f.seek(0)
+                frame = reader(io.BufferedReader(_BoundedReader(f, end)), **read_csv_kwargs)
+        if frame is None:
+            frame = reader(io.BytesIO(header), **read_csv_kwargs)
+        checkpoint.header_hash = _digest(header)
+        checkpoint.byte_offset = end
+        checkpoint.tail_hash = _fingerprint(f, end)
+    frame.index = pd.RangeIndex(start_row, start_row + len(frame))
+    checkpoint.row_offset = start_row + len(frame)
+    checkpoint.file_size = size
+    checkpoint.file_mtime = stat.st_mtime
+    checkpoint.updated_at = datetime.utcnow()
+    return frame
+
+
+def read_tail(file_path: Path, tail_bytes: int, **read_csv_kwargs: Any) -> Tuple[pd.DataFrame, bool]:
+    """Parse the complete lines within the last `tail_bytes` bytes of a file.
+
+    Returns the rows and whether they cover the whole file. The partial line
+    the window starts in is skipped, as is an unterminated last line.
+    """
+
+    size = os.path.getsize(file_path)
+    with open(file_path, "rb") as f:
+        header = f.readline()
+        header_end = f.tell()
+        start = max(header_end, size - tail_bytes)
+        if start > header_end:
+            # Skip to the first line starting inside the window
+            f.seek(start - 1)
+            f.readline()
+            start = f.tell()
+        end = _last_line_end(f, start, size)
+        names = list(pd.read_csv(io.BytesIO(header), nrows=0).columns)
+        if end <= start:
+            return pd.read_csv(io.BytesIO(header), **read_csv_kwargs), start == header_end
+        f.seek(start)
+        body = io.BufferedReader(_BoundedReader(f, end))
+        return pd.read_csv(body, header=None, names=names, **read_csv_kwargs), start == header_end
@@ -0,0 +1,161 @@
+"""Schema-driven typed parsing of datasets.
+
+The latest `SchemaVersion` of a dataset records the dtype of every column
+as pandas infers it from the file (`int64`, `float64`, `object`, ...), the
+same representation `jobs/schema_registry` compares against. `TypedSchema`
+turns it into explicit `read_csv` dtypes, so pandas does not have to infer
+types on every load. When no schema exists yet, or the file no longer
+matches it, types are inferred once with `TypedSchema.infer` and registered
+as a new schema version.
+
+Compact dtypes (int32, float32, category, UTC datetimes) depend on the
+values in the file rather than its schema, so they are never registered.
+`compact_series` applies them where that is lossless when the columnar cache
+stores a column (see `column_cache`). Versions registered with compact
+dtypes by earlier releases are not reused (`is_source_schema`); the next load
+registers the source dtypes instead.
+"""
+
+import hashlib
+import json
+import re
+from dataclasses import dataclass
+from typing import Any, Collection, Dict, Optional
+
+import numpy as np
+import pandas as pd
+from sqlmodel import Session, select
+
+from app.db.models import Dataset, SchemaVersion
+
+
+_DATE_LIKE = re.compile(r"^\d{4}-\d{2}-\d{2}")
+# Object columns with at most this ratio of distinct values become categories
+CATEGORY_RATIO = 0.5
+
+
+class SchemaMismatch(ValueError):
+    """Raised when a file cannot be parsed with its registered schema."""
+
+
+def _is_datetime(dtype_name: str) -> bool:
+    return dtype_name.startswith("datetime64")
+
+
+def is_source_schema(dtypes: Dict[str, str]) -> bool:
+    """Return whether `dtypes` are source dtypes rather than compact ones."""
+
+    return not any(name in {"int32", "float32", "category"} or _is_datetime(name) for name in dtypes.values())
+
+
+def _compact_dtype(series: pd.Series) -> str:
+    dtype = series.dtype
+    if isinstance(dtype, np.dtype) and dtype.kind == "i":
+        info = np.iinfo(np.int32)
+        if series.empty or (series.min() >= info.min and series.max() <= info.max):
+            return "int32"
+    if isinstance(dtype, np.dtype) and dtype.kind == "f":
+        values = series.to_numpy()
+        if np.array_equal(values.astype(np.float32).astype(values.dtype), values, equal_nan=True):
+            return "float32"
+    if pd.api.types.is_object_dtype(dtype) or pd.api.types.is_string_dtype(dtype):
+        valid = series.dropna()
+        if len(valid) and pd.api.types.infer_dtype(valid, skipna=True) == "string":
+            if _DATE_LIKE.match(valid.iloc[0]):
+                try:
+                    return str(pd.to_datetime(valid, utc=True).dtype)
+                except (ValueError, TypeError):
+                    pass
+            if valid.nunique() <= CATEGORY_RATIO * len(valid):
+                return "category"
+    return str(dtype)
+
+
+def compact_series(series: pd.Series) -> pd.Series:
+    """Convert a column to its compact dtype where that is lossless."""
+
+    name = _compact_dtype(series)
+    if name == str(series.dtype):
+        return series
+    if _is_datetime(name):
+        return pd.to_datetime(series, utc=True)
+    return series.astype(name)
+
+
+@dataclass
+class TypedSchema:
+    """Column dtypes used to parse a dataset without type inference."""
+
+    dtypes: Dict[str, str]
+
+    @classmethod
+    def infer(cls, frame: pd.DataFrame) -> "TypedSchema":
+        """Record the dtypes of a frame parsed with pandas' inference."""
+
+        return cls({column: str(dtype) for column, dtype in frame.dtypes.items()})
+
+    @property
+    def key(self) -> str:
+        """Stable identifier of the dtypes, used to key cached columns."""
+
+        return hashlib.sha1(json.dumps(self.dtypes, sort_keys=True).encode()).hexdigest()[:12]
+
+    def read_csv_kwargs(self, columns: Optional[Collection[str]] = None) -> Dict[str, Any]:
+        """Return `read_csv` keyword arguments parsing `columns` with explicit dtypes."""
+
+        dtype = {
+            column: object if _is_datetime(name) else name
+            for column, name in self.dtypes.items()
+            if columns is None or column in columns
+        }
+        return {"dtype": dtype}
+
+    def read_csv(self, source: Any, **kwargs: Any) -> pd.DataFrame:
+        """Parse a CSV with the schema's dtypes; raises `SchemaMismatch` if it no longer fits."""
+
+        usecols = kwargs.get("usecols")
+        columns = None if usecols is None or callable(usecols) else set(usecols)
+        try:
+            frame = pd.read_csv(source, **self.read_csv_kwargs(columns), **kwargs)
+        except (ValueError, TypeError) as exc:
+            raise SchemaMismatch(str(exc)) from exc
+        return self.apply(frame)
+
+    def apply(self, frame: pd.DataFrame) -> pd.DataFrame:
+        """Convert a parsed frame to the schema's dtypes.
+
+        Raises `SchemaMismatch` when a column no longer fits its dtype.
+        """
+
+        for column in frame.columns:
+            name = self.dtypes.get(column)
+            if name is None or str(frame[column].dtype) == name:
+                continue
+            try:
+                if _is_datetime(name):
+                    frame[column] = pd.to_datetime(frame[column], utc="UTC" in name)
+                else:
+                    frame[column] = frame[column].astype(name)
+            except (ValueError, TypeError) as exc:
+                raise SchemaMismatch(f"Column {column} does not match dtype {name}: {exc}") from exc
+        return frame
+
+
+def latest_schema_version(session: Session, dataset: Dataset) -> Optional[SchemaVersion]:
+    """Return the most recent registered schema of a dataset."""
+
+    return session.exec(
+        select(SchemaVersion).where(SchemaVersion.dataset_id == dataset.id).order_by(SchemaVersion.version.desc())
+    ).first()
+
+
+def next_schema_version(session: Session, dataset: Dataset, schema: TypedSchema) -> SchemaVersion:
+    """Build the next schema version of a dataset; the caller persists it."""
+
+    latest = latest_schema_version(session, dataset)
+    schema_version = SchemaVersion(
+        dataset_id=dataset.id,
+        version=(latest.version + 1) if latest else 1,
+        schema=dict(schema.dtypes),
+    )
+    return schema_version
@@ -1,17 +1,33 @@
 """Prometheus metrics definitions and instrumentation utilities.
 
 This module defines the metrics used across the backend and the quality job.
-FastAPI applications can use the `instrument_app` function to automatically
-collect request metrics, and the quality job can import and update the
-metrics directly when checks are executed. The metrics endpoint itself is
-exposed via `prometheus_client.make_asgi_app` in `main.py`.
+FastAPI applications install `MetricsMiddleware` to collect request metrics,
+and the quality job can import and update the metrics directly when checks
+are executed. The metrics endpoint itself is exposed via
+`prometheus_client.make_asgi_app` in `main.py`.
+
+Every process keeps its own metric values, so with several uvicorn workers
+or job worker processes a single process only sees its own share. When the
+`PROMETHEUS_MULTIPROC_DIR` environment variable names a directory, each
+process writes its values to files there and `metrics_registry` merges the
+files of all processes at scrape time. The variable must be set before the
+first process starts, and the directory must be emptied when the fleet
+restarts (the Docker entrypoint does both).
+
+Requests are labelled with the template of the route that handled them
+(`/incidents/{incident_id}`), never the raw path, so the number of series is
+bounded by the number of routes. Paths that match no route share the
+`UNMATCHED_ENDPOINT` label.
 """
 
+import os
+import socket
 import time
-from typing import Callable
+from typing import Any, Dict, Optional, Tuple
 
-from fastapi import Request, Response
-from prometheus_client import Counter, Histogram
+from prometheus_client import REGISTRY, CollectorRegistry, Counter, Gauge, Histogram, multiprocess, push_to_gateway
+from starlette.routing import Match, Mount
+from starlette.types import ASGIApp, Message, Receive, Scope, Send
 
 
 # HTTP request metrics
@@ -52,34 +68,115 @@ CHECK_DURATION_SECONDS = Histogram(
     ["dataset", "rule_type"],
 )
 
+CHECK_STAGE_SECONDS = Histogram(
+    "check_stage_duration_seconds",
+    "Time spent per stage of checking a dataset (fingerprint, schema, load, scan, evaluate, persist)",
+    ["dataset", "stage"],
+)
+
+DATASET_ROWS_SCANNED = Histogram(
+    "dataset_rows_scanned",
+    "Rows parsed or aggregated to check a dataset",
+    ["dataset"],
+    buckets=(0, 1e2, 1e3, 1e4, 1e5, 1e6, 1e7, 1e8, 1e9),
+)
+
+DATASET_BYTES_READ = Histogram(
+    "dataset_bytes_read",
+    "Bytes read by the quality job to check a dataset",
+    ["dataset"],
+    buckets=(0, 2**10, 2**16, 2**20, 2**24, 2**28, 2**30, 2**32, 2**34),
+)
+
+DATASET_PEAK_MEMORY_BYTES = Gauge(
+    "dataset_peak_memory_bytes",
+    "Peak resident memory of the job process while checking a dataset",
+    ["dataset"],
+    # In multiprocess mode report the value of the latest check, whichever worker ran it
+    multiprocess_mode="mostrecent",
+)
+
 
-async def metrics_middleware(request: Request, call_next: Callable[[Request], Response]) -> Response:
-    """Middleware for recording HTTP request metrics.
+# Endpoint label of requests that matched no route, e.g. 404s from scanners
+UNMATCHED_ENDPOINT = "<unmatched>"
+# Methods outside this set are labelled "OTHER", as clients can send any token
+HTTP_METHODS = frozenset({"GET", "HEAD", "POST", "PUT", "PATCH", "DELETE", "OPTIONS"})
 
-    Records the total count, latency and errors for each request. The
-    endpoint label is derived from the route path template when available.
+
+def route_template(scope: Scope, path: str, root_path: str) -> str:
+    """Return the path template of the route that handled a request.
+
+    FastAPI records the matched route in the scope. Mounted applications
+    such as `/metrics` do not, so they are matched against the app's mounts
+    using the path the request arrived with.
+    """
+
+    route = scope.get("route")
+    if route is not None:
+        return route.path
+    router = getattr(scope.get("app"), "router", None)
+    if router is not None:
+        probe = {"type": "http", "path": path, "root_path": root_path}
+        for candidate in router.routes:
+            if isinstance(candidate, Mount) and candidate.matches(probe)[0] == Match.FULL:
+                return candidate.path
+    return UNMATCHED_ENDPOINT
+
+
+class MetricsMiddleware:
+    """Pure ASGI middleware recording the count, latency and errors of HTTP requests.
+
+    Unlike `BaseHTTPMiddleware` it does not wrap the request or response in
+    extra tasks and streams; it only observes the status of the response
+    start message. Labelled metric children are cached per label set.
     """
 
-    method = request.method
-    # Use the route name if available, otherwise the raw path
-    endpoint = request.scope.get("path") or "unknown"
-    start_time = time.perf_counter()
-    try:
-        response = await call_next(request)
-    except Exception:
+    def __init__(self, app: ASGIApp) -> None:
+        self.app = app
+        self.children: Dict[Tuple[str, str, int], Tuple[Any, Any, Optional[Any]]] = {}
+
+    def _children(self, method: str, endpoint: str, status_code: int) -> Tuple[Any, Any, Optional[Any]]:
+        key = (method, endpoint, status_code)
+        children = self.children.get(key)
+        if children is None:
+            errors = None
+            if status_code >= 400:
+                errors = HTTP_REQUEST_ERRORS.labels(method=method, endpoint=endpoint, status_code=status_code)
+            children = self.children[key] = (
+                HTTP_REQUEST_COUNT.labels(method=method, endpoint=endpoint, status_code=status_code),
+                HTTP_REQUEST_LATENCY.labels(method=method, endpoint=endpoint),
+                errors,
+            )
+        return children
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send) -> None:
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+        path, root_path = scope["path"], scope.get("root_path", "")
         status_code = 500
-        HTTP_REQUEST_COUNT.labels(method=method, endpoint=endpoint, status_code=status_code).inc()
-        HTTP_REQUEST_ERRORS.labels(method=method, endpoint=endpoint, status_code=status_code).inc()
-        raise
-    else:
-        status_code = response.status_code
-        HTTP_REQUEST_COUNT.labels(method=method, endpoint=endpoint, status_code=status_code).inc()
-        if status_code >= 400:
-            HTTP_REQUEST_ERRORS.labels(method=method, endpoint=endpoint, status_code=status_code).inc()
-        return response
-    finally:
-        latency = time.perf_counter() - start_time
-        HTTP_REQUEST_LATENCY.labels(method=method, endpoint=endpoint).observe(latency)
+        start_time = time.perf_counter()
+
+        async def send_with_status(message: Message) -> None:
+            nonlocal status_code
+            if message["type"] == "http.response.start":
+                status_code = message["status"]
+            await send(message)
+
+        try:
+            await self.app(scope, receive, send_with_status)
+        except Exception:
+            status_code = 500
+            raise
+        finally:
+            latency = time.perf_counter() - start_time
+            endpoint = route_template(scope, path, root_path)
+            method = scope["method"] if scope["method"] in HTTP_METHODS else "OTHER"
+            count, latency_histogram, errors = self._children(method, endpoint, status_code)
+            count.inc()
+            latency_histogram.observe(latency)
+            if errors is not None:
+                errors.inc()
 
 
 def record_incident(dataset: str, rule_type: str, severity: str) -> None:
@@ -92,4 +189,44 @@ def record_check(dataset: str, rule_type: str, duration: float) -> None:
     """Record metrics for a single check execution."""
 
     CHECKS_RUN_TOTAL.labels(dataset=dataset, rule_type=rule_type).inc()
-    CHECK_DURATION_SECONDS.labels(dataset=dataset, rule_type=rule_type).observe(duration)
\ No newline at end of file
+    CHECK_DURATION_SECONDS.labels(dataset=dataset, rule_type=rule_type).observe(duration)
+
+
+def record_stage(dataset: str, stage: str, duration: float) -> None:
+    """Record the time spent in one stage of checking a dataset."""
+
+    CHECK_STAGE_SECONDS.labels(dataset=dataset, stage=stage).observe(duration)
+
+
+def record_dataset_resources(dataset: str, rows_scanned: int, bytes_read: int, peak_memory_bytes: int) -> None:
+    """Record the rows, bytes and peak memory used to check a dataset."""
+
+    DATASET_ROWS_SCANNED.labels(dataset=dataset).observe(rows_scanned)
+    DATASET_BYTES_READ.labels(dataset=dataset).observe(bytes_read)
+    DATASET_PEAK_MEMORY_BYTES.labels(dataset=dataset).set(peak_memory_bytes)
+
+
+def multiprocess_enabled() -> bool:
+    """Return whether metric values are shared through `PROMETHEUS_MULTIPROC_DIR`."""
+
+    return "PROMETHEUS_MULTIPROC_DIR" in os.environ
+
+
+def metrics_registry() -> CollectorRegistry:
+    """Return the registry to expose: every process's metrics in multiprocess mode, else this process's."""
+
+    if not multiprocess_enabled():
+        return REGISTRY
+    registry = CollectorRegistry()
+    multiprocess.MultiProcessCollector(registry)
+    return registry
+
+
+def push_metrics(gateway: str, job: str) -> None:
+    """Push the metrics of this process, and its workers in multiprocess mode, to a Pushgateway.
+
+    The group is keyed by host so runs on different machines do not replace
+    each other's metrics.
+    """
+
+    push_to_gateway(gateway, job=job, registry=metrics_registry(), grouping_key={"instance": socket.gethostname()})
@@ -0,0 +1,133 @@
+"""Per-dataset cost accounting for the quality job.
+
+`DatasetRunStats` collects what checking one dataset cost: wall time per
+stage, time per rule, rows scanned, bytes read and peak resident memory.
+`finish` publishes them to the Prometheus metrics in `metrics` and returns a
+plain dict for the structured run summary.
+
+Stages are `fingerprint` (hashing the file and rules), `schema` (looking up,
+comparing or inferring the typed schema), `load` (reading and parsing the
+file into a frame), `scan` (strategies that parse and aggregate in one pass:
+tail, incremental and streaming reads), `evaluate` (computing rule metrics
+from a frame or from aggregates) and `persist` (writing results).
+
+Bytes read and peak memory come from `/proc/self` on Linux. Bytes read is the
+`rchar` counter, i.e. everything the process read, including files served
+from the page cache; memory-mapped cache reads are not counted. The peak
+memory high-water mark is reset before each dataset where the kernel allows
+it; elsewhere the process-wide peak is reported.
+"""
+
+import resource
+import time
+from contextlib import contextmanager
+from dataclasses import dataclass, field
+from typing import Any, Dict, Iterator, List, Optional
+
+from app.telemetry.metrics import record_check, record_dataset_resources, record_stage
+
+
+STAGES = ("fingerprint", "schema", "load", "scan", "evaluate", "persist")
+
+
+def _bytes_read() -> Optional[int]:
+    try:
+        with open("/proc/self/io") as f:
+            for line in f:
+                if line.startswith("rchar:"):
+                    return int(line.split()[1])
+    except OSError:
+        pass
+    return None
+
+
+def _reset_peak_memory() -> None:
+    try:
+        # "5" resets the VmHWM high-water mark of the process (Linux 4.0+)
+        with open("/proc/self/clear_refs", "w") as f:
+            f.write("5")
+    except OSError:
+        pass
+
+
+def _peak_memory() -> int:
+    try:
+        with open("/proc/self/status") as f:
+            for line in f:
+                if line.startswith("VmHWM:"):
+                    return int(line.split()[1]) * 1024
+    except OSError:
+        pass
+    # ru_maxrss is in kilobytes on Linux and bytes on macOS; the former is assumed
+    return resource.getrusage(resource.RUSAGE_SELF).ru_maxrss * 1024
+
+
+@dataclass
+class RuleTiming:
+    rule_id: int
+    rule_type: str
+    seconds: float
+
+
+@dataclass
+class DatasetRunStats:
+    """Cost of checking one dataset; `start` and `finish` bracket the run."""
+
+    dataset: str
+    strategy: str = "none"  # tail, incremental, stream, full, or none when nothing was evaluated
+    stage_seconds: Dict[str, float] = field(default_factory=dict)
+    rules: List[RuleTiming] = field(default_factory=list)
+    rows_scanned: int = 0
+    bytes_read: int = 0
+    peak_memory_bytes: int = 0
+    duration_seconds: float = 0.0
+    started_at: float = 0.0
+    bytes_at_start: Optional[int] = None
+
+    def start(self) -> None:
+        _reset_peak_memory()
+        self.bytes_at_start = _bytes_read()
+        self.started_at = time.perf_counter()
+
+    @contextmanager
+    def stage(self, name: str) -> Iterator[None]:
+        """Add the time spent in the block to stage `name`; nested stages are subtracted."""
+
+        started = time.perf_counter()
+        outer = dict(self.stage_seconds)
+        try:
+            yield
+        finally:
+            nested = sum(self.stage_seconds.values()) - sum(outer.values())
+            elapsed = time.perf_counter() - started - nested
+            self.stage_seconds[name] = self.stage_seconds.get(name, 0.0) + elapsed
+
+    def record_rules(self, rules: List[Any], seconds: List[float]) -> None:
+        self.rules.extend(RuleTiming(rule.id, rule.rule_type, elapsed) for rule, elapsed in zip(rules, seconds))
+
+    def finish(self) -> Dict[str, Any]:
+        """Publish the collected figures as Prometheus metrics and return them as a summary."""
+
+        self.duration_seconds = time.perf_counter() - self.started_at
+        bytes_now = _bytes_read()
+        if bytes_now is not None and self.bytes_at_start is not None:
+            self.bytes_read = bytes_now - self.bytes_at_start
+        self.peak_memory_bytes = _peak_memory()
+        for stage, seconds in self.stage_seconds.items():
+            record_stage(self.dataset, stage, seconds)
+        for rule in self.rules:
+            record_check(self.dataset, rule.rule_type, rule.seconds)
+        record_dataset_resources(self.dataset, self.rows_scanned, self.bytes_read, self.peak_memory_bytes)
+        return self.summary()
+
+    def summary(self) -> Dict[str, Any]:
+        return {
+            "dataset": self.dataset,
+            "strategy": self.strategy,
+            "duration_seconds": round(self.duration_seconds, 4),
+            "stage_seconds": {stage: round(seconds, 4) for stage, seconds in self.stage_seconds.items()},
+            "rule_seconds": {f"{rule.rule_id}:{rule.rule_type}": round(rule.seconds, 4) for rule in self.rules},
+            "rows_scanned": self.rows_scanned,
+            "bytes_read": self.bytes_read,
+            "peak_memory_bytes": self.peak_memory_bytes,
+        }
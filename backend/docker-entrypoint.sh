@@ -0,0 +1,10 @@
+#!/bin/sh
+# Start every container with an empty Prometheus multiprocess directory;
+# files left by the processes of a previous start would be reported as
+# current values.
+set -e
+if [ -n "$PROMETHEUS_MULTIPROC_DIR" ]; then
+    rm -rf "$PROMETHEUS_MULTIPROC_DIR"
+    mkdir -p "$PROMETHEUS_MULTIPROC_DIR"
+fi
+exec "$@"
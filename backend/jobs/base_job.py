@@ -10,7 +10,7 @@ from abc import ABC, abstractmethod
 
 from sqlmodel import Session
 
-from app.db.session import get_session
+from app.db.session import engine
 
 
 class BaseJob(ABC):
@@ -22,5 +22,5 @@ class BaseJob(ABC):
         raise NotImplementedError
 
     def get_session(self) -> Session:
-        """Helper to obtain a SQLModel session."""
-        return next(get_session())
\ No newline at end of file
+        """Helper to obtain a SQLModel session; the caller closes it."""
+        return Session(engine)
\ No newline at end of file
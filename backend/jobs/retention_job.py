@@ -0,0 +1,53 @@
+"""Apply the retention policies to the check history.
+
+Runs next to `run_quality_job` and removes check runs, closed incidents,
+superseded schema versions and rolled up metric points older than their
+retention periods in `Settings`, archiving them first when an archive
+directory is configured (see `app.services.retention`). Run it with `--once`
+from cron or let it loop every `--interval` seconds.
+"""
+
+import argparse
+import time
+from datetime import datetime
+
+from app.core.logging import configure_logging, get_logger
+from app.db.session import get_session
+from app.services.retention import apply_policy, default_archive, default_policies
+
+
+logger = get_logger(__name__)
+
+
+def run_once() -> None:
+    """Apply every policy, logging the rows removed per table."""
+
+    now = datetime.utcnow()
+    archive = default_archive(now)
+    for policy in default_policies():
+        started = time.perf_counter()
+        with get_session() as session:
+            removed = apply_policy(session, policy, now, archive)
+        logger.info(
+            "retention_applied",
+            table=policy.table.name,
+            rows_removed=removed,
+            duration_seconds=round(time.perf_counter() - started, 3),
+        )
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="Remove check history past its retention period")
+    parser.add_argument("--once", action="store_true", help="Run a single pass and exit")
+    parser.add_argument("--interval", type=int, default=3600, help="Seconds between passes in continuous mode")
+    args = parser.parse_args()
+    configure_logging()
+    while True:
+        run_once()
+        if args.once:
+            break
+        time.sleep(args.interval)
+
+
+if __name__ == "__main__":
+    main()
@@ -3,32 +3,291 @@
 This script can be invoked manually or scheduled via cron/Kubernetes. It will
 load datasets and rules from the database, execute the quality checks using
 the local `QualityService`, persist the results and update Prometheus
-metrics. It supports running once or continuously in a loop.
+metrics. It supports running once or continuously.
+
+In continuous mode `DatasetScheduler` runs each dataset on its own cadence
+(`Dataset.check_interval_seconds`, defaulting to `--interval`) from a
+priority queue ordered by next due time. A dataset is never queued while
+its previous run is in flight, and a run that overruns its interval is
+followed by a single immediate catch-up run instead of one per missed tick.
+
+Each dataset is checked in its own database session, so a failing dataset
+(for example a missing file) is logged and counted in the run summary
+without aborting the others. With `--workers N` datasets are spread over a
+pool of N processes; every worker opens its own connections. A single-process
+run buffers the results of all datasets and bulk inserts them in batches,
+committing each dataset's read checkpoint and column statistics in the same
+transaction as its results.
+
+Every checked dataset logs a `dataset_run_stats` line with its time per stage
+and per rule, rows scanned, bytes read and peak memory (see `run_stats`); the
+run summary adds them up and names the slowest rules and stages.
+
+In continuous mode the job serves its Prometheus metrics on `--metrics-port`;
+`--once` runs push them to `Settings.metrics_pushgateway_url` when set. The
+metrics of worker processes are only included in multiprocess mode, i.e.
+when `PROMETHEUS_MULTIPROC_DIR` is set (see `app.telemetry.metrics`).
 """
 
 import argparse
+import heapq
 import time
+from collections import Counter
+from contextlib import nullcontext
+from concurrent.futures import FIRST_COMPLETED, Executor, Future, ProcessPoolExecutor, as_completed, wait
+from dataclasses import dataclass, field
+from typing import Any, Dict, List, Optional, Tuple
 
-from sqlmodel import Session, select
+from prometheus_client import start_http_server
+from sqlmodel import select
 
+from app.core.config import settings
+from app.core.logging import configure_logging, get_logger
 from app.db.models import Dataset
-from app.db.session import get_session
+from app.db.session import engine, get_session
 from app.services.quality_service import QualityService
+from app.services.result_writer import ResultWriter
+from app.telemetry.metrics import metrics_registry, multiprocess_enabled, push_metrics
+
+
+logger = get_logger(__name__)
+
+
+@dataclass
+class DatasetOutcome:
+    """Result of checking a single dataset."""
+
+    dataset_id: int
+    dataset_name: str
+    succeeded: bool
+    duration_seconds: float
+    error: Optional[str] = None
+    stats: Optional[Dict[str, Any]] = None  # DatasetRunStats.summary() of a successful check
+
+
+@dataclass
+class RunSummary:
+    """Aggregated outcome of one run over many datasets."""
+
+    outcomes: List[DatasetOutcome] = field(default_factory=list)
+    duration_seconds: float = 0.0
+
+    @property
+    def failed(self) -> List[DatasetOutcome]:
+        return [outcome for outcome in self.outcomes if not outcome.succeeded]
+
+    def cost(self, top: int = 5) -> Dict[str, Any]:
+        """Add up the cost of the checked datasets and pick the `top` slowest rules and stages."""
+
+        stats = [outcome.stats for outcome in self.outcomes if outcome.stats]
+        stage_seconds: Counter = Counter()
+        rule_seconds: Counter = Counter()
+        for item in stats:
+            stage_seconds.update(item["stage_seconds"])
+            rule_seconds.update({f"{item['dataset']}/{rule}": s for rule, s in item["rule_seconds"].items()})
+        return {
+            "rows_scanned": sum(item["rows_scanned"] for item in stats),
+            "bytes_read": sum(item["bytes_read"] for item in stats),
+            "peak_memory_bytes": max((item["peak_memory_bytes"] for item in stats), default=0),
+            "stage_seconds": {stage: round(s, 3) for stage, s in stage_seconds.most_common(top)},
+            "slowest_rules": {rule: round(s, 3) for rule, s in rule_seconds.most_common(top)},
+        }
+
+    def log(self) -> None:
+        for outcome in self.failed:
+            logger.error("dataset_check_failed", dataset=outcome.dataset_name, error=outcome.error)
+        logger.info(
+            "quality_run_finished",
+            datasets=len(self.outcomes),
+            succeeded=len(self.outcomes) - len(self.failed),
+            failed=len(self.failed),
+            duration_seconds=round(self.duration_seconds, 3),
+            slowest=max(self.outcomes, key=lambda o: o.duration_seconds).dataset_name if self.outcomes else None,
+            **self.cost(),
+        )
+
+
+def check_dataset(dataset_id: int, dataset_name: str, results: Optional[ResultWriter] = None) -> DatasetOutcome:
+    """Run the checks of one dataset in a fresh session, capturing any failure.
+
+    Results go to `results` when given, otherwise they are written before returning.
+    The rows a failed check queued in `results` are dropped.
+    """
+
+    started = time.perf_counter()
+    rows = results.dataset() if results is not None else nullcontext()
+    try:
+        with rows, get_session() as session:
+            dataset = session.get(Dataset, dataset_id)
+            if dataset is None:
+                raise ValueError(f"Dataset {dataset_name} no longer exists")
+            stats = QualityService(session, results).run_checks_for_dataset(dataset)
+    except Exception as exc:
+        return DatasetOutcome(
+            dataset_id, dataset_name, False, time.perf_counter() - started, f"{type(exc).__name__}: {exc}"
+        )
+    return DatasetOutcome(dataset_id, dataset_name, True, time.perf_counter() - started, stats=stats)
+
 
+def _init_worker() -> None:
+    # Connections inherited from the parent must not be shared with it
+    engine.dispose(close=False)
+    configure_logging()
 
-def run_once(dataset_name: str | None = None) -> None:
+
+def _run_parallel(datasets: Dict[int, str], workers: int) -> List[DatasetOutcome]:
+    outcomes: List[DatasetOutcome] = []
+    with ProcessPoolExecutor(max_workers=workers, initializer=_init_worker) as executor:
+        futures: Dict[Future, int] = {
+            executor.submit(check_dataset, dataset_id, name): dataset_id for dataset_id, name in datasets.items()
+        }
+        for future in as_completed(futures):
+            dataset_id = futures[future]
+            try:
+                outcomes.append(future.result())
+            except Exception as exc:
+                # The worker process itself died (e.g. killed for memory)
+                outcomes.append(DatasetOutcome(dataset_id, datasets[dataset_id], False, 0.0, repr(exc)))
+    return outcomes
+
+
+def run_once(dataset_name: str | None = None, workers: int = 1) -> RunSummary:
     """Run quality checks once for all or a single dataset."""
 
+    started = time.perf_counter()
     with get_session() as session:
-        service = QualityService(session)
+        statement = select(Dataset.id, Dataset.name)
         if dataset_name:
-            dataset = session.exec(select(Dataset).where(Dataset.name == dataset_name)).first()
-            if not dataset:
-                raise ValueError(f"Dataset {dataset_name} not found")
-            service.run_checks_for_dataset(dataset)
+            statement = statement.where(Dataset.name == dataset_name)
+        datasets: Dict[int, str] = dict(session.exec(statement).all())
+    if dataset_name and not datasets:
+        raise ValueError(f"Dataset {dataset_name} not found")
+    if workers > 1 and len(datasets) > 1:
+        # Release pooled connections before forking the workers
+        engine.dispose()
+        outcomes = _run_parallel(datasets, min(workers, len(datasets)))
+    else:
+        # Batch the results of all datasets into bulk inserts
+        with get_session() as session:
+            results = ResultWriter(session)
+            outcomes = [check_dataset(dataset_id, name, results) for dataset_id, name in datasets.items()]
+            results.flush()
+    summary = RunSummary(outcomes=outcomes, duration_seconds=time.perf_counter() - started)
+    summary.log()
+    return summary
+
+
+class DatasetScheduler:
+    """Run every dataset on its own cadence with at most `workers` checks in flight.
+
+    `next_due` holds the authoritative due time (on the monotonic clock) of
+    every idle dataset; heap entries that no longer match it are stale and
+    skipped. Datasets and their cadences are reloaded every
+    `refresh_seconds`, so new datasets and changed intervals are picked up
+    without restarting the job.
+    """
+
+    def __init__(
+        self,
+        default_interval: int,
+        workers: int = 1,
+        dataset_name: Optional[str] = None,
+        refresh_seconds: float = 60.0,
+    ) -> None:
+        self.default_interval = default_interval
+        self.workers = workers
+        self.dataset_name = dataset_name
+        self.refresh_seconds = refresh_seconds
+        self.queue: List[Tuple[float, int]] = []
+        self.next_due: Dict[int, float] = {}
+        self.intervals: Dict[int, int] = {}
+        self.names: Dict[int, str] = {}
+        self.running: Dict[Future, Tuple[int, float]] = {}
+        self.next_refresh = 0.0
+
+    def _schedule(self, dataset_id: int, due: float) -> None:
+        self.next_due[dataset_id] = due
+        heapq.heappush(self.queue, (due, dataset_id))
+
+    def refresh(self, now: float) -> None:
+        """Reload datasets and cadences from the database."""
+
+        with get_session() as session:
+            statement = select(Dataset.id, Dataset.name, Dataset.check_interval_seconds)
+            if self.dataset_name:
+                statement = statement.where(Dataset.name == self.dataset_name)
+            rows = session.exec(statement).all()
+        self.names = {dataset_id: name for dataset_id, name, _ in rows}
+        in_flight = {dataset_id for dataset_id, _ in self.running.values()}
+        for dataset_id, _, interval in rows:
+            interval = interval or self.default_interval
+            previous = self.intervals.get(dataset_id)
+            self.intervals[dataset_id] = interval
+            if dataset_id in in_flight:
+                continue
+            if dataset_id not in self.next_due:
+                self._schedule(dataset_id, now)
+            elif previous is not None and interval < previous:
+                # Do not wait out the remainder of a longer, outdated interval
+                self._schedule(dataset_id, min(self.next_due[dataset_id], now + interval))
+        for dataset_id in set(self.next_due) - set(self.names):
+            del self.next_due[dataset_id]
+        self.next_refresh = now + self.refresh_seconds
+
+    def _dispatch(self, executor: Optional[Executor], now: float) -> None:
+        while self.queue and self.queue[0][0] <= now and len(self.running) < self.workers:
+            due, dataset_id = heapq.heappop(self.queue)
+            if self.next_due.get(dataset_id) != due:
+                continue
+            del self.next_due[dataset_id]
+            name = self.names[dataset_id]
+            if executor is None:
+                future: Future = Future()
+                future.set_result(check_dataset(dataset_id, name))
+            else:
+                future = executor.submit(check_dataset, dataset_id, name)
+            self.running[future] = (dataset_id, due)
+
+    def _complete(self, future: Future, now: float) -> None:
+        dataset_id, due = self.running.pop(future)
+        name = self.names.get(dataset_id, str(dataset_id))
+        try:
+            outcome = future.result()
+        except Exception as exc:
+            outcome = DatasetOutcome(dataset_id, name, False, 0.0, repr(exc))
+        if outcome.succeeded:
+            logger.info("dataset_checked", dataset=name, duration_seconds=round(outcome.duration_seconds, 3))
         else:
-            for dataset in session.exec(select(Dataset)).all():
-                service.run_checks_for_dataset(dataset)
+            logger.error("dataset_check_failed", dataset=name, error=outcome.error)
+        if dataset_id in self.names:
+            # Stay on the original grid; coalesce ticks missed by a slow run
+            self._schedule(dataset_id, max(due + self.intervals[dataset_id], now))
+
+    def run_forever(self) -> None:
+        executor: Optional[Executor] = None
+        if self.workers > 1:
+            engine.dispose()
+            executor = ProcessPoolExecutor(max_workers=self.workers, initializer=_init_worker)
+        try:
+            while True:
+                now = time.monotonic()
+                if now >= self.next_refresh:
+                    self.refresh(now)
+                self._dispatch(executor, now)
+                wake_at = self.next_refresh
+                if self.queue and len(self.running) < self.workers:
+                    wake_at = min(wake_at, self.queue[0][0])
+                timeout = max(wake_at - time.monotonic(), 0.0)
+                if self.running:
+                    done, _ = wait(list(self.running), timeout=timeout, return_when=FIRST_COMPLETED)
+                else:
+                    time.sleep(timeout)
+                    done = set()
+                for future in done:
+                    self._complete(future, time.monotonic())
+        finally:
+            if executor is not None:
+                executor.shutdown(cancel_futures=True)
 
 
 def main() -> None:
@@ -43,16 +302,40 @@ def main() -> None:
         "--interval",
         type=int,
         default=60,
-        help="Interval in seconds between continuous runs",
+        help="Default interval in seconds between runs of a dataset without its own cadence",
+    )
+    parser.add_argument(
+        "--workers",
+        type=int,
+        default=1,
+        help="Number of worker processes checking datasets in parallel",
+    )
+    parser.add_argument(
+        "--metrics-port",
+        type=int,
+        default=settings.prometheus_port,
+        help="Port serving Prometheus metrics in continuous mode; 0 disables it",
     )
     args = parser.parse_args()
+    if args.workers < 1:
+        parser.error("--workers must be at least 1")
+    configure_logging()
+    if args.workers > 1 and not multiprocess_enabled():
+        logger.warning("worker_metrics_not_exported", reason="PROMETHEUS_MULTIPROC_DIR is not set")
     if args.once:
-        run_once(args.dataset)
+        summary = run_once(args.dataset, args.workers)
+        if settings.metrics_pushgateway_url:
+            try:
+                push_metrics(settings.metrics_pushgateway_url, job="quality_job")
+            except OSError as exc:
+                logger.error("metrics_push_failed", gateway=settings.metrics_pushgateway_url, error=str(exc))
+        if summary.failed:
+            raise SystemExit(1)
     else:
-        while True:
-            run_once(args.dataset)
-            time.sleep(args.interval)
+        if args.metrics_port:
+            start_http_server(args.metrics_port, registry=metrics_registry())
+        DatasetScheduler(args.interval, args.workers, args.dataset).run_forever()
 
 
 if __name__ == "__main__":
-    main()
\ No newline at end of file
+    main()
@@ -7,24 +7,28 @@ demo and test modes. The API mirrors what the Spark job exposes to keep
 clients agnostic of the execution engine.
 """
 
-from typing import Dict, List, Tuple
+from typing import Dict, List, Optional, Tuple
 
 import pandas as pd
 
+from app.core.config import settings
 from app.db.models import Dataset, Rule
-from app.services.rule_engine import evaluate_rule
+from app.services.rule_engine import evaluate_rules
 
 
 def run_checks(
-    df: pd.DataFrame, dataset: Dataset, rules: List[Rule]
+    df: pd.DataFrame, dataset: Dataset, rules: List[Rule], workers: Optional[int] = None
 ) -> List[Tuple[Rule, float, bool, str]]:
     """Execute all rules against a DataFrame and return results.
 
-    Each result in the returned list is a tuple `(rule, metric_value, passed, description)`.
+    Each result in the returned list is a tuple `(rule, metric_value, passed, description)`,
+    in the order of `rules`. Rules are grouped by column and the groups run on
+    `workers` threads (`Settings.check_rule_workers` when None).
     """
 
+    if workers is None:
+        workers = settings.check_rule_workers
     results: List[Tuple[Rule, float, bool, str]] = []
-    for rule in rules:
-        metric_value, passed, description = evaluate_rule(df, rule)
+    for rule, (metric_value, passed, description) in zip(rules, evaluate_rules(df, rules, workers)):
         results.append((rule, metric_value, passed, description))
     return results
\ No newline at end of file
@@ -0,0 +1,29 @@
+"""Shared pytest configuration.
+
+`Settings` requires a secret key and a database URL, so defaults are set
+before any `app` module is imported. Tests that need a database create their
+own in-memory SQLite engine.
+"""
+
+import os
+
+import pytest
+from sqlalchemy.pool import StaticPool
+from sqlmodel import Session, SQLModel, create_engine
+
+
+os.environ.setdefault("SECRET_KEY", "test-secret-key")
+os.environ.setdefault("DATABASE_URL", "sqlite://")
+
+
+@pytest.fixture
+def session():
+    """Session on a fresh in-memory database with every table created."""
+
+    import app.db.models  # noqa: F401  registers the tables
+
+    engine = create_engine("sqlite://", connect_args={"check_same_thread": False}, poolclass=StaticPool)
+    SQLModel.metadata.create_all(engine)
+    with Session(engine) as session:
+        yield session
+    engine.dispose()
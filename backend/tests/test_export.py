@@ -0,0 +1,25 @@
+import io
+import json
+from datetime import datetime
+
+from app.services.export import write_ndjson
+
+
+def test_non_finite_metrics_are_written_as_null():
+    out = io.StringIO()
+    rows = [
+        (1, float("nan"), {"1:distribution_drift": float("inf"), "2:completeness": 0.5}, datetime(2024, 1, 1)),
+        (2, float("-inf"), {"values": [float("nan"), 1.0]}, datetime(2024, 1, 2)),
+    ]
+
+    write_ndjson(out, ["id", "metric_value", "metrics", "run_at"], rows)
+
+    # parse_constant rejects the NaN/Infinity tokens strict consumers cannot read
+    lines = [json.loads(line, parse_constant=lambda token: 1 / 0) for line in out.getvalue().splitlines()]
+    assert lines[0] == {
+        "id": 1,
+        "metric_value": None,
+        "metrics": {"1:distribution_drift": None, "2:completeness": 0.5},
+        "run_at": "2024-01-01T00:00:00",
+    }
+    assert lines[1]["metric_value"] is None and lines[1]["metrics"] == {"values": [None, 1.0]}
@@ -0,0 +1,61 @@
+from datetime import datetime, timedelta
+
+import pytest
+from fastapi import FastAPI
+from fastapi.testclient import TestClient
+
+from app.api import incidents
+from app.core.pagination import NEXT_CURSOR_HEADER
+from app.db.models import Incident
+from app.db.session import ThreadedSession, get_read_session
+
+
+@pytest.fixture
+def client(session):
+    start = datetime(2024, 1, 1)
+    for i in range(5):
+        session.add(
+            Incident(
+                dataset_id=1,
+                rule_id=i,
+                created_at=start + timedelta(minutes=i),
+                metric_value=1.0,
+                severity="high",
+                description="failed",
+            )
+        )
+    session.commit()
+    app = FastAPI()
+    app.include_router(incidents.router, prefix="/incidents")
+
+    async def read_session():
+        yield ThreadedSession(session)
+
+    app.dependency_overrides[get_read_session] = read_session
+    return TestClient(app)
+
+
+def rule_ids(response):
+    return [incident["rule_id"] for incident in response.json()]
+
+
+def test_cursor_pages_follow_the_header(client):
+    first = client.get("/incidents/", params={"limit": 2})
+    second = client.get("/incidents/", params={"limit": 2, "cursor": first.headers[NEXT_CURSOR_HEADER]})
+
+    assert rule_ids(first) == [4, 3]
+    assert rule_ids(second) == [2, 1]
+
+
+def test_offset_is_still_accepted(client):
+    response = client.get("/incidents/", params={"limit": 2, "offset": 2})
+
+    assert rule_ids(response) == [2, 1]
+
+
+def test_offset_and_cursor_are_rejected_together(client):
+    cursor = client.get("/incidents/", params={"limit": 2}).headers[NEXT_CURSOR_HEADER]
+
+    response = client.get("/incidents/", params={"limit": 2, "offset": 2, "cursor": cursor})
+
+    assert response.status_code == 400
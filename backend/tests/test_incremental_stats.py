@@ -0,0 +1,35 @@
+import numpy as np
+import pandas as pd
+
+from app.db.models import ColumnStatistics
+from app.services.aggregates import MEAN, OUTLIER_COUNT, VALID_COUNT, AggregateRequest, compute_aggregates
+from app.services.incremental_stats import state_aggregates, update_column_state
+
+
+def test_batches_match_full_column_for_large_magnitudes():
+    values = pd.Series(1e9 + np.random.default_rng(0).normal(0, 1, 10_000))
+    state = ColumnStatistics(dataset_id=1, column_name="value")
+    for start in range(0, len(values), 1500):
+        update_column_state(state, values.iloc[start : start + 1500])
+
+    request = AggregateRequest()
+    request.require("value", MEAN, VALID_COUNT)
+    expected = compute_aggregates(pd.DataFrame({"value": values}), request).columns["value"]
+    actual = state_aggregates({"value": state}, len(values)).columns["value"]
+
+    assert actual[VALID_COUNT] == expected[VALID_COUNT]
+    assert abs(actual[MEAN] - expected[MEAN]) < 1e-6
+    assert abs(np.sqrt(state.m2 / state.row_count) - values.std(ddof=0)) < 1e-6
+
+
+def test_single_batch_outliers_are_exact():
+    values = pd.Series([0.0] * 200 + [100.0, None])
+    state = ColumnStatistics(dataset_id=1, column_name="value")
+    update_column_state(state, values)
+
+    request = AggregateRequest()
+    request.require("value", OUTLIER_COUNT)
+    expected = compute_aggregates(pd.DataFrame({"value": values}), request).columns["value"]
+
+    assert state.outlier_count == expected[OUTLIER_COUNT] == 1
+    assert state.null_count == 1
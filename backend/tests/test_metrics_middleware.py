@@ -0,0 +1,75 @@
+import pytest
+from fastapi import FastAPI
+from fastapi.testclient import TestClient
+from prometheus_client import REGISTRY, make_asgi_app
+
+from app.telemetry.metrics import UNMATCHED_ENDPOINT, MetricsMiddleware
+
+
+def requests_total(method, endpoint, status_code):
+    labels = {"method": method, "endpoint": endpoint, "status_code": str(status_code)}
+    return REGISTRY.get_sample_value("http_requests_total", labels) or 0.0
+
+
+def errors_total(method, endpoint, status_code):
+    labels = {"method": method, "endpoint": endpoint, "status_code": str(status_code)}
+    return REGISTRY.get_sample_value("http_request_errors_total", labels) or 0.0
+
+
+@pytest.fixture
+def client():
+    app = FastAPI()
+    app.add_middleware(MetricsMiddleware)
+    app.mount("/test-metrics", make_asgi_app())
+
+    @app.get("/test-items/{item_id}")
+    def read_item(item_id: int):
+        return {"id": item_id}
+
+    @app.get("/test-broken")
+    def broken():
+        raise RuntimeError("boom")
+
+    return TestClient(app, raise_server_exceptions=False)
+
+
+def test_requests_are_labelled_with_the_route_template(client):
+    before = requests_total("GET", "/test-items/{item_id}", 200)
+
+    client.get("/test-items/1")
+    client.get("/test-items/2")
+
+    assert requests_total("GET", "/test-items/{item_id}", 200) == before + 2
+
+
+def test_unmatched_paths_share_one_label(client):
+    before = errors_total("GET", UNMATCHED_ENDPOINT, 404)
+
+    client.get("/no-such-path/1")
+    client.get("/no-such-path/2")
+
+    assert errors_total("GET", UNMATCHED_ENDPOINT, 404) == before + 2
+
+
+def test_mounted_apps_are_labelled_with_their_mount(client):
+    before = requests_total("GET", "/test-metrics", 200)
+
+    client.get("/test-metrics/")
+
+    assert requests_total("GET", "/test-metrics", 200) == before + 1
+
+
+def test_unhandled_exceptions_count_as_server_errors(client):
+    before = errors_total("GET", "/test-broken", 500)
+
+    assert client.get("/test-broken").status_code == 500
+    assert errors_total("GET", "/test-broken", 500) == before + 1
+
+
+def test_unknown_methods_are_grouped(client):
+    before = errors_total("OTHER", UNMATCHED_ENDPOINT, 404)
+
+    client.request("PROPFIND", "/no-such-path")
+    client.request("BREW", "/no-such-path")
+
+    assert errors_total("OTHER", UNMATCHED_ENDPOINT, 404) == before + 2
@@ -0,0 +1,156 @@
+from sqlalchemy import inspect, text
+from sqlalchemy.pool import StaticPool
+from sqlmodel import Session, SQLModel, create_engine, select
+
+import app.db.models  # noqa: F401  registers the tables
+from app.db.migrations import upgrade
+from app.db.models import Incident
+from app.services.result_writer import ResultWriter
+
+
+OLD_INCIDENT_COLUMNS = ("last_seen_at", "occurrence_count", "resolved", "resolved_at")
+
+
+def database(*statements):
+    """A database with the current schema, downgraded by `statements`."""
+
+    engine = create_engine("sqlite://", poolclass=StaticPool)
+    SQLModel.metadata.create_all(engine)
+    with engine.begin() as connection:
+        for statement in statements:
+            connection.execute(text(statement))
+    return engine
+
+
+def test_current_schema_needs_no_migration():
+    assert upgrade(database()) == []
+
+
+def test_upgrade_adds_dataset_append_only():
+    engine = database(
+        "ALTER TABLE dataset DROP COLUMN append_only",
+        "INSERT INTO dataset (name, owner_id, created_at) VALUES ('orders', 1, '2024-01-01')",
+    )
+
+    assert "dataset_append_only" in upgrade(engine)
+    with engine.connect() as connection:
+        assert connection.execute(text("SELECT append_only FROM dataset")).scalar_one() == 0
+    assert upgrade(engine) == []
+
+
+def test_upgrade_adds_nullable_check_interval():
+    engine = database(
+        "ALTER TABLE dataset DROP COLUMN check_interval_seconds",
+        "INSERT INTO dataset (name, owner_id, append_only, created_at) VALUES ('orders', 1, false, '2024-01-01')",
+    )
+
+    assert "dataset_check_interval_seconds" in upgrade(engine)
+    with engine.connect() as connection:
+        assert connection.execute(text("SELECT check_interval_seconds FROM dataset")).scalar_one() is None
+
+
+def test_upgrade_adds_check_run_fingerprint():
+    engine = database(
+        "ALTER TABLE checkrun DROP COLUMN fingerprint",
+        "ALTER TABLE checkrun DROP COLUMN unchanged",
+        "INSERT INTO checkrun (dataset_id, run_at, metrics) VALUES (1, '2024-01-01', '{}')",
+    )
+
+    assert {"checkrun_fingerprint", "checkrun_unchanged"} <= set(upgrade(engine))
+    with engine.connect() as connection:
+        row = connection.execute(text("SELECT fingerprint, unchanged FROM checkrun")).one()
+    # No fingerprint never matches, so the first run after the upgrade evaluates every rule
+    assert tuple(row) == (None, 0)
+
+
+def test_upgrade_coalesces_open_incidents_before_indexing_them():
+    insert = (
+        "INSERT INTO incident (id, dataset_id, rule_id, created_at, metric_value, passed, severity, description,"
+        " acknowledged) VALUES ({}, 1, {}, '2024-01-0{}', 1.0, false, 'high', 'failed', {})"
+    )
+    engine = database(
+        "DROP INDEX ix_incident_open_rule",
+        "DROP INDEX ix_incident_status_created",
+        "DROP INDEX ix_incident_dataset_status_created",
+        *(f"ALTER TABLE incident DROP COLUMN {column}" for column in OLD_INCIDENT_COLUMNS),
+        insert.format(1, 1, 1, "true"),
+        insert.format(2, 1, 2, "false"),
+        insert.format(3, 1, 3, "false"),
+        insert.format(4, 2, 4, "false"),
+    )
+
+    assert "incident_open_rule_index" in upgrade(engine)
+    with engine.connect() as connection:
+        rows = connection.execute(
+            text("SELECT id, created_at = last_seen_at, occurrence_count, resolved FROM incident ORDER BY id")
+        ).all()
+    assert [tuple(row) for row in rows] == [(1, 1, 1, 0), (2, 1, 1, 1), (3, 1, 2, 0), (4, 1, 1, 0)]
+    assert "ix_incident_open_rule" in {index["name"] for index in inspect(engine).get_indexes("incident")}
+
+
+def test_upgrade_creates_keyset_pagination_indexes():
+    names = {
+        "ix_incident_created",
+        "ix_incident_dataset_created",
+        "ix_incident_rule_created",
+        "ix_incident_status_created",
+        "ix_incident_dataset_status_created",
+    }
+    engine = database(*(f"DROP INDEX {name}" for name in names))
+
+    assert "incident_keyset_indexes" in upgrade(engine)
+    assert names <= {index["name"] for index in inspect(engine).get_indexes("incident")}
+    assert upgrade(engine) == []
+
+
+def test_upgrade_indexes_check_runs_by_age():
+    engine = database("DROP INDEX ix_checkrun_run_at")
+
+    assert upgrade(engine) == ["checkrun_run_at_index"]
+    assert "ix_checkrun_run_at" in {index["name"] for index in inspect(engine).get_indexes("checkrun")}
+
+
+def test_metric_tables_are_created_on_existing_databases():
+    # New tables need no migration step: create_all adds them with their indexes
+    engine = database("DROP TABLE metricpoint", "DROP TABLE metricrollup")
+    SQLModel.metadata.create_all(engine)
+
+    assert upgrade(engine) == []
+    assert {index["name"] for index in inspect(engine).get_indexes("metricpoint")} == {"ix_metricpoint_rule_ts"}
+    assert {index["name"] for index in inspect(engine).get_indexes("metricrollup")} == {"ix_metricrollup_rule_bucket"}
+
+
+def test_upgraded_original_schema_supports_incident_upserts():
+    engine = create_engine("sqlite://", poolclass=StaticPool)
+    with engine.begin() as connection:
+        # The tables that changed, as the first release created them
+        connection.execute(
+            text(
+                "CREATE TABLE dataset (id INTEGER PRIMARY KEY, name VARCHAR NOT NULL UNIQUE, description VARCHAR,"
+                " owner_id INTEGER NOT NULL, created_at DATETIME NOT NULL)"
+            )
+        )
+        connection.execute(
+            text(
+                "CREATE TABLE incident (id INTEGER PRIMARY KEY, dataset_id INTEGER NOT NULL, rule_id INTEGER NOT NULL,"
+                " created_at DATETIME NOT NULL, metric_value FLOAT NOT NULL, passed BOOLEAN NOT NULL,"
+                " severity VARCHAR NOT NULL, description VARCHAR NOT NULL, acknowledged BOOLEAN NOT NULL)"
+            )
+        )
+        connection.execute(
+            text(
+                "CREATE TABLE checkrun (id INTEGER PRIMARY KEY, dataset_id INTEGER NOT NULL,"
+                " run_at DATETIME NOT NULL, metrics JSON)"
+            )
+        )
+    SQLModel.metadata.create_all(engine)
+    upgrade(engine)
+
+    assert upgrade(engine) == []
+    with Session(engine) as session:
+        writer = ResultWriter(session)
+        for value in (1.0, 2.0):
+            writer.add(Incident(dataset_id=1, rule_id=1, metric_value=value, severity="high", description="failed"))
+            writer.flush()
+        (incident,) = session.exec(select(Incident)).all()
+    assert incident.occurrence_count == 2
@@ -0,0 +1,48 @@
+from datetime import datetime, timedelta
+
+import pytest
+from fastapi import HTTPException
+from sqlmodel import select
+
+from app.core.pagination import decode_cursor, encode_cursor, next_cursor, paginate
+from app.db.models import Incident
+
+
+def test_cursor_round_trip():
+    created_at = datetime(2024, 5, 1, 12, 30, 15, 123456)
+
+    assert decode_cursor(encode_cursor(created_at, 42)) == (created_at, 42)
+
+
+@pytest.mark.parametrize("cursor", ["not a cursor", encode_cursor(datetime(2024, 1, 1), 1)[:-3], "WzEsMiwzXQ"])
+def test_malformed_cursor_is_rejected(cursor):
+    with pytest.raises(HTTPException) as excinfo:
+        decode_cursor(cursor)
+    assert excinfo.value.status_code == 400
+
+
+def test_pages_cover_every_row_once_newest_first(session):
+    start = datetime(2024, 1, 1)
+    for i in range(7):
+        # Pairs of rows share a timestamp, so pages must also order by id
+        session.add(
+            Incident(
+                dataset_id=1,
+                rule_id=i,
+                created_at=start + timedelta(minutes=i // 2),
+                metric_value=1.0,
+                severity="high",
+                description="failed",
+            )
+        )
+    session.commit()
+
+    seen, cursor = [], None
+    while True:
+        rows = list(session.exec(paginate(select(Incident), Incident, cursor, limit=3)))
+        page, cursor = next_cursor(rows, limit=3)
+        seen.extend(page)
+        if cursor is None:
+            break
+
+    assert [row.rule_id for row in seen] == [6, 5, 4, 3, 2, 1, 0]
@@ -0,0 +1,150 @@
+import asyncio
+from datetime import timedelta
+
+import pytest
+from fastapi import HTTPException
+from sqlalchemy import delete, update
+
+from app.core import security
+from app.core.security import PrincipalCache, create_access_token, get_current_user
+from app.db.models import User
+
+
+class Clock:
+    def __init__(self, now):
+        self.now = now
+
+    def __call__(self):
+        return self.now
+
+
+@pytest.fixture
+def clock(monkeypatch):
+    clock = Clock(security.time.time())
+    monkeypatch.setattr(security, "principal_cache", PrincipalCache(100, 60, clock=clock))
+    return clock
+
+
+@pytest.fixture
+def loads(session, monkeypatch, clock):
+    """User ids looked up in the database by `get_current_user`."""
+
+    monkeypatch.setattr(security, "engine", session.get_bind())
+    loaded = []
+    load_principal = security._load_principal
+
+    def counting(user_id):
+        loaded.append(user_id)
+        return load_principal(user_id)
+
+    monkeypatch.setattr(security, "_load_principal", counting)
+    return loaded
+
+
+@pytest.fixture
+def user(session):
+    user = User(email="ada@example.com", full_name="Ada", password_hash="x", role="Maintainer")
+    session.add(user)
+    session.commit()
+    session.refresh(user)
+    return user
+
+
+def authenticate(token):
+    return asyncio.run(get_current_user(token))
+
+
+def test_repeated_requests_are_served_from_the_cache(user, loads):
+    token = create_access_token(str(user.id))
+
+    assert authenticate(token).role == "Maintainer"
+    assert authenticate(token).role == "Maintainer"
+    assert loads == [user.id]
+
+
+def test_role_change_drops_the_cached_principal(session, user, loads):
+    token = create_access_token(str(user.id))
+    authenticate(token)
+
+    user.role = "Viewer"
+    session.add(user)
+    session.flush()
+    assert authenticate(token).role == "Maintainer"  # not committed yet
+
+    session.commit()
+    assert authenticate(token).role == "Viewer"
+    assert loads == [user.id, user.id]
+
+
+def test_email_change_drops_the_cached_principal(session, user, loads):
+    token = create_access_token(str(user.id))
+    authenticate(token)
+
+    user.email = "lovelace@example.com"
+    session.add(user)
+    session.commit()
+
+    assert authenticate(token).email == "lovelace@example.com"
+
+
+def test_rolled_back_change_keeps_the_cached_principal(session, user, loads):
+    token = create_access_token(str(user.id))
+    authenticate(token)
+
+    user.role = "Viewer"
+    session.add(user)
+    session.flush()
+    session.rollback()
+
+    assert authenticate(token).role == "Maintainer"
+    assert loads == [user.id]
+
+
+def test_deleted_user_is_rejected(session, user, loads):
+    token = create_access_token(str(user.id))
+    authenticate(token)
+
+    session.delete(user)
+    session.commit()
+
+    with pytest.raises(HTTPException) as excinfo:
+        authenticate(token)
+    assert excinfo.value.status_code == 401
+
+
+@pytest.mark.parametrize("statement", [update(User).values(role="Viewer"), delete(User)], ids=["update", "delete"])
+def test_bulk_user_statements_drop_cached_principals(session, user, loads, statement):
+    token = create_access_token(str(user.id))
+    authenticate(token)
+
+    session.execute(statement)
+    session.commit()
+
+    try:
+        principal = authenticate(token)
+    except HTTPException as exc:
+        assert exc.status_code == 401
+    else:
+        assert principal.role == "Viewer"
+    assert loads == [user.id, user.id]
+
+
+def test_principal_expires_after_the_ttl(user, loads, clock):
+    token = create_access_token(str(user.id))
+    authenticate(token)
+
+    clock.now += 59
+    authenticate(token)
+    assert loads == [user.id]
+
+    clock.now += 1
+    authenticate(token)
+    assert loads == [user.id, user.id]
+
+
+def test_principal_expires_with_its_token(user, loads, clock):
+    token = create_access_token(str(user.id), expires_delta=timedelta(seconds=30))
+    authenticate(token)
+
+    clock.now += 30
+    assert security.principal_cache.get(token) is None
@@ -0,0 +1,94 @@
+import pytest
+from sqlmodel import select
+
+from app.core.config import settings
+from app.db.models import CheckRun, Dataset, Rule
+from app.services.quality_service import QualityService
+
+
+@pytest.fixture
+def dataset(session, tmp_path, monkeypatch):
+    monkeypatch.setattr(settings, "dataset_cache_dir", str(tmp_path / "cache"))
+    (tmp_path / "orders.csv").write_text("id,amount,created_at\n1,1.5,2024-01-01T00:00:00Z\n2,,2024-01-02T00:00:00Z\n")
+    dataset = Dataset(name="orders", owner_id=1)
+    session.add(dataset)
+    session.commit()
+    session.add(
+        Rule(
+            dataset_id=dataset.id,
+            rule_type="completeness",
+            params={"column": "amount"},
+            threshold=0.1,
+            severity="info",
+        )
+    )
+    session.add(
+        Rule(
+            dataset_id=dataset.id,
+            rule_type="freshness",
+            params={"timestamp_column": "created_at"},
+            threshold=3600,
+            severity="info",
+        )
+    )
+    session.commit()
+    return dataset
+
+
+@pytest.fixture
+def evaluated(monkeypatch):
+    """Names of the rule types evaluated by each run."""
+
+    runs = []
+    evaluate_plan = QualityService.evaluate_plan
+
+    def recording(self, dataset, plan, timings=None):
+        runs[-1].extend(sorted(type(evaluator).__name__ for evaluator in plan.evaluators))
+        return evaluate_plan(self, dataset, plan, timings)
+
+    monkeypatch.setattr(QualityService, "evaluate_plan", recording)
+    return runs
+
+
+def check(session, dataset, tmp_path, evaluated):
+    evaluated.append([])
+    service = QualityService(session)
+    service.data_dir = tmp_path
+    service.run_checks_for_dataset(dataset)
+    return session.exec(select(CheckRun).order_by(CheckRun.id.desc())).first()
+
+
+def test_unchanged_file_and_rules_reuse_the_previous_metrics(session, dataset, tmp_path, evaluated):
+    first = check(session, dataset, tmp_path, evaluated)
+    second = check(session, dataset, tmp_path, evaluated)
+
+    assert not first.unchanged and second.unchanged
+    assert second.fingerprint == first.fingerprint
+    # Only the time-dependent freshness rule runs again
+    assert evaluated == [["CompletenessRule", "FreshnessRule"], ["FreshnessRule"]]
+    completeness = next(key for key in first.metrics if key.endswith("completeness"))
+    assert second.metrics[completeness] == first.metrics[completeness]
+
+
+def test_edited_rule_forces_evaluation(session, dataset, tmp_path, evaluated):
+    first = check(session, dataset, tmp_path, evaluated)
+    rule = session.exec(select(Rule).where(Rule.rule_type == "completeness")).one()
+    rule.threshold = 0.9
+    session.add(rule)
+    session.commit()
+    second = check(session, dataset, tmp_path, evaluated)
+
+    assert not second.unchanged and second.fingerprint != first.fingerprint
+    assert evaluated[1] == ["CompletenessRule", "FreshnessRule"]
+
+
+def test_appended_rows_force_evaluation(session, dataset, tmp_path, evaluated):
+    first = check(session, dataset, tmp_path, evaluated)
+    with open(tmp_path / "orders.csv", "a") as f:
+        f.write("3,,2024-01-03T00:00:00Z\n")
+    second = check(session, dataset, tmp_path, evaluated)
+
+    assert not second.unchanged and second.fingerprint != first.fingerprint
+    assert evaluated[1] == ["CompletenessRule", "FreshnessRule"]
+    completeness = next(key for key in first.metrics if key.endswith("completeness"))
+    assert second.metrics[completeness] > first.metrics[completeness]
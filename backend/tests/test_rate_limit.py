@@ -0,0 +1,59 @@
+import threading
+
+from app.core.rate_limit import RateLimiter, SQLiteRateLimiter, TokenBucket
+
+
+def test_bucket_refills_on_elapsed_time():
+    bucket = TokenBucket(capacity=2, refill_rate=1.0, tokens=2, last_checked=0.0)
+
+    assert bucket.consume(now=0.0) and bucket.consume(now=0.0)
+    assert not bucket.consume(now=0.5)
+    assert bucket.consume(now=1.0)
+
+
+def test_bucket_ignores_clock_going_backwards():
+    bucket = TokenBucket(capacity=1, refill_rate=1.0, tokens=0, last_checked=10.0)
+
+    assert not bucket.consume(now=5.0)
+
+
+def test_limiter_enforces_capacity_per_key():
+    limiter = RateLimiter(capacity=3, refill_rate=0.0)
+
+    assert [limiter.allow("a") for _ in range(4)] == [True, True, True, False]
+    assert limiter.allow("b")
+
+
+def test_limiter_keeps_at_most_max_keys():
+    limiter = RateLimiter(capacity=1, refill_rate=0.0, max_keys=8, shards=2)
+    for i in range(100):
+        limiter.allow(str(i))
+
+    assert len(limiter) <= 8
+
+
+def test_limiter_is_consistent_across_threads():
+    limiter = RateLimiter(capacity=50, refill_rate=0.0)
+    allowed = []
+
+    def spend():
+        allowed.extend(limiter.allow("shared") for _ in range(20))
+
+    threads = [threading.Thread(target=spend) for _ in range(5)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+
+    assert sum(allowed) == 50
+
+
+def test_sqlite_limiter_is_shared_by_instances(tmp_path):
+    path = str(tmp_path / "buckets.sqlite3")
+    first = SQLiteRateLimiter(path, capacity=2, refill_rate=0.0)
+    second = SQLiteRateLimiter(path, capacity=2, refill_rate=0.0)
+
+    assert first.allow("a")
+    assert second.allow("a")
+    assert not first.allow("a")
+    assert second.allow("b")
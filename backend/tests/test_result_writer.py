@@ -0,0 +1,97 @@
+import pytest
+from sqlmodel import select
+
+from app.db.models import CheckRun, DatasetCheckpoint, Incident
+from app.services.result_writer import ResultWriter
+
+
+def incident(rule_id=1, value=1.0):
+    return Incident(dataset_id=1, rule_id=rule_id, metric_value=value, severity="high", description="failed")
+
+
+def incidents(session):
+    return list(session.exec(select(Incident).order_by(Incident.id)))
+
+
+def test_repeated_failures_coalesce_into_open_incident(session):
+    writer = ResultWriter(session)
+    writer.add(incident(value=1.0))
+    writer.add(incident(value=2.0))
+    writer.flush()
+    writer.add(incident(value=3.0))
+    writer.flush()
+
+    (row,) = incidents(session)
+    assert row.occurrence_count == 3
+    assert row.metric_value == 3.0
+    assert not row.resolved
+
+
+def test_recovery_resolves_and_next_failure_opens_new_incident(session):
+    writer = ResultWriter(session)
+    writer.add(incident())
+    writer.flush()
+    writer.recover(1, 1)
+    writer.add(incident(value=5.0))
+    writer.flush()
+
+    first, second = incidents(session)
+    assert first.resolved and first.resolved_at is not None
+    assert not second.resolved and second.occurrence_count == 1
+
+
+def test_acknowledged_incident_is_not_reopened(session):
+    writer = ResultWriter(session)
+    writer.add(incident())
+    writer.flush()
+    session.exec(select(Incident)).one().acknowledged = True
+    session.commit()
+    writer.add(incident())
+    writer.flush()
+
+    assert [row.acknowledged for row in incidents(session)] == [True, False]
+
+
+def test_failed_dataset_rows_are_dropped(session):
+    writer = ResultWriter(session)
+    with writer.dataset():
+        writer.add(CheckRun(dataset_id=1, metrics={}))
+        writer.add(incident(rule_id=1))
+    with pytest.raises(RuntimeError):
+        with writer.dataset():
+            writer.add(CheckRun(dataset_id=2, metrics={}))
+            writer.add(incident(rule_id=1, value=9.0))
+            writer.recover(1, 2)
+            writer.merge(DatasetCheckpoint(dataset_id=2, row_offset=10))
+            raise RuntimeError("check failed")
+    writer.flush()
+
+    assert [run.dataset_id for run in session.exec(select(CheckRun))] == [1]
+    (row,) = incidents(session)
+    assert row.metric_value == 1.0 and row.occurrence_count == 1
+    assert session.exec(select(DatasetCheckpoint)).all() == []
+
+
+def test_full_batch_waits_for_end_of_dataset(session):
+    writer = ResultWriter(session, batch_size=2)
+    with writer.dataset():
+        for _ in range(3):
+            writer.add(CheckRun(dataset_id=1, metrics={}))
+        assert writer.written == 0
+    assert writer.written == 3
+
+
+def test_merged_state_is_committed_with_results(session):
+    checkpoint = DatasetCheckpoint(dataset_id=1)
+    session.add(checkpoint)
+    session.commit()
+    session.refresh(checkpoint)
+    session.expunge(checkpoint)
+    writer = ResultWriter(session)
+    writer.merge(checkpoint)
+    writer.add(CheckRun(dataset_id=1, metrics={}))
+    checkpoint.row_offset = 42
+
+    assert session.get(DatasetCheckpoint, checkpoint.id).row_offset == 0
+    writer.flush()
+    assert session.get(DatasetCheckpoint, checkpoint.id).row_offset == 42
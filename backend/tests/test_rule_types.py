@@ -0,0 +1,35 @@
+import pytest
+
+from app.db.models import Rule
+from app.services.aggregates import FrameAggregates
+from app.services.rule_types import RuleValidationError, compile_rule, compile_rule_or_invalid
+
+
+def make_rule(rule_type, params):
+    return Rule(dataset_id=1, rule_type=rule_type, params=params, threshold=0.1, severity="warning")
+
+
+def test_invalid_params_are_rejected_when_compiling():
+    with pytest.raises(RuleValidationError):
+        compile_rule(make_rule("distribution_drift", {"column": "value"}))
+
+
+def test_incomplete_distribution_drift_rule_still_passes():
+    evaluator = compile_rule_or_invalid(make_rule("distribution_drift", {"column": "value"}))
+
+    assert evaluator.derive(FrameAggregates(row_count=10)) == (0.0, True, "Distribution drift check incomplete")
+
+
+def test_incomplete_completeness_rule_fails():
+    metric, passed, description = compile_rule_or_invalid(make_rule("completeness", {})).derive(
+        FrameAggregates(row_count=10)
+    )
+
+    assert (metric, passed) == (1.0, False)
+    assert description.startswith("Invalid rule parameters")
+
+
+def test_unknown_rule_type_passes():
+    evaluator = compile_rule_or_invalid(make_rule("no_such_type", {}))
+
+    assert evaluator.derive(FrameAggregates(row_count=10))[1] is True
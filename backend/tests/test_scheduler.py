@@ -0,0 +1,121 @@
+from concurrent.futures import Future
+from contextlib import contextmanager
+
+import pytest
+from sqlmodel import select
+
+from app.db.models import Dataset
+from jobs import run_quality_job
+from jobs.run_quality_job import DatasetOutcome, DatasetScheduler
+
+
+@pytest.fixture
+def failing():
+    """Names of the datasets whose checks fail; "raise" makes the check itself raise."""
+
+    return {}
+
+
+@pytest.fixture
+def checked(session, monkeypatch, failing):
+    """Names of the datasets checked, in order."""
+
+    for name, interval in [("hourly", 3600), ("default", None), ("fast", 10)]:
+        session.add(Dataset(name=name, owner_id=1, check_interval_seconds=interval))
+    session.commit()
+
+    @contextmanager
+    def get_session():
+        yield session
+
+    names = []
+
+    def check_dataset(dataset_id, name, results=None):
+        names.append(name)
+        if failing.get(name) == "raise":
+            raise RuntimeError("worker died")
+        error = failing.get(name)
+        return DatasetOutcome(dataset_id, name, error is None, 0.0, error)
+
+    monkeypatch.setattr(run_quality_job, "get_session", get_session)
+    monkeypatch.setattr(run_quality_job, "check_dataset", check_dataset)
+    return names
+
+
+@pytest.fixture
+def scheduler(checked):
+    scheduler = DatasetScheduler(default_interval=300, workers=3, refresh_seconds=10_000)
+    tick(scheduler, 0.0)
+    assert sorted(checked) == ["default", "fast", "hourly"]
+    checked.clear()
+    return scheduler
+
+
+class InlineExecutor:
+    """Runs submitted checks immediately, delivering failures through the future like a worker pool."""
+
+    def submit(self, fn, *args):
+        future = Future()
+        try:
+            future.set_result(fn(*args))
+        except Exception as exc:
+            future.set_exception(exc)
+        return future
+
+
+def tick(scheduler, now):
+    """One iteration of `run_forever` with `now` as the clock."""
+
+    if now >= scheduler.next_refresh:
+        scheduler.refresh(now)
+    scheduler._dispatch(InlineExecutor(), now)
+    for future in list(scheduler.running):
+        scheduler._complete(future, now)
+
+
+def test_datasets_are_not_due_before_their_interval(scheduler, checked):
+    runs = {}
+    for now in range(1, 3601):
+        before = len(checked)
+        tick(scheduler, float(now))
+        for name in checked[before:]:
+            runs.setdefault(name, []).append(now)
+
+    assert runs["fast"] == list(range(10, 3601, 10))
+    assert runs["default"] == list(range(300, 3601, 300))
+    assert runs["hourly"] == [3600]
+
+
+def test_due_datasets_run_in_due_order(scheduler, checked):
+    scheduler.workers = 1
+
+    for _ in range(3):
+        tick(scheduler, 5000.0)
+
+    assert checked == ["fast", "default", "hourly"]
+
+
+@pytest.mark.parametrize("failure", ["boom", "raise"])
+def test_failed_checks_are_rescheduled(scheduler, checked, failing, failure):
+    failing["fast"] = failure
+
+    tick(scheduler, 10.0)
+    tick(scheduler, 19.0)
+    assert checked == ["fast"]
+
+    del failing["fast"]
+    tick(scheduler, 20.0)
+    tick(scheduler, 30.0)
+    assert checked == ["fast", "fast", "fast"]
+
+
+def test_shortened_interval_takes_effect_on_refresh(scheduler, checked, session):
+    hourly = session.exec(select(Dataset).where(Dataset.name == "hourly")).one()
+    hourly.check_interval_seconds = 60
+    session.commit()
+    scheduler.next_refresh = 0.0
+
+    tick(scheduler, 30.0)
+    assert "hourly" not in checked
+    tick(scheduler, 90.0)
+    assert "hourly" in checked
@@ -0,0 +1,41 @@
+import pandas as pd
+import pytest
+
+from app.core.config import settings
+from app.services.aggregates import NULL_COUNT, AggregateRequest, compute_aggregates
+from app.services.streaming import stream_aggregates
+
+
+@pytest.fixture(autouse=True)
+def small_chunks(monkeypatch, tmp_path):
+    # The smallest chunk is 1000 rows; files below have several chunks
+    monkeypatch.setattr(settings, "check_chunk_rows", 1000)
+    monkeypatch.setattr(settings, "check_spill_dir", str(tmp_path))
+
+
+def duplicates(path, *, also_aggregate=False):
+    request = AggregateRequest()
+    request.require_keys(["key"])
+    if also_aggregate:
+        request.require("key", NULL_COUNT)
+    streamed = stream_aggregates(path, request).duplicates[("key",)]
+    in_memory = compute_aggregates(pd.read_csv(path), request).duplicates[("key",)]
+    return streamed, in_memory
+
+
+@pytest.mark.parametrize("also_aggregate", [False, True])
+def test_large_integer_keys_keep_their_precision(tmp_path, also_aggregate):
+    path = tmp_path / "keys.csv"
+    path.write_text("key\n" + "".join(f"{2**60 + i}\n" for i in range(2500)))
+
+    assert duplicates(path, also_aggregate=also_aggregate) == (0, 0)
+
+
+@pytest.mark.parametrize("also_aggregate", [False, True])
+def test_keys_compare_alike_across_chunks_of_different_dtypes(tmp_path, also_aggregate):
+    path = tmp_path / "keys.csv"
+    # The first chunk parses as ints, a later one as text containing "5" again
+    rows = [str(i) for i in range(1500)] + ["x", "5", "y"]
+    path.write_text("key\n" + "\n".join(rows) + "\n")
+
+    assert duplicates(path, also_aggregate=also_aggregate) == (1, 1)
@@ -0,0 +1,102 @@
+import os
+
+import pytest
+
+from app.db.models import DatasetCheckpoint
+from app.services.tail_reader import read_appended, read_tail
+
+
+HEADER = "id,value\n"
+
+
+@pytest.fixture
+def csv_path(tmp_path):
+    return tmp_path / "data.csv"
+
+
+def append(path, text):
+    stat = os.stat(path)
+    with open(path, "a") as f:
+        f.write(text)
+    # Make sure the mtime moves even on coarse-grained filesystems
+    os.utime(path, (stat.st_atime, stat.st_mtime + 1))
+
+
+def test_unterminated_last_line_is_read_once_file_is_unchanged(csv_path):
+    csv_path.write_text(HEADER + "1,a\n2,b\n3,c")
+    checkpoint = DatasetCheckpoint(dataset_id=1)
+
+    assert list(read_appended(csv_path, checkpoint)["id"]) == [1, 2]
+    frame = read_appended(csv_path, checkpoint)
+
+    assert list(frame["id"]) == [3]
+    assert list(frame.index) == [2]
+    assert checkpoint.row_offset == 3
+    assert checkpoint.byte_offset == os.path.getsize(csv_path)
+    assert read_appended(csv_path, checkpoint).empty
+
+
+def test_line_completed_between_reads_is_not_split(csv_path):
+    csv_path.write_text(HEADER + "1,a\n2,b\n3,c")
+    checkpoint = DatasetCheckpoint(dataset_id=1)
+    read_appended(csv_path, checkpoint)
+
+    # The writer paused mid-row and finished it before the next read
+    append(csv_path, "cc\n4,d\n")
+    frame = read_appended(csv_path, checkpoint)
+
+    assert frame.to_dict("list") == {"id": [3, 4], "value": ["ccc", "d"]}
+    assert list(frame.index) == [2, 3]
+
+
+def test_growing_unterminated_line_is_not_consumed(csv_path):
+    csv_path.write_text(HEADER + "1,a\n2,b")
+    checkpoint = DatasetCheckpoint(dataset_id=1)
+    read_appended(csv_path, checkpoint)
+
+    append(csv_path, "b")
+    assert read_appended(csv_path, checkpoint).empty
+    assert checkpoint.row_offset == 1
+
+
+def test_rows_appended_after_consumed_unterminated_line(csv_path):
+    csv_path.write_text(HEADER + "1,a\n2,b")
+    checkpoint = DatasetCheckpoint(dataset_id=1)
+    read_appended(csv_path, checkpoint)
+    read_appended(csv_path, checkpoint)
+
+    append(csv_path, "\n3,c\n4,d\n")
+    frame = read_appended(csv_path, checkpoint)
+
+    assert list(frame["id"]) == [3, 4]
+    assert list(frame.index) == [2, 3]
+
+
+def test_rewritten_file_is_read_from_the_start(csv_path):
+    csv_path.write_text(HEADER + "1,a\n2,b\n3,c\n")
+    checkpoint = DatasetCheckpoint(dataset_id=1)
+    read_appended(csv_path, checkpoint)
+
+    csv_path.write_text(HEADER + "7,x\n")
+    frame = read_appended(csv_path, checkpoint)
+
+    assert list(frame["id"]) == [7]
+    assert list(frame.index) == [0]
+
+
+def test_read_tail_skips_unterminated_last_line(csv_path):
+    csv_path.write_text(HEADER + "1,a\n2,b\n3,c")
+
+    frame, whole_file = read_tail(csv_path, tail_bytes=1024)
+
+    assert list(frame["id"]) == [1, 2]
+    assert whole_file
+
+
+def test_read_tail_starts_at_a_line_boundary(csv_path):
+    csv_path.write_text(HEADER + "".join(f"{i},{'x' * 10}\n" for i in range(100)))
+
+    frame, whole_file = read_tail(csv_path, tail_bytes=40)
+
+    assert list(frame["id"]) == [98, 99]
+    assert not whole_file
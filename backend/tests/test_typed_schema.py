@@ -0,0 +1,72 @@
+import pandas as pd
+
+from sqlmodel import select
+
+from app.core.config import settings
+from app.db.models import Dataset, SchemaVersion
+from app.services.column_cache import ColumnCache
+from app.services.quality_service import QualityService
+from app.services.typed_schema import TypedSchema, is_source_schema
+from jobs.schema_registry import compare_schema, serialise_schema
+
+
+CSV = "id,amount,status,created_at\n" + "".join(
+    f"{i},{i}.5,{'open' if i % 2 else 'closed'},2024-01-{i:02d}\n" for i in range(1, 21)
+)
+
+
+def test_registered_schema_matches_schema_registry(session, tmp_path):
+    path = tmp_path / "data.csv"
+    path.write_text(CSV)
+    frame = pd.read_csv(path)
+    dataset = Dataset(name="orders", owner_id=1)
+    session.add(dataset)
+    session.commit()
+
+    schema = TypedSchema.infer(frame)
+    session.add(SchemaVersion(dataset_id=dataset.id, version=1, schema=schema.dtypes))
+    session.commit()
+
+    assert schema.dtypes == serialise_schema(frame)
+    assert is_source_schema(schema.dtypes)
+    assert compare_schema(session, dataset, schema.read_csv(path)) == (True, {})
+
+
+def test_compact_dtypes_are_not_source_schema():
+    assert not is_source_schema({"id": "int32", "status": "category"})
+    assert not is_source_schema({"created_at": "datetime64[ns, UTC]"})
+
+
+def test_cache_stores_compact_dtypes(tmp_path):
+    path = tmp_path / "data.csv"
+    path.write_text(CSV)
+    schema = TypedSchema.infer(pd.read_csv(path))
+    cache = ColumnCache(tmp_path / "cache")
+
+    parsed = cache.read_csv(path, ["id", "status"], schema)
+    cached = cache.read_csv(path, ["id", "status"], schema)
+
+    assert str(parsed["id"].dtype) == "int32"
+    assert str(parsed["status"].dtype) == "category"
+    assert cached.dtypes.equals(parsed.dtypes)
+    assert cached.values.tolist() == parsed.values.tolist()
+
+
+def test_cached_loads_register_one_source_schema(session, tmp_path, monkeypatch):
+    monkeypatch.setattr(settings, "dataset_cache_enabled", True)
+    monkeypatch.setattr(settings, "dataset_cache_dir", str(tmp_path / "cache"))
+    (tmp_path / "orders.csv").write_text(CSV)
+    dataset = Dataset(name="orders", owner_id=1)
+    session.add(dataset)
+    session.commit()
+
+    for _ in range(4):
+        service = QualityService(session)
+        service.data_dir = tmp_path
+        frame = service.load_dataset(dataset, columns=["id", "status"])
+        service.results.flush()
+
+    (version,) = session.exec(select(SchemaVersion)).all()
+    assert is_source_schema(version.schema)
+    assert list(frame.columns) == ["id", "status"]
+    assert str(frame["id"].dtype) == "int32"
@@ -0,0 +1,98 @@
+"""Benchmark the latency added by the request metrics middleware.
+
+Builds a minimal FastAPI app with one parameterised route and drives it
+in-process through the ASGI interface, without a server or network, so the
+difference between runs is the middleware itself. Compares no middleware,
+the previous `BaseHTTPMiddleware` based implementation and
+`MetricsMiddleware`, and prints the mean time per request and the overhead
+over the bare app. Run it from the `backend` directory:
+
+```bash
+python ../scripts/bench_metrics_middleware.py --requests 20000
+```
+"""
+
+import argparse
+import asyncio
+import time
+from typing import Any, Callable, Dict, List
+
+from fastapi import FastAPI, Request, Response
+from starlette.middleware.base import BaseHTTPMiddleware
+
+from app.telemetry.metrics import HTTP_REQUEST_COUNT, HTTP_REQUEST_LATENCY, MetricsMiddleware
+
+
+async def path_labelled_dispatch(request: Request, call_next: Callable[[Request], Any]) -> Response:
+    # Equivalent of the former metrics_middleware, labelled by raw path
+    start_time = time.perf_counter()
+    response = await call_next(request)
+    endpoint = request.scope.get("path") or "unknown"
+    HTTP_REQUEST_COUNT.labels(method=request.method, endpoint=endpoint, status_code=response.status_code).inc()
+    HTTP_REQUEST_LATENCY.labels(method=request.method, endpoint=endpoint).observe(time.perf_counter() - start_time)
+    return response
+
+
+def build_app(variant: str) -> FastAPI:
+    app = FastAPI()
+
+    @app.get("/items/{item_id}")
+    async def read_item(item_id: int) -> Dict[str, int]:
+        return {"item_id": item_id}
+
+    if variant == "base_http":
+        app.add_middleware(BaseHTTPMiddleware, dispatch=path_labelled_dispatch)
+    elif variant == "asgi":
+        app.add_middleware(MetricsMiddleware)
+    return app
+
+
+async def drive(app: FastAPI, requests: int) -> float:
+    """Send `requests` GETs through the app and return the mean seconds per request."""
+
+    async def receive() -> Dict[str, Any]:
+        return {"type": "http.request", "body": b"", "more_body": False}
+
+    async def send(message: Dict[str, Any]) -> None:
+        pass
+
+    started = time.perf_counter()
+    for i in range(requests):
+        path = f"/items/{i % 1000}"
+        scope = {
+            "type": "http",
+            "asgi": {"version": "3.0"},
+            "http_version": "1.1",
+            "method": "GET",
+            "scheme": "http",
+            "path": path,
+            "raw_path": path.encode(),
+            "root_path": "",
+            "query_string": b"",
+            "headers": [(b"host", b"bench")],
+            "client": ("127.0.0.1", 1234),
+            "server": ("bench", 80),
+        }
+        await app(scope, receive, send)
+    return (time.perf_counter() - started) / requests
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="Measure the per-request cost of the metrics middleware")
+    parser.add_argument("--requests", type=int, default=20000)
+    parser.add_argument("--rounds", type=int, default=3, help="Best of this many rounds is reported")
+    args = parser.parse_args()
+
+    results: Dict[str, float] = {}
+    for variant in ("none", "base_http", "asgi"):
+        app = build_app(variant)
+        asyncio.run(drive(app, 500))  # warm up
+        timings: List[float] = [asyncio.run(drive(app, args.requests)) for _ in range(args.rounds)]
+        results[variant] = min(timings)
+    for variant, seconds in results.items():
+        overhead = (seconds - results["none"]) * 1e6
+        print(f"{variant:>10}: {seconds * 1e6:8.1f} us/request  (+{overhead:.1f} us)")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,92 @@
+"""Load test for the rate limiter backends.
+
+Starts several processes, each with several threads, that request tokens for
+a handful of keys as fast as they can for a fixed duration. For every key no
+more than `capacity + refill_rate * duration` requests may be allowed across
+all processes; the script reports the allowed counts against that bound and
+the decisions per second. Run it from the `backend` directory:
+
+```bash
+python ../scripts/rate_limit_load.py --backend sqlite --processes 8
+```
+
+With `--backend memory` every process has its own buckets, which shows the
+per-process limit being multiplied by the number of processes.
+"""
+
+import argparse
+import os
+import tempfile
+import threading
+import time
+from collections import Counter
+from multiprocessing import Pool
+from typing import Dict, Tuple
+
+from app.core.rate_limit import RateLimiter, RateLimiterBackend, SQLiteRateLimiter
+
+
+def build(args: argparse.Namespace) -> RateLimiterBackend:
+    if args.backend == "sqlite":
+        return SQLiteRateLimiter(args.path, capacity=args.capacity, refill_rate=args.refill_rate)
+    return RateLimiter(capacity=args.capacity, refill_rate=args.refill_rate)
+
+
+def worker(args: argparse.Namespace) -> Tuple[Counter, int]:
+    limiter = build(args)
+    allowed: Counter = Counter()
+    decisions = [0]
+    lock = threading.Lock()
+    deadline = time.monotonic() + args.duration
+
+    def hammer() -> None:
+        local: Counter = Counter()
+        count = 0
+        while time.monotonic() < deadline:
+            key = f"user-{count % args.keys}"
+            if limiter.allow(key):
+                local[key] += 1
+            count += 1
+        with lock:
+            allowed.update(local)
+            decisions[0] += count
+
+    threads = [threading.Thread(target=hammer) for _ in range(args.threads)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    return allowed, decisions[0]
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="Hammer a rate limiter backend from several processes")
+    parser.add_argument("--backend", choices=["memory", "sqlite"], default="sqlite")
+    parser.add_argument("--processes", type=int, default=os.cpu_count() or 4)
+    parser.add_argument("--threads", type=int, default=4)
+    parser.add_argument("--keys", type=int, default=4)
+    parser.add_argument("--duration", type=float, default=5.0)
+    parser.add_argument("--capacity", type=int, default=10)
+    parser.add_argument("--refill-rate", type=float, default=2.0)
+    parser.add_argument("--path", default=os.path.join(tempfile.mkdtemp(), "rate-limit.sqlite3"))
+    args = parser.parse_args()
+
+    build(args)  # create the shared table before the workers start
+    started = time.perf_counter()
+    with Pool(args.processes) as pool:
+        results = pool.map(worker, [args] * args.processes)
+    elapsed = time.perf_counter() - started
+    allowed: Dict[str, int] = Counter()
+    decisions = 0
+    for counts, count in results:
+        allowed.update(counts)
+        decisions += count
+    bound = args.capacity + args.refill_rate * args.duration
+    print(f"{args.backend}: {decisions} decisions in {elapsed:.1f}s ({decisions / elapsed:,.0f}/s)")
+    for key in sorted(allowed):
+        verdict = "ok" if allowed[key] <= bound + 1 else "EXCEEDED"
+        print(f"  {key}: allowed {allowed[key]} (bound {bound:.0f}) {verdict}")
+
+
+if __name__ == "__main__":
+    main()